@@ -67,27 +67,29 @@ class BDDModel(VariabilityModel):
         # In dd.autoref, bdd.true is the unique terminal.
         # bdd.false is just ~bdd.true
 
-        def _dump(node: Any, indent: str = "") -> None:
+        logger.debug("Exploring BDD (Root: %s)", self.root)
+        # Explicit stack (pre-order, low before high) so deep diagrams do not hit the
+        # recursion limit
+        stack: list[tuple[Any, str]] = [(self.root, "")]
+        while stack:
+            node, indent = stack.pop()
             if node == self.bdd.true:
                 logger.debug("%s leaf: TRUE", indent)
-                return
+                continue
             if node == self.bdd.false:
                 logger.debug("%s leaf: FALSE", indent)
-                return
+                continue
 
             # We use the node object for the visited set
             if node in visited:
                 logger.debug("%s (Ref: %s)", indent, node.var)
-                return
+                continue
             visited.add(node)
 
             logger.debug("%s Node [Var: %s]", indent, node.var)
             # Safe access: only internal nodes have children
-            _dump(node.low, indent + "  Low: ")
-            _dump(node.high, indent + " High: ")
-
-        logger.debug("Exploring BDD (Root: %s)", self.root)
-        _dump(self.root)
+            stack.append((node.high, indent + " High: "))
+            stack.append((node.low, indent + "  Low: "))
 
     def save_bdd(self,
                  path: str,
@@ -1,5 +1,14 @@
 from .txtcnf import CNFLogicConnective, TextCNFNotation, TextCNFModel
 from .pl_model import PLModel
+from .node_index import BDDNodeIndex, assignment_matrix, count_dtype
 
 
-__all__ = ["CNFLogicConnective", "PLModel", "TextCNFModel", "TextCNFNotation"]
+__all__ = [
+    "BDDNodeIndex",
+    "CNFLogicConnective",
+    "PLModel",
+    "TextCNFModel",
+    "TextCNFNotation",
+    "assignment_matrix",
+    "count_dtype",
+]
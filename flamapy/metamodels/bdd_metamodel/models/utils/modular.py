@@ -0,0 +1,82 @@
+import numpy as np
+import numpy.typing as npt
+
+
+# Deterministic Miller-Rabin bases for every integer below 2^64.
+_MILLER_RABIN_BASES = (2, 3, 5, 7, 11, 13, 17, 19, 23, 29, 31, 37)
+
+# Residues are stored in int64, so a product of two residues must stay below 2^62.
+MAX_PRIME_BITS = 31
+
+
+def is_prime(number: int) -> bool:
+    """Deterministic primality test for 64-bit integers."""
+    if number < 2:  # noqa: PLR2004
+        return False
+    for base in _MILLER_RABIN_BASES:
+        if number % base == 0:
+            return number == base
+    odd, twos = number - 1, 0
+    while odd % 2 == 0:
+        odd //= 2
+        twos += 1
+    for base in _MILLER_RABIN_BASES:
+        x = pow(base, odd, number)
+        if x in (1, number - 1):
+            continue
+        for _ in range(twos - 1):
+            x = pow(x, 2, number)
+            if x == number - 1:
+                break
+        else:
+            return False
+    return True
+
+
+def prime_bits(max_terms: int) -> int:
+    """Largest prime size (in bits) such that summing `max_terms` products of two residues
+    never overflows a signed 64-bit integer."""
+    return min(MAX_PRIME_BITS, (63 - max_terms.bit_length()) // 2)
+
+
+def modular_primes(n_primes: int, bits: int) -> list[int]:
+    """Returns the `n_primes` largest primes below 2^bits."""
+    primes: list[int] = []
+    candidate = (1 << bits) - 1
+    while len(primes) < n_primes:
+        if is_prime(candidate):
+            primes.append(candidate)
+        candidate -= 2
+    return primes
+
+
+def primes_for(max_value_bits: int, max_terms: int) -> list[int]:
+    """Primes whose product exceeds 2^max_value_bits, sized to accumulate `max_terms` products
+    of residues in int64 without overflow."""
+    bits = prime_bits(max_terms)
+    return modular_primes(max_value_bits // (bits - 1) + 1, bits)
+
+
+def crt_reconstruct(residues: npt.NDArray[np.int64], primes: list[int]) -> list[int]:
+    """Reconstructs the exact non-negative integers from their residues by the Chinese
+    Remainder Theorem (Garner's mixed-radix algorithm).
+
+    `residues` has shape (len(primes), L); the result has L exact Python integers, each smaller
+    than the product of the primes.
+    """
+    digits: list[npt.NDArray[np.int64]] = []
+    for i, prime in enumerate(primes):
+        # Value of the mixed-radix prefix modulo the current prime (Horner's rule)
+        prefix = np.zeros(residues.shape[1], dtype=np.int64)
+        for j in range(i - 1, -1, -1):
+            prefix = (prefix * (primes[j] % prime) + digits[j]) % prime
+        radix = 1
+        for j in range(i):
+            radix = radix * primes[j] % prime
+        inverse = pow(radix, -1, prime)
+        digits.append((residues[i] - prefix) % prime * inverse % prime)
+
+    values = np.zeros(residues.shape[1], dtype=object)
+    for i in range(len(primes) - 1, -1, -1):
+        values = values * primes[i] + digits[i].astype(object)
+    return [int(value) for value in values]
@@ -0,0 +1,239 @@
+from typing import Any, Optional
+
+import numpy as np
+import numpy.typing as npt
+
+from flamapy.core.exceptions import FlamaException
+from flamapy.metamodels.bdd_metamodel.models.bdd_model import BDDModel
+
+
+# Largest number of variables whose counts (at most 2^n) still fit in a signed 64-bit integer.
+MAX_FIXED_WIDTH_VARS = 62
+
+# Rows of a batch of assignments evaluated at once by BDDNodeIndex.evaluate.
+EVALUATION_CHUNK = 1 << 14
+
+
+def count_dtype(n_vars: int) -> Any:
+    """Returns the NumPy dtype able to hold exact counts over `n_vars` variables.
+
+    Fixed-width int64 is used while it cannot overflow, otherwise Python big-ints (object).
+    """
+    return np.int64 if n_vars <= MAX_FIXED_WIDTH_VARS else object
+
+
+class BDDNodeIndex:
+    """Array export of the nodes reachable from a root of a BDD.
+
+    Internal nodes are numbered 0..m-1 sorted top-down by the position of their variable in
+    `vars_order`, and the TRUE terminal receives the index m (the FALSE terminal is a complemented
+    edge to TRUE). For each node it stores its level and the index and complement flag of its
+    low and high children, so engines can traverse the diagram level by level with plain indices
+    instead of dd node objects.
+    """
+
+    def __init__(self,
+                 bdd_model: BDDModel,
+                 root: Optional[Any] = None,
+                 vars_order: Optional[list[str]] = None) -> None:
+        self.bdd_model = bdd_model
+        root = bdd_model.root if root is None else root
+        self.vars_order = bdd_model.vars_order if vars_order is None else vars_order
+        self.n_vars = len(self.vars_order)
+        self.var_to_idx = {var: i for i, var in enumerate(self.vars_order)}
+
+        self.nodes: list[Any] = self._collect_nodes(root)
+        self.terminal = len(self.nodes)
+        self.positions: dict[Any, int] = {u: i for i, u in enumerate(self.nodes)}
+
+        self.level: list[int] = [self.var_to_idx[u.var] for u in self.nodes] + [self.n_vars]
+        self.low: list[int] = []
+        self.high: list[int] = []
+        self.low_neg: list[bool] = []
+        self.high_neg: list[bool] = []
+        for u in self.nodes:
+            low, low_neg = self.edge(u.low)
+            high, high_neg = self.edge(u.high)
+            self.low.append(low)
+            self.low_neg.append(low_neg)
+            self.high.append(high)
+            self.high_neg.append(high_neg)
+        self.root, self.root_neg = self.edge(root)
+        self._counts: Optional[list[int]] = None
+
+    def _collect_nodes(self, root: Any) -> list[Any]:
+        """Gets the regular internal nodes reachable from the root sorted top-down."""
+        actual_root = ~root if root.negated else root
+        if actual_root.var is None:
+            return []
+        nodes = [actual_root]
+        visited = {actual_root}
+        idx = 0
+        while idx < len(nodes):
+            u = nodes[idx]
+            idx += 1
+            for child in [u.low, u.high]:
+                act_c = ~child if child.negated else child
+                if act_c.var is not None and act_c not in visited:
+                    visited.add(act_c)
+                    nodes.append(act_c)
+        nodes.sort(key=lambda x: self.var_to_idx[x.var])
+        return nodes
+
+    def edge(self, node: Any) -> tuple[int, bool]:
+        """Returns the index and the complement flag of an edge pointing to `node`."""
+        actual = ~node if node.negated else node
+        if actual.var is None:
+            return self.terminal, bool(node.negated)
+        return self.positions[actual], bool(node.negated)
+
+    def __len__(self) -> int:
+        return len(self.nodes)
+
+    def level_slices(self) -> list[tuple[int, int]]:
+        """Returns, for each level, the (start, end) range of node indices labelled with it."""
+        slices = []
+        start = 0
+        for lvl in range(self.n_vars):
+            end = start
+            while end < self.terminal and self.level[end] == lvl:
+                end += 1
+            slices.append((start, end))
+            start = end
+        return slices
+
+    def solution_counts(self) -> list[int]:
+        """Exact number of solutions of each regular node over the variables from its level down.
+
+        The last position holds the count of the TRUE terminal (1). Computed once and cached.
+        """
+        if self._counts is None:
+            counts = [0] * len(self.nodes) + [1]
+            for u in range(len(self.nodes) - 1, -1, -1):
+                counts[u] = (self.edge_count(counts, u, self.low[u], self.low_neg[u]) +
+                             self.edge_count(counts, u, self.high[u], self.high_neg[u]))
+            self._counts = counts
+        return self._counts
+
+    def edge_count(self, counts: list[int], u_idx: int, child: int, negated: bool) -> int:
+        """Solutions below the variable of `u_idx` reachable through an edge to `child`."""
+        c_lvl = self.level[child]
+        val = counts[child]
+        if negated:
+            val = (1 << (self.n_vars - c_lvl)) - val
+        return val << (c_lvl - self.level[u_idx] - 1)
+
+    def high_probabilities(self) -> npt.NDArray[np.float64]:
+        """Probability of the high branch of each node (the fraction of its solutions that take
+        it) for edges of even (row 0) and odd (row 1) parity of complemented edges. The column of
+        the terminal holds 1/2, and nodes without solutions 0."""
+        counts = self.solution_counts()
+        p_high = np.full((2, len(self.nodes) + 1), 0.5)
+        for u in range(len(self.nodes)):
+            space = 1 << (self.n_vars - self.level[u])
+            s_high = self.edge_count(counts, u, self.high[u], self.high_neg[u])
+            # Under odd parity both the node and its branches count the complemented function
+            for parity, total, total_high in ((0, counts[u], s_high),
+                                              (1, space - counts[u], space // 2 - s_high)):
+                p_high[parity, u] = total_high / total if total > 0 else 0.0
+        return p_high
+
+    def root_count(self, counts: Optional[list[int]] = None) -> int:
+        """Exact number of solutions of the indexed function over all variables."""
+        counts = self.solution_counts() if counts is None else counts
+        r_lvl = self.level[self.root]
+        val = counts[self.root]
+        if self.root_neg:
+            val = (1 << (self.n_vars - r_lvl)) - val
+        return val << r_lvl
+
+    def count_from(self, counts: list[int], node: int, negated: bool, lvl: int) -> int:
+        """Solutions over the variables [lvl, n) of the function of an edge to `node`."""
+        val = counts[node]
+        if negated:
+            val = (1 << (self.n_vars - self.level[node])) - val
+        return val << (self.level[node] - lvl)
+
+    def branches(self, node: int, negated: bool, lvl: int) -> tuple[tuple[int, bool],
+                                                                    tuple[int, bool]]:
+        """Edges (node, complement flag) taken from an edge to `node` when the variable at `lvl`
+        is set to False and to True (the same edge if the node skips that variable)."""
+        if self.level[node] != lvl:
+            return (node, negated), (node, negated)
+        return ((self.low[node], negated != self.low_neg[node]),
+                (self.high[node], negated != self.high_neg[node]))
+
+    def unrank(self, rank: int) -> list[bool]:
+        """Values (following `vars_order`) of the solution at position `rank` of the
+        lexicographic order of the solutions, with False < True and the first variable as the
+        most significant one. It takes one pass down the diagram (O(variables))."""
+        counts = self.solution_counts()
+        if not 0 <= rank < self.root_count(counts):
+            raise FlamaException(f"Rank {rank} is out of the range of solutions.")
+        edge = (self.root, self.root_neg)
+        values = []
+        for lvl in range(self.n_vars):
+            low, high = self.branches(*edge, lvl)
+            low_count = self.count_from(counts, *low, lvl + 1)
+            value = rank >= low_count
+            if value:
+                rank -= low_count
+            edge = high if value else low
+            values.append(value)
+        return values
+
+    def rank(self, values: list[bool]) -> Optional[int]:
+        """Position of the assignment `values` (following `vars_order`) in the lexicographic
+        order of the solutions (see `unrank`), or None if it is not a solution."""
+        counts = self.solution_counts()
+        edge = (self.root, self.root_neg)
+        rank = 0
+        for lvl, value in enumerate(values):
+            low, high = self.branches(*edge, lvl)
+            if value:
+                rank += self.count_from(counts, *low, lvl + 1)
+            edge = high if value else low
+        return None if edge[1] else rank
+
+    def evaluate(self, values: npt.NDArray[Any], chunk_size: int = EVALUATION_CHUNK) -> Any:
+        """Validity mask of a batch of full assignments.
+
+        `values` has one row per assignment and one column per variable of `vars_order` (non-zero
+        for True). All the rows walk down the diagram at once, one NumPy step per level with
+        nodes, in chunks of `chunk_size` rows so the intermediate arrays stay small.
+        """
+        level = np.array(self.level, dtype=np.int32)
+        low = np.array([*self.low, self.terminal], dtype=np.int32)
+        high = np.array([*self.high, self.terminal], dtype=np.int32)
+        low_neg = np.array([*self.low_neg, False])
+        high_neg = np.array([*self.high_neg, False])
+        levels = [lvl for lvl, (start, end) in enumerate(self.level_slices()) if start < end]
+
+        valid = np.zeros(len(values), dtype=bool)
+        for start in range(0, len(values), chunk_size):
+            # Column-major copy, so each level reads a contiguous column
+            chunk = np.asfortranarray(values[start:start + chunk_size] != 0)
+            node = np.full(len(chunk), self.root, dtype=np.int32)
+            negated = np.full(len(chunk), self.root_neg)
+            for lvl in levels:
+                rows = (level[node] == lvl).nonzero()[0]
+                current = node[rows]
+                taken = chunk[rows, lvl]
+                node[rows] = np.where(taken, high[current], low[current])
+                negated[rows] ^= np.where(taken, high_neg[current], low_neg[current])
+            valid[start:start + chunk_size] = ~negated
+        return valid
+
+
+def assignment_matrix(vars_order: list[str],
+                      assignments: list[dict[str, bool]]) -> npt.NDArray[np.int8]:
+    """Encodes partial assignments as a (len(assignments), len(vars_order)) int8 matrix.
+
+    Each cell is 1 (selected), 0 (deselected) or -1 (unassigned).
+    """
+    var_to_idx = {var: i for i, var in enumerate(vars_order)}
+    matrix = np.full((len(assignments), len(vars_order)), -1, dtype=np.int8)
+    for row, assignment in enumerate(assignments):
+        for var, value in assignment.items():
+            matrix[row, var_to_idx[var]] = 1 if value else 0
+    return matrix
@@ -1,8 +1,15 @@
 from .bdd_configurations_number import BDDConfigurationsNumber
 from .bdd_configurations import BDDConfigurations
 from .bdd_sampling import BDDSampling
+from .bdd_t_wise_sampling import BDDTWiseSampling
+from .bdd_t_wise_coverage import BDDTWiseCoverage
 from .bdd_product_distribution import BDDProductDistribution
+from .bdd_attribute_distribution import BDDAttributeDistribution
 from .bdd_feature_inclusion_probability import BDDFeatureInclusionProbability
+from .bdd_feature_co_occurrence import BDDFeatureCoOccurrence
+from .bdd_batch_configurations_number import BDDBatchConfigurationsNumber
+from .bdd_batch_feature_inclusion_probability import BDDBatchFeatureInclusionProbability
+from .bdd_weighted_model_counting import BDDWeightedModelCounting
 from .bdd_satisfiable import BDDSatisfiable
 from .bdd_core_features import BDDCoreFeatures
 from .bdd_dead_features import BDDDeadFeatures
@@ -14,27 +21,45 @@ from .bdd_commonality_factor import BDDCommonalityFactor
 from .bdd_homogeneity import BDDHomogeneity
 from .bdd_metrics import BDDMetrics
 from .bdd_satisfiable_configuration import BDDSatisfiableConfiguration
+from .bdd_batch_satisfiable_configuration import BDDBatchSatisfiableConfiguration
 from .bdd_false_optional_features import BDDFalseOptionalFeatures
 from .bdd_configurations_with_n_features import BDDConfigurationsWithNFeatures
+from .bdd_configuration_ranking import BDDConfigurationRank, BDDConfigurationUnrank
+from .bdd_configurator_session import BDDConfiguratorSession
+from .bdd_optimal_configuration import BDDOptimalConfiguration
+from .bdd_top_k_configurations import BDDTopKConfigurations
 
 
 __all__ = [
+    "BDDAttributeDistribution",
+    "BDDBatchConfigurationsNumber",
+    "BDDBatchFeatureInclusionProbability",
+    "BDDBatchSatisfiableConfiguration",
     "BDDCommonalityFactor",
+    "BDDConfigurationRank",
+    "BDDConfigurationUnrank",
     "BDDConfigurations",
     "BDDConfigurationsNumber",
     "BDDConfigurationsWithNFeatures",
+    "BDDConfiguratorSession",
     "BDDCoreFeatures",
     "BDDDeadFeatures",
     "BDDFalseOptionalFeatures",
+    "BDDFeatureCoOccurrence",
     "BDDFeatureInclusionProbability",
     "BDDHomogeneity",
     "BDDMetrics",
+    "BDDOptimalConfiguration",
     "BDDProductDistribution",
     "BDDPureOptionalFeatures",
     "BDDSampling",
     "BDDSatisfiable",
     "BDDSatisfiableConfiguration",
+    "BDDTWiseCoverage",
+    "BDDTWiseSampling",
+    "BDDTopKConfigurations",
     "BDDUniqueFeatures",
     "BDDVariability",
-    "BDDVariantFeatures"
+    "BDDVariantFeatures",
+    "BDDWeightedModelCounting"
 ]
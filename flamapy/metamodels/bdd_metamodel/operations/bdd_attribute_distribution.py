@@ -0,0 +1,197 @@
+from typing import Any, Optional, cast
+
+from flamapy.core.models import VariabilityModel
+from flamapy.core.operations import Operation
+from flamapy.metamodels.configuration_metamodel.models import Configuration
+from flamapy.metamodels.bdd_metamodel.models import BDDModel
+from flamapy.metamodels.bdd_metamodel.models.utils import BDDNodeIndex
+from flamapy.metamodels.bdd_metamodel.operations.bdd_product_distribution import (
+    frequency_statistics,
+)
+
+
+# Sparse polynomial sum(count * z^value): value of the attribute -> number of solutions.
+Polynomial = dict[int, int]
+
+# Moments of the attribute over a set of solutions: (count, sum, sum of squares).
+Moments = tuple[Any, Any, Any]
+
+
+class BDDAttributeDistribution(Operation):
+    """It computes the distribution of the sum of an integer attribute of the features across
+    the products: how many products have each possible value of the attribute.
+
+    The attribute is given as an integer weight per feature (features without one weigh 0), so
+    the product distribution is the case where every feature weighs 1. The result maps each
+    value to its number of products, sorted by value. It also supports a partial configuration,
+    and computing only the moments (mean and variance) without the whole distribution.
+    """
+
+    def __init__(self) -> None:
+        self._result: dict[int, int] = {}
+        self._moments: dict[str, Any] = {}
+        self._weights: dict[Any, int] = {}
+        self._moments_only: bool = False
+        self._partial_configuration: Optional[Configuration] = None
+
+    def set_weights(self, weights: dict[Any, int]) -> None:
+        self._weights = weights
+
+    def set_moments_only(self, moments_only: bool) -> None:
+        """Computes only the moments of the attribute (see `get_moments`)."""
+        self._moments_only = moments_only
+
+    def set_partial_configuration(self, partial_configuration: Optional[Configuration]) -> None:
+        self._partial_configuration = partial_configuration
+
+    def execute(self, model: VariabilityModel) -> "BDDAttributeDistribution":
+        bdd_model = cast(BDDModel, model)
+        # Handle partial configuration
+        assignment = {}
+        if self._partial_configuration is not None:
+            assignment = {bdd_model.features_vars[feat]: selected
+                          for feat, selected in self._partial_configuration.elements.items()}
+            if self._partial_configuration.is_full:
+                for feature in bdd_model.features_vars.keys():
+                    if feature not in self._partial_configuration.elements:
+                        assignment[bdd_model.features_vars[feature]] = False
+        weights = {bdd_model.features_vars[feat]: weight for feat, weight in self._weights.items()}
+        engine = AttributeDistributionEngine(bdd_model, weights, assignment)
+        self._moments = engine.moments()
+        self._result = {} if self._moments_only else engine.distribution()
+        return self
+
+    def get_result(self) -> dict[int, int]:
+        return self._result
+
+    def attribute_distribution(self) -> dict[int, int]:
+        return self.get_result()
+
+    def get_moments(self) -> dict[str, Any]:
+        """Number of products, and mean and variance of the attribute across them."""
+        return self._moments
+
+    def descriptive_statistics(self) -> dict[str, Any]:
+        return frequency_statistics(self._result.items())
+
+
+class AttributeDistributionEngine:
+    """Propagates the distribution of an integer attribute bottom-up over the node index.
+
+    The distribution of a node is a sparse polynomial over the variables from its level down, in
+    which the variable at position i contributes a factor z^w_i when selected. It is the one of
+    the product distribution (DistributionEngine) with z^w_i in place of z: skipped variables
+    multiply by (1 + z^w_i), and a complemented edge takes the polynomial of all the assignments
+    of its variables minus the one of its node.
+
+    The moments (count, sum and sum of squares of the attribute) follow the same recurrences on
+    three numbers per node, so the mean and the variance do not need the polynomials.
+    """
+
+    def __init__(self,
+                 bdd_model: BDDModel,
+                 weights: dict[str, int],
+                 assignment: Optional[dict[str, bool]] = None) -> None:
+        assignment = assignment or {}
+        root = bdd_model.bdd.let(assignment, bdd_model.root) if assignment else bdd_model.root
+        remaining_vars = [var for var in bdd_model.vars_order if var not in assignment]
+        self.index = BDDNodeIndex(bdd_model, root, remaining_vars)
+        self.weights = [weights.get(var, 0) for var in remaining_vars]
+        # Attribute of the selected features of the partial assignment
+        self.fixed = sum(weights.get(var, 0) for var, value in assignment.items() if value)
+
+    def distribution(self) -> dict[int, int]:
+        """Number of solutions for each value of the attribute, sorted by value."""
+        index = self.index
+        # full[i]: polynomial of all the assignments of the variables [i, n)
+        full: list[Polynomial] = [{0: 1}]
+        for weight in reversed(self.weights):
+            full.append(self._add_variable(full[-1], weight))
+        full.reverse()
+
+        polys: list[Polynomial] = [{}] * len(index) + [{0: 1}]
+        for u in range(len(index) - 1, -1, -1):
+            lvl = index.level[u]
+            polys[u] = dict(self._edge_poly(polys, full, index.low[u], index.low_neg[u], lvl + 1))
+            high = self._edge_poly(polys, full, index.high[u], index.high_neg[u], lvl + 1)
+            for value, count in high.items():
+                shifted = value + self.weights[lvl]
+                polys[u][shifted] = polys[u].get(shifted, 0) + count
+        root = self._edge_poly(polys, full, index.root, index.root_neg, 0)
+        return {value + self.fixed: root[value] for value in sorted(root) if root[value]}
+
+    def _edge_poly(self,
+                   polys: list[Polynomial],
+                   full: list[Polynomial],
+                   child: int,
+                   negated: bool,
+                   lvl: int) -> Polynomial:
+        """Polynomial over the variables [lvl, n) of the function of an edge to `child`."""
+        c_lvl = self.index.level[child]
+        poly = polys[child]
+        if negated:
+            poly = {value: count - poly.get(value, 0) for value, count in full[c_lvl].items()
+                    if count != poly.get(value, 0)}
+        for skipped in range(c_lvl - 1, lvl - 1, -1):
+            poly = self._add_variable(poly, self.weights[skipped])
+        return poly
+
+    @staticmethod
+    def _add_variable(poly: Polynomial, weight: int) -> Polynomial:
+        """Multiplies the polynomial by (1 + z^weight): adds a free variable."""
+        res = dict(poly)
+        for value, count in poly.items():
+            res[value + weight] = res.get(value + weight, 0) + count
+        return res
+
+    def moments(self) -> dict[str, Any]:
+        """Number of solutions, and mean, variance and standard deviation of the attribute."""
+        index = self.index
+        full: list[Moments] = [(1, 0, 0)]
+        for weight in reversed(self.weights):
+            full.append(self._add_free(full[-1], weight))
+        full.reverse()
+
+        moments: list[Moments] = [(0, 0, 0)] * len(index) + [(1, 0, 0)]
+        for u in range(len(index) - 1, -1, -1):
+            lvl = index.level[u]
+            low = self._edge_moments(moments, full, index.low[u], index.low_neg[u], lvl + 1)
+            high = self._shift(
+                self._edge_moments(moments, full, index.high[u], index.high_neg[u], lvl + 1),
+                self.weights[lvl])
+            moments[u] = (low[0] + high[0], low[1] + high[1], low[2] + high[2])
+        count, total, squares = self._shift(
+            self._edge_moments(moments, full, index.root, index.root_neg, 0), self.fixed)
+        if count == 0:
+            return {"Count": 0, "Mean": 0, "Variance": 0, "Standard deviation": 0}
+        variance = (squares * count - total * total) / (count * count)
+        return {"Count": count, "Mean": total / count, "Variance": variance,
+                "Standard deviation": variance ** 0.5}
+
+    def _edge_moments(self,
+                      moments: list[Moments],
+                      full: list[Moments],
+                      child: int,
+                      negated: bool,
+                      lvl: int) -> Moments:
+        """Moments over the variables [lvl, n) of the function of an edge to `child`."""
+        c_lvl = self.index.level[child]
+        res = moments[child]
+        if negated:
+            res = (full[c_lvl][0] - res[0], full[c_lvl][1] - res[1], full[c_lvl][2] - res[2])
+        for skipped in range(c_lvl - 1, lvl - 1, -1):
+            res = self._add_free(res, self.weights[skipped])
+        return res
+
+    @staticmethod
+    def _shift(moments: Moments, weight: int) -> Moments:
+        """Moments after adding `weight` to the attribute of every solution."""
+        count, total, squares = moments
+        return (count, total + weight * count,
+                squares + 2 * weight * total + weight * weight * count)
+
+    @classmethod
+    def _add_free(cls, moments: Moments, weight: int) -> Moments:
+        """Moments after adding a free variable: the solutions without and with it."""
+        shifted = cls._shift(moments, weight)
+        return (moments[0] + shifted[0], moments[1] + shifted[1], moments[2] + shifted[2])
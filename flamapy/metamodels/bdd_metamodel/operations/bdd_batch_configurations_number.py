@@ -0,0 +1,134 @@
+from typing import Any, Optional, cast
+
+import numpy as np
+import numpy.typing as npt
+
+from flamapy.core.models import VariabilityModel
+from flamapy.core.operations import Operation
+from flamapy.metamodels.configuration_metamodel.models import Configuration
+from flamapy.metamodels.bdd_metamodel.models import BDDModel
+from flamapy.metamodels.bdd_metamodel.models.utils import (
+    BDDNodeIndex,
+    assignment_matrix,
+    count_dtype,
+)
+
+
+class BDDBatchConfigurationsNumber(Operation):
+    """Number of solutions for a batch of partial configurations at once.
+
+    The result has one count per partial configuration, equivalent to running
+    BDDConfigurationsNumber once per partial configuration.
+    """
+
+    def __init__(self) -> None:
+        self._result: list[int] = []
+        self._partial_configurations: list[Optional[Configuration]] = []
+
+    def set_partial_configurations(self,
+                                   partial_configurations: list[Optional[Configuration]]) -> None:
+        self._partial_configurations = partial_configurations
+
+    def execute(self, model: VariabilityModel) -> "BDDBatchConfigurationsNumber":
+        bdd_model = cast(BDDModel, model)
+        assignments = []
+        for partial_configuration in self._partial_configurations:
+            assignment = {}
+            if partial_configuration is not None:
+                assignment = {bdd_model.features_vars[feat]: selected
+                              for feat, selected in partial_configuration.elements.items()}
+                if partial_configuration.is_full:
+                    for feature in bdd_model.features_vars.keys():
+                        if feature not in partial_configuration.elements:
+                            assignment[bdd_model.features_vars[feature]] = False
+            assignments.append(assignment)
+        self._result = batch_configurations_number(bdd_model, assignments)
+        return self
+
+    def get_result(self) -> list[int]:
+        return self._result
+
+    def get_configurations_number(self) -> list[int]:
+        return self.get_result()
+
+
+class BatchCountingEngine:
+    """Counts the solutions of N partial assignments in one bottom-up pass.
+
+    Instead of restricting the BDD once per assignment (`let`), the unrestricted diagram is
+    traversed once and the branches forbidden by each assignment are masked out. Counts are NumPy
+    vectors along the batch dimension (int64 while they cannot overflow, exact Python integers
+    otherwise), over the variables that each assignment leaves unassigned. Nodes below the deepest
+    assigned variable are not affected by any assignment, so they share the cached unrestricted
+    counts of the node index.
+    """
+
+    def __init__(self, index: BDDNodeIndex, assignments: npt.NDArray[np.int8]) -> None:
+        self.index = index
+        self.assignments = assignments
+        self.n_vars = index.n_vars
+        self.dtype = count_dtype(self.n_vars)
+
+        free = (assignments == -1).astype(np.int64)
+        # free_suffix[i] = number of unassigned variables in positions [i, n) of each assignment
+        self.free_suffix = np.zeros((self.n_vars + 1, len(assignments)), dtype=np.int64)
+        self.free_suffix[:-1] = np.cumsum(free[:, ::-1], axis=1)[:, ::-1].T
+        self.allow_low = (assignments != 1).T.astype(self.dtype)
+        self.allow_high = (assignments != 0).T.astype(self.dtype)
+
+        assigned_levels = np.nonzero((assignments != -1).any(axis=0))[0]
+        self.deepest = int(assigned_levels[-1]) if len(assigned_levels) > 0 else -1
+
+    def count(self) -> list[int]:
+        """Exact number of solutions of each assignment."""
+        counts = self._compute_counts()
+        total = self._edge_value(counts, 0, self.index.root, self.index.root_neg)
+        total = np.broadcast_to(np.asarray(total, dtype=self.dtype), (len(self.assignments),))
+        return [int(value) for value in total]
+
+    def _pow2(self, exponent: npt.NDArray[np.int64]) -> Any:
+        """2 ** exponent along the batch dimension, collapsing to a scalar when uniform."""
+        if not exponent.any():
+            return 1
+        if self.dtype is object:
+            return np.ones(len(exponent), dtype=object) << exponent.astype(object)
+        return np.left_shift(np.int64(1), exponent)
+
+    def _space(self, lvl: int) -> Any:
+        """Number of assignments of the variables in [lvl, n) consistent with each assignment."""
+        return self._pow2(self.free_suffix[lvl])
+
+    def _edge_value(self, counts: list[Any], from_lvl: int, child: int, negated: bool) -> Any:
+        """Solutions over [from_lvl, n) through an edge to `child` (skipped variables included)."""
+        c_lvl = self.index.level[child]
+        val = self._space(c_lvl) - counts[child] if negated else counts[child]
+        return val * self._pow2(self.free_suffix[from_lvl] - self.free_suffix[c_lvl])
+
+    def _compute_counts(self) -> list[Any]:
+        """Bottom-up step: solutions of each node under each assignment."""
+        index = self.index
+        shared = index.solution_counts()
+        counts: list[Any] = [0] * len(index) + [1]
+        for u in range(len(index) - 1, -1, -1):
+            lvl = index.level[u]
+            if lvl > self.deepest:
+                counts[u] = shared[u]
+                continue
+            counts[u] = (
+                self.allow_low[lvl] * self._edge_value(counts, lvl + 1, index.low[u],
+                                                       index.low_neg[u]) +
+                self.allow_high[lvl] * self._edge_value(counts, lvl + 1, index.high[u],
+                                                        index.high_neg[u])
+            )
+        return counts
+
+
+def batch_configurations_number(bdd_model: BDDModel,
+                                assignments: list[dict[str, bool]]) -> list[int]:
+    """Returns the number of solutions of the model under each partial assignment (over the
+    variables it leaves unassigned)."""
+    if not assignments:
+        return []
+    index = BDDNodeIndex(bdd_model)
+    matrix = assignment_matrix(bdd_model.vars_order, assignments)
+    return BatchCountingEngine(index, matrix).count()
@@ -0,0 +1,142 @@
+from typing import Any, Optional, cast
+
+import numpy as np
+import numpy.typing as npt
+
+from flamapy.core.models import VariabilityModel
+from flamapy.core.operations import Operation
+from flamapy.metamodels.configuration_metamodel.models.configuration import Configuration
+from flamapy.metamodels.bdd_metamodel.models import BDDModel
+from flamapy.metamodels.bdd_metamodel.models.utils import BDDNodeIndex, assignment_matrix
+from flamapy.metamodels.bdd_metamodel.operations.bdd_batch_configurations_number import (
+    BatchCountingEngine,
+)
+
+
+class BDDBatchFeatureInclusionProbability(Operation):
+    """Feature Inclusion Probability (FIP) for a batch of partial configurations at once.
+
+    The result is a matrix with one row per partial configuration and one column per feature
+    (in the order given by `get_features`), equivalent to running
+    BDDFeatureInclusionProbability once per partial configuration.
+    """
+
+    def __init__(self) -> None:
+        self._result: npt.NDArray[np.float64] = np.zeros((0, 0))
+        self._features: list[Any] = []
+        self._partial_configurations: list[Optional[Configuration]] = []
+
+    def set_partial_configurations(self,
+                                   partial_configurations: list[Optional[Configuration]]) -> None:
+        self._partial_configurations = partial_configurations
+
+    def execute(self, model: VariabilityModel) -> "BDDBatchFeatureInclusionProbability":
+        bdd_model = cast(BDDModel, model)
+        assignments = []
+        for partial_configuration in self._partial_configurations:
+            assignment = {}
+            if partial_configuration is not None:
+                assignment = {bdd_model.features_vars[feat]: selected
+                              for feat, selected in partial_configuration.elements.items()}
+                if partial_configuration.is_full:
+                    for feature in bdd_model.features_vars.keys():
+                        if feature not in partial_configuration.elements:
+                            assignment[bdd_model.features_vars[feature]] = False
+            assignments.append(assignment)
+        self._features = [bdd_model.vars_features[var] for var in bdd_model.vars_order]
+        self._result = batch_feature_inclusion_probabilities(bdd_model, assignments)
+        return self
+
+    def get_result(self) -> npt.NDArray[np.float64]:
+        return self._result
+
+    def get_features(self) -> list[Any]:
+        return self._features
+
+    def feature_inclusion_probabilities(self) -> list[dict[Any, float]]:
+        return [dict(zip(self._features, row.tolist())) for row in self._result]
+
+
+class BatchFeatureInclusionEngine(BatchCountingEngine):
+    """Computes the FIP of N partial assignments in one bottom-up and one top-down pass.
+
+    The bottom-up pass is the one of BatchCountingEngine; the top-down pass propagates the path
+    weights of every node along the batch dimension.
+    """
+
+    def run(self) -> npt.NDArray[np.float64]:
+        counts = self._compute_counts()
+        total = self._edge_value(counts, 0, self.index.root, self.index.root_neg)
+        sol_total, sol_high = self._compute_path_counts(counts)
+        return self._build_final_probabilities(total, sol_total, sol_high)
+
+    def _compute_path_counts(self, counts: list[Any]) -> tuple[list[Any], list[Any]]:
+        """Top-down step: solutions passing through the nodes of each variable (and their high
+        branch), propagating path weights with parity for complemented edges."""
+        index = self.index
+        w_plus: list[Any] = [0] * len(index)
+        w_minus: list[Any] = [0] * len(index)
+        if index.root != index.terminal:
+            weight = self._pow2(self.free_suffix[0] - self.free_suffix[index.level[index.root]])
+            if index.root_neg:
+                w_minus[index.root] = weight
+            else:
+                w_plus[index.root] = weight
+
+        sol_total: list[Any] = [0] * self.n_vars
+        sol_high: list[Any] = [0] * self.n_vars
+        for u in range(len(index)):
+            lvl = index.level[u]
+            wp, wm = w_plus[u], w_minus[u]
+            sol_total[lvl] = sol_total[lvl] + wp * counts[u] + wm * (self._space(lvl) - counts[u])
+            s_high = self._edge_value(counts, lvl + 1, index.high[u], index.high_neg[u])
+            sol_high[lvl] = sol_high[lvl] + self.allow_high[lvl] * (
+                wp * s_high + wm * (self._space(lvl + 1) - s_high))
+
+            branches = ((index.low[u], index.low_neg[u], self.allow_low[lvl]),
+                        (index.high[u], index.high_neg[u], self.allow_high[lvl]))
+            for child, negated, allow in branches:
+                if child == index.terminal:
+                    continue
+                factor = allow * self._pow2(self.free_suffix[lvl + 1] -
+                                            self.free_suffix[index.level[child]])
+                if negated:
+                    w_plus[child] = w_plus[child] + wm * factor
+                    w_minus[child] = w_minus[child] + wp * factor
+                else:
+                    w_plus[child] = w_plus[child] + wp * factor
+                    w_minus[child] = w_minus[child] + wm * factor
+        return sol_total, sol_high
+
+    def _build_final_probabilities(self,
+                                   total: Any,
+                                   sol_total: list[Any],
+                                   sol_high: list[Any]) -> npt.NDArray[np.float64]:
+        """Applies the FIP formula for every variable and assignment.
+
+        Solutions that skip a variable are split evenly between its two values.
+        """
+        n_batch = len(self.assignments)
+        total = np.broadcast_to(np.asarray(total, dtype=self.dtype), (n_batch,))
+        safe_total = np.where(total == 0, 1, total)
+        probs = np.zeros((self.n_vars, n_batch), dtype=np.float64)
+        for var in range(self.n_vars):
+            count_v1 = sol_high[var] + (total - sol_total[var]) // 2
+            probs[var] = np.asarray(count_v1 / safe_total, dtype=np.float64)
+        result = np.where(self.assignments == -1, probs.T, self.assignments.astype(np.float64))
+        result[total == 0] = 0.0
+        return cast(npt.NDArray[np.float64], result)
+
+
+def batch_feature_inclusion_probabilities(bdd_model: BDDModel,
+                                          assignments: list[dict[str, bool]]
+                                          ) -> npt.NDArray[np.float64]:
+    """Returns a (len(assignments), len(vars_order)) matrix with the FIP of each variable under
+    each partial assignment."""
+    n_vars = len(bdd_model.vars_order)
+    if not assignments:
+        return np.zeros((0, n_vars), dtype=np.float64)
+    index = BDDNodeIndex(bdd_model)
+    matrix = assignment_matrix(bdd_model.vars_order, assignments)
+    engine = BatchFeatureInclusionEngine(index, matrix)
+    return engine.run()
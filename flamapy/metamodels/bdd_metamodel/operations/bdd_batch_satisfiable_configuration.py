@@ -0,0 +1,95 @@
+import csv
+import pathlib
+from typing import Any, Optional, cast
+
+import numpy as np
+import numpy.typing as npt
+
+from flamapy.core.models import VariabilityModel
+from flamapy.core.operations import Operation
+from flamapy.core.exceptions import FlamaException
+from flamapy.metamodels.configuration_metamodel.models import Configuration
+from flamapy.metamodels.bdd_metamodel.models import BDDModel
+from flamapy.metamodels.bdd_metamodel.models.utils import BDDNodeIndex
+
+
+class BDDBatchSatisfiableConfiguration(Operation):
+    """Validity of a batch of full configurations at once.
+
+    The configurations are given as a boolean matrix with one row per configuration and one
+    column per feature, as a list of configurations, or as a file (see
+    `read_configuration_matrix`). Features missing from the columns are deselected. The result is
+    a boolean mask with one value per configuration, equivalent to running
+    BDDSatisfiableConfiguration once per full configuration.
+    """
+
+    def __init__(self) -> None:
+        self._result: npt.NDArray[np.bool_] = np.zeros(0, dtype=bool)
+        self._matrix: npt.NDArray[Any] = np.zeros((0, 0), dtype=np.uint8)
+        self._features: Optional[list[Any]] = None
+
+    def set_matrix(self, matrix: npt.NDArray[Any], features: Optional[list[Any]] = None) -> None:
+        """Configurations as a matrix (non-zero cells are selected features). Columns follow
+        `features`, by default the features of the model in the order of `vars_order`."""
+        self._matrix = matrix
+        self._features = features
+
+    def set_configurations(self, configurations: list[Configuration]) -> None:
+        features = list(dict.fromkeys(f for config in configurations for f in config.elements))
+        matrix = np.zeros((len(configurations), len(features)), dtype=np.uint8)
+        columns = {feature: i for i, feature in enumerate(features)}
+        for row, config in enumerate(configurations):
+            for feature in config.get_selected_elements():
+                matrix[row, columns[feature]] = 1
+        self.set_matrix(matrix, features)
+
+    def set_file(self, path: str) -> None:
+        self.set_matrix(*read_configuration_matrix(path))
+
+    def execute(self, model: VariabilityModel) -> "BDDBatchSatisfiableConfiguration":
+        bdd_model = cast(BDDModel, model)
+        self._result = are_satisfiable(bdd_model, self._matrix, self._features)
+        return self
+
+    def get_result(self) -> npt.NDArray[np.bool_]:
+        return self._result
+
+    def are_satisfiable(self) -> npt.NDArray[np.bool_]:
+        return self.get_result()
+
+
+def are_satisfiable(bdd_model: BDDModel,
+                    matrix: npt.NDArray[Any],
+                    features: Optional[list[Any]] = None) -> npt.NDArray[np.bool_]:
+    """Validity mask of the full configurations in the rows of `matrix`."""
+    if features is not None:
+        unknown = [feature for feature in features if feature not in bdd_model.features_vars]
+        if unknown:
+            raise FlamaException(f"Features not in the model: {unknown}")
+        var_to_pos = {var: i for i, var in enumerate(bdd_model.vars_order)}
+        columns = [var_to_pos[bdd_model.features_vars[feature]] for feature in features]
+        values = np.zeros((len(matrix), len(bdd_model.vars_order)), dtype=np.uint8)
+        values[:, columns] = matrix != 0
+        matrix = values
+    elif matrix.shape[1] != len(bdd_model.vars_order):
+        raise FlamaException(f"Expected {len(bdd_model.vars_order)} columns, got "
+                             f"{matrix.shape[1]}.")
+    return cast(npt.NDArray[np.bool_], BDDNodeIndex(bdd_model).evaluate(matrix))
+
+
+def read_configuration_matrix(path: str) -> tuple[npt.NDArray[np.uint8], Optional[list[Any]]]:
+    """Reads a file of full configurations.
+
+    A `.npy` file holds the matrix itself, with the columns in the order of `vars_order`. Any other
+    file is read as CSV: a header row with the feature names and one row of 0/1 values per
+    configuration.
+    """
+    file_path = pathlib.Path(path)
+    if not file_path.is_file():
+        raise FlamaException(f"Configuration file not found: {path}")
+    if file_path.suffix == '.npy':
+        return np.load(file_path).astype(np.uint8, copy=False), None
+    with open(file_path, 'r', encoding='utf-8') as csvfile:
+        features = next(csv.reader(csvfile))
+        matrix = np.loadtxt(csvfile, delimiter=',', dtype=np.uint8, ndmin=2)
+    return matrix.reshape(-1, len(features)), features
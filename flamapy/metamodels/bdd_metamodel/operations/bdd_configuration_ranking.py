@@ -0,0 +1,129 @@
+from typing import Any, Optional, cast
+
+from flamapy.core.models import VariabilityModel
+from flamapy.core.operations import Operation
+from flamapy.core.exceptions import FlamaException
+from flamapy.metamodels.configuration_metamodel.models import Configuration
+from flamapy.metamodels.bdd_metamodel.models import BDDModel
+from flamapy.metamodels.bdd_metamodel.models.utils import BDDNodeIndex
+
+
+class _RankingOperation(Operation):
+    """Common state of the ranking operations: the (partial configuration) restriction and the
+    node index with its solution counts, kept between executions on the same model and partial
+    configuration so each rank or unrank only takes a pass down the diagram."""
+
+    def __init__(self) -> None:
+        self._partial_configuration: Optional[Configuration] = None
+        self._ranking: Optional[ConfigurationRanking] = None
+
+    def set_partial_configuration(self, partial_configuration: Optional[Configuration]) -> None:
+        self._partial_configuration = partial_configuration
+
+    def _get_ranking(self, bdd_model: BDDModel) -> "ConfigurationRanking":
+        assignment = {}
+        if self._partial_configuration is not None:
+            assignment = {bdd_model.features_vars[feat]: selected
+                          for feat, selected in self._partial_configuration.elements.items()}
+            if self._partial_configuration.is_full:
+                for feature in bdd_model.features_vars.keys():
+                    if feature not in self._partial_configuration.elements:
+                        assignment[bdd_model.features_vars[feature]] = False
+        ranking = self._ranking
+        if ranking is None or not ranking.restricts(bdd_model, assignment):
+            ranking = ConfigurationRanking(bdd_model, assignment)
+            self._ranking = ranking
+        return ranking
+
+
+class BDDConfigurationRank(_RankingOperation):
+    """It computes the position of a configuration in the lexicographic order of the solutions of
+    the BDD model (following `vars_order`, with deselected before selected).
+
+    Features missing from the configuration are considered deselected. The result is None if the
+    configuration is not a solution. With a partial configuration, the position is among the
+    solutions that extend it.
+    """
+
+    def __init__(self) -> None:
+        super().__init__()
+        self._result: Optional[int] = None
+        self._configuration: Optional[Configuration] = None
+
+    def set_configuration(self, configuration: Configuration) -> None:
+        self._configuration = configuration
+
+    def execute(self, model: VariabilityModel) -> "BDDConfigurationRank":
+        bdd_model = cast(BDDModel, model)
+        if self._configuration is None:
+            raise FlamaException("Configuration not set.")
+        self._result = self._get_ranking(bdd_model).rank(self._configuration)
+        return self
+
+    def get_result(self) -> Optional[int]:
+        return self._result
+
+    def configuration_rank(self) -> Optional[int]:
+        return self.get_result()
+
+
+class BDDConfigurationUnrank(_RankingOperation):
+    """It obtains the configuration at a given position of the lexicographic order of the
+    solutions of the BDD model (the inverse of BDDConfigurationRank).
+
+    With a partial configuration, the position is among the solutions that extend it.
+    """
+
+    def __init__(self) -> None:
+        super().__init__()
+        self._result: Optional[Configuration] = None
+        self._rank: int = 0
+
+    def set_rank(self, rank: int) -> None:
+        self._rank = rank
+
+    def execute(self, model: VariabilityModel) -> "BDDConfigurationUnrank":
+        bdd_model = cast(BDDModel, model)
+        self._result = self._get_ranking(bdd_model).unrank(self._rank)
+        return self
+
+    def get_result(self) -> Optional[Configuration]:
+        return self._result
+
+    def configuration(self) -> Optional[Configuration]:
+        return self.get_result()
+
+
+class ConfigurationRanking:
+    """Bijection between the solutions of a BDD model that extend a partial assignment and the
+    integers in [0, number of solutions), in lexicographic order over the unassigned variables.
+
+    The node index and its solution counts are computed once; each rank or unrank takes
+    O(variables).
+    """
+
+    def __init__(self, bdd_model: BDDModel, assignment: Optional[dict[str, bool]] = None):
+        self.bdd_model = bdd_model
+        self.assignment = assignment or {}
+        root = bdd_model.root
+        if self.assignment:
+            root = bdd_model.bdd.let(self.assignment, root)
+        self.remaining_vars = [v for v in bdd_model.vars_order if v not in self.assignment]
+        self.index = BDDNodeIndex(bdd_model, root, self.remaining_vars)
+
+    def restricts(self, bdd_model: BDDModel, assignment: dict[str, bool]) -> bool:
+        """Whether this ranking is the one of `bdd_model` under `assignment`."""
+        return self.bdd_model is bdd_model and self.assignment == assignment
+
+    def rank(self, configuration: Configuration) -> Optional[int]:
+        values = {var: bool(configuration.elements.get(feature, False))
+                  for var, feature in self.bdd_model.vars_features.items()}
+        if any(values[var] != value for var, value in self.assignment.items()):
+            return None
+        return self.index.rank([values[var] for var in self.remaining_vars])
+
+    def unrank(self, rank: int) -> Configuration:
+        values: dict[str, Any] = dict(self.assignment)
+        values.update(zip(self.remaining_vars, self.index.unrank(rank)))
+        return Configuration({self.bdd_model.vars_features[var]: values[var]
+                              for var in self.bdd_model.vars_order})
@@ -1,32 +1,90 @@
-from typing import Optional, cast
+import functools
+import itertools
+from enum import Enum
+from typing import Any, Callable, Generator, Iterator, Optional, cast
+
+import numpy as np
 
 from flamapy.core.models import VariabilityModel
 from flamapy.core.operations import Configurations
 from flamapy.metamodels.configuration_metamodel.models import Configuration
 from flamapy.metamodels.bdd_metamodel.models import BDDModel
+from flamapy.metamodels.bdd_metamodel.models.utils import BDDNodeIndex
+
+
+class ConfigurationFormat(Enum):
+    """Output formats of the solutions enumerated by BDDConfigurations."""
+
+    CONFIGURATION = "configuration"  # Configuration objects
+    PACKED = "packed"  # np.packbits of the 0/1 values following `vars_order`
+    INTEGER = "integer"  # int whose bit i is the value of the i-th variable of `vars_order`
 
 
 class BDDConfigurations(Configurations):
     """It computes all the solutions of a BDD model.
 
     It also supports the computation of all solutions from a partial configuration.
+    Solutions are enumerated in the lexicographic order of `vars_order` (deselected before
+    selected), so they can be paginated with an offset and a limit: the skipped solutions are
+    never generated, whole sub-diagrams are jumped over by their counts. In lazy mode, execute
+    only prepares a generator (see `get_stream`) that holds a single path of the diagram at a
+    time, so streaming any number of solutions takes constant memory. `get_result` still works
+    in lazy mode: it generates the whole list on its first call.
     """
 
     def __init__(self) -> None:
-        self._result: list[Configuration] = []
+        self._result: list[Any] = []
+        self._stream: Optional[Iterator[Any]] = None
+        self._pending: Optional[Callable[[], Iterator[Any]]] = None
         self._partial_configuration: Optional[Configuration] = None
+        self._offset: int = 0
+        self._limit: Optional[int] = None
+        self._lazy: bool = False
+        self._output_format: ConfigurationFormat = ConfigurationFormat.CONFIGURATION
 
     def set_partial_configuration(self, partial_configuration: Configuration) -> None:
         self._partial_configuration = partial_configuration
 
+    def set_offset(self, offset: int) -> None:
+        """Skips the first `offset` solutions."""
+        self._offset = offset
+
+    def set_limit(self, limit: Optional[int]) -> None:
+        """Returns at most `limit` solutions (all of them with None)."""
+        self._limit = limit
+
+    def set_lazy(self, lazy: bool) -> None:
+        """Generates the solutions on demand through `get_stream` instead of in a list."""
+        self._lazy = lazy
+
+    def set_output_format(self, output_format: ConfigurationFormat) -> None:
+        self._output_format = output_format
+
     def execute(self, model: VariabilityModel) -> "BDDConfigurations":
         bdd_model = cast(BDDModel, model)
-        self._result = configurations(bdd_model, self._partial_configuration)
+        generate = functools.partial(iter_configurations, bdd_model, self._partial_configuration,
+                                     self._offset, self._limit, self._output_format)
+        if self._lazy:
+            self._result = []
+            self._stream = generate()
+            self._pending = generate
+        else:
+            self._result = list(generate())
+            self._stream = None
+            self._pending = None
         return self
 
-    def get_result(self) -> list[Configuration]:
+    def get_result(self) -> list[Any]:
+        # In lazy mode, the list is generated on demand (independently of `get_stream`)
+        if self._pending is not None:
+            self._result = list(self._pending())
+            self._pending = None
         return self._result
 
+    def get_stream(self) -> Iterator[Any]:
+        """Solutions of the last execution, generated on demand in lazy mode."""
+        return self._stream if self._stream is not None else iter(self._result)
+
     def get_configurations(self) -> list[Configuration]:
         return self.get_result()
 
@@ -34,23 +92,97 @@ class BDDConfigurations(Configurations):
 def configurations(
     bdd_model: BDDModel, partial_config: Optional[Configuration] = None
 ) -> list[Configuration]:
-    if partial_config is None:
-        u_func = bdd_model.root
-        care_vars = set(bdd_model.vars_order)
-        elements = {}
-    else:
+    return list(iter_configurations(bdd_model, partial_config))
+
+
+def iter_configurations(bdd_model: BDDModel,
+                        partial_config: Optional[Configuration] = None,
+                        offset: int = 0,
+                        limit: Optional[int] = None,
+                        output_format: ConfigurationFormat = ConfigurationFormat.CONFIGURATION
+                        ) -> Generator[Any, None, None]:
+    """Lazily enumerates the solutions of the model (that extend the partial configuration) in
+    lexicographic order, from the `offset`-th one and at most `limit` of them.
+
+    Configurations hold the selected features and the elements of the partial configuration.
+    """
+    values: dict[str, bool] = {}
+    elements: dict[Any, bool] = {}
+    if partial_config is not None:
         values = {bdd_model.features_vars[f]: selected
                   for f, selected in partial_config.elements.items()}
-        u_func = bdd_model.bdd.let(values, bdd_model.root)
-        care_vars = set(bdd_model.vars_order) - set(values.keys())
-        elements = partial_config.elements.items()
-
-    configs = []
-    for assignment in bdd_model.bdd.pick_iter(u_func, care_vars=care_vars):
-        features = {
-            bdd_model.vars_features[f]: True for f in assignment.keys() if assignment[f]
-        }
-
-        features = features | elements
-        configs.append(Configuration(features))
-    return configs
+        if partial_config.is_full:
+            for feature, variable in bdd_model.features_vars.items():
+                if feature not in partial_config.elements:
+                    values[variable] = False
+        elements = dict(partial_config.elements)
+    u_func = bdd_model.bdd.let(values, bdd_model.root) if values else bdd_model.root
+    care_vars = [var for var in bdd_model.vars_order if var not in values]
+    index = BDDNodeIndex(bdd_model, u_func, care_vars)
+
+    var_to_pos = {var: i for i, var in enumerate(bdd_model.vars_order)}
+    positions = [var_to_pos[var] for var in care_vars]
+    template = np.zeros(len(bdd_model.vars_order), dtype=np.uint8)
+    for var, value in values.items():
+        template[var_to_pos[var]] = value
+    fixed_bits = sum(1 << var_to_pos[var] for var, value in values.items() if value)
+    features = [bdd_model.vars_features[var] for var in care_vars]
+
+    for path in _iter_solutions(index, offset, limit):
+        if output_format == ConfigurationFormat.PACKED:
+            row = template.copy()
+            row[positions] = path
+            yield np.packbits(row)
+        elif output_format == ConfigurationFormat.INTEGER:
+            yield fixed_bits + sum(1 << pos for pos, value in zip(positions, path) if value)
+        else:
+            selected = dict.fromkeys(itertools.compress(features, path), True)
+            selected.update(elements)
+            yield Configuration(selected)
+
+
+def _iter_solutions(index: BDDNodeIndex,
+                    offset: int = 0,
+                    limit: Optional[int] = None) -> Generator[list[bool], None, None]:
+    """Depth-first enumeration of the solutions of a node index in lexicographic order.
+
+    Branches without solutions are pruned, and while the first `offset` solutions are skipped
+    whole branches are jumped over by their counts, so each solution costs O(variables). The
+    yielded path is reused between solutions.
+    """
+    n_vars, level = index.n_vars, index.level
+    # Solutions of the function of an edge (node, complemented) over the variables from its level
+    counts = index.solution_counts()
+    edge_counts = (counts, [(1 << (n_vars - lvl)) - count for lvl, count in zip(level, counts)])
+    to_skip = max(offset, 0)
+    if to_skip >= index.root_count(counts):
+        return
+
+    remaining = -1 if limit is None else limit
+    path: list[bool] = []
+    # Pending branches: (node, complement flag, level, value given to the previous variable)
+    stack = [(index.root, index.root_neg, 0, False)]
+    while stack and remaining != 0:
+        node, negated, lvl, value = stack.pop()
+        if lvl:
+            del path[lvl - 1:]
+            path.append(value)
+        if lvl == n_vars:
+            yield path
+            remaining -= 1
+            continue
+
+        if level[node] == lvl:
+            low = (index.low[node], negated != index.low_neg[node])
+            high = (index.high[node], negated != index.high_neg[node])
+        else:
+            low = high = (node, negated)
+        low_count = edge_counts[low[1]][low[0]] << (level[low[0]] - lvl - 1)
+        # The low branch is explored first, so it is pushed last
+        if to_skip >= low_count:
+            to_skip -= low_count
+            stack.append((*high, lvl + 1, True))
+        else:
+            if edge_counts[high[1]][high[0]] > 0:
+                stack.append((*high, lvl + 1, True))
+            stack.append((*low, lvl + 1, False))
@@ -1,25 +1,54 @@
-from typing import cast, Any, Generator
+from typing import cast, Generator, Optional
+
+import numpy as np
+import numpy.typing as npt
 
 from flamapy.core.models import VariabilityModel
 from flamapy.core.operations import Operation
 from flamapy.metamodels.configuration_metamodel.models import Configuration
 from flamapy.metamodels.bdd_metamodel.models import BDDModel
+from flamapy.metamodels.bdd_metamodel.models.utils import BDDNodeIndex
 from flamapy.metamodels.bdd_metamodel.operations.bdd_product_distribution import DistributionEngine
 
 
 class BDDConfigurationsWithNFeatures(Operation):
-    """Operation to get all configurations with exactly n selected features from a BDD model."""
+    """Operation to get all configurations with exactly n selected features from a BDD model.
+
+    It also supports a range [n_features, max_n_features] of selected features, and
+    configurations that extend a partial configuration (whose selected features are counted).
+    Configurations are keyed by the BDD variables and include the assigned ones.
+    """
 
     def __init__(self) -> None:
         self._result: Generator[Configuration, None, None]
         self.n_features: int = 0
+        self.max_n_features: Optional[int] = None
+        self._partial_configuration: Optional[Configuration] = None
 
     def set_n_features(self, n_features: int) -> None:
         self.n_features = n_features
+        self.max_n_features = None
+
+    def set_n_features_range(self, min_n_features: int, max_n_features: int) -> None:
+        self.n_features = min_n_features
+        self.max_n_features = max_n_features
+
+    def set_partial_configuration(self, partial_configuration: Optional[Configuration]) -> None:
+        self._partial_configuration = partial_configuration
 
     def execute(self, model: VariabilityModel) -> "BDDConfigurationsWithNFeatures":
         bdd_model = cast(BDDModel, model)
-        self._result = get_configs_with_n_features(bdd_model, self.n_features)
+        # Handle partial configuration
+        assignment = None
+        if self._partial_configuration is not None:
+            assignment = {bdd_model.features_vars[feat]: selected
+                          for feat, selected in self._partial_configuration.elements.items()}
+            if self._partial_configuration.is_full:
+                for feature in bdd_model.features_vars.keys():
+                    if feature not in self._partial_configuration.elements:
+                        assignment[bdd_model.features_vars[feature]] = False
+        self._result = get_configs_with_n_features(bdd_model, self.n_features,
+                                                   self.max_n_features, assignment)
         return self
 
     def get_result(self) -> Generator[Configuration, None, None]:
@@ -30,86 +59,91 @@ class BDDConfigurationsWithNFeatures(Operation):
 
 
 class _NFeatureConfigHelper:
-    """Private class to manage the state of generation and reduce complexity."""
-
-    def __init__(self, bdd_model: BDDModel) -> None:
-        self.bdd = bdd_model.bdd
-        self.vars_order = bdd_model.vars_order
-        self.n_vars = len(self.vars_order)
-        self.var_to_idx = {var: i for i, var in enumerate(self.vars_order)}
-
-        # Initialize the distribution engine
+    """Private class to manage the state of generation and reduce complexity.
+
+    The per-node tables of counts by number of selected features (the distributions of the
+    DistributionEngine) are computed once for the restricted diagram. From them, the prefix sums
+    of their non-zero entries tell in O(1) whether a branch still has solutions with a number of
+    selected features in the requested range, so the enumeration never enters a branch without
+    output.
+    """
+
+    def __init__(self, bdd_model: BDDModel, assignment: dict[str, bool]) -> None:
+        self.bdd_model = bdd_model
+        self.assignment = assignment
+        self.remaining_vars = [var for var in bdd_model.vars_order if var not in assignment]
+        self.n_vars = len(self.remaining_vars)
+        self.preselected = sum(1 for value in assignment.values() if value)
+
+        root = bdd_model.bdd.let(assignment, bdd_model.root) if assignment else bdd_model.root
+        self.index = BDDNodeIndex(bdd_model, root, self.remaining_vars)
+
+        # Initialize the distribution engine (its memo holds the table of every node)
         self.engine = DistributionEngine(bdd_model)
-        self.engine.run()
-
-    def get_count_at(self, node: Any, var_idx: int, k: int) -> int:
-        """Determines how many solutions exist from this point."""
-        if k < 0 or k > (self.n_vars - var_idx):
-            return 0
-
-        dist = self.engine._solve(node)
-        node_v = str(getattr(node, 'var', None))
-        node_v_idx = self.var_to_idx.get(node_v, self.n_vars)
-        skipped = node_v_idx - var_idx
-
-        final_dist = self.engine._apply_skipped(dist, skipped)
-        return final_dist[k] if k < len(final_dist) else 0
-
-    def backtrack(self, node: Any, var_idx: int, k: int,
-                  current_path: list[bool]) -> Generator[Configuration, None, None]:
-        """Recursive backtracking algorithm with pruning."""
-        if var_idx == self.n_vars:
-            if k == 0 and self.get_count_at(node, var_idx, 0) > 0:
-                yield Configuration({self.vars_order[i]: current_path[i]
-                                     for i in range(self.n_vars)})
+        self.engine.run(assignment)
+        self._supports: dict[tuple[int, bool], tuple[int, npt.NDArray[np.int64]]] = {}
+
+    def support(self, node: int, negated: bool) -> tuple[int, npt.NDArray[np.int64]]:
+        """Offset and prefix sums of the non-zero counts of the table of an edge's function."""
+        key = (node, negated)
+        if key not in self._supports:
+            node_func = self.bdd_model.bdd.true
+            if node != self.index.terminal:
+                node_func = self.index.nodes[node]
+            dist = self.engine.node_table(~node_func if negated else node_func)
+            nonzero = np.cumsum(dist.coeffs != 0, dtype=np.int64)
+            self._supports[key] = (dist.offset, np.concatenate(([0], nonzero)))
+        return self._supports[key]
+
+    def has_solutions(self, node: int, negated: bool, lvl: int, k_min: int, k_max: int) -> bool:
+        """Whether the function of an edge has solutions over the variables [lvl, n) with
+        between k_min and k_max selected features."""
+        offset, prefix = self.support(node, negated)
+        # Each skipped variable may add a selected feature
+        skipped = self.index.level[node] - lvl
+        low = max(k_min - skipped, offset) - offset
+        high = min(k_max, offset + len(prefix) - 2) - offset
+        return low <= high and prefix[high + 1] > prefix[low]
+
+    def backtrack(self, k_min: int, k_max: int) -> Generator[Configuration, None, None]:
+        """Backtracking algorithm with pruning.
+
+        The depth-first search is driven by an explicit stack instead of recursion, so the number
+        of variables of the model is not bounded by Python's recursion limit.
+        """
+        k_min, k_max = k_min - self.preselected, k_max - self.preselected
+        index = self.index
+        if k_max < 0 or not self.has_solutions(index.root, index.root_neg, 0, k_min, k_max):
             return
 
-        if self.get_count_at(node, var_idx, k) == 0:
-            return
+        current_path: list[bool] = []
+        # Pending branches: (node, complement flag, level, value given to the previous variable,
+        # number of selected features in the path)
+        stack = [(index.root, index.root_neg, 0, False, 0)]
+        while stack:
+            node, negated, lvl, value, selected = stack.pop()
+            if lvl:
+                del current_path[lvl - 1:]
+                current_path.append(value)
+            if lvl == self.n_vars:
+                yield Configuration({**self.assignment,
+                                     **dict(zip(self.remaining_vars, current_path))})
+                continue
+
+            low, high = index.branches(node, negated, lvl)
+            # The False branch is explored first, so it is pushed last
+            if self.has_solutions(*high, lvl + 1, k_min - selected - 1, k_max - selected - 1):
+                stack.append((*high, lvl + 1, True, selected + 1))
+            if self.has_solutions(*low, lvl + 1, k_min - selected, k_max - selected):
+                stack.append((*low, lvl + 1, False, selected))
 
-        node_v = str(getattr(node, 'var', None))
-        node_v_idx = self.var_to_idx.get(node_v, self.n_vars)
-
-        if node_v_idx == var_idx:
-            yield from self._handle_node_match(node, var_idx, k, current_path)
-        else:
-            yield from self._handle_skipped_var(node, var_idx, k, current_path)
-
-    def _handle_node_match(self, node: Any, var_idx: int, k: int,
-                           current_path: list[bool]) -> Generator[Configuration, None, None]:
-        """Processes when the BDD variable matches the current index."""
-        is_comp = node.negated
-        actual = ~node if is_comp else node
-        l_child = ~actual.low if is_comp else actual.low
-        h_child = ~actual.high if is_comp else actual.high
-
-        # False branch
-        current_path.append(False)
-        yield from self.backtrack(l_child, var_idx + 1, k, current_path)
-        current_path.pop()
-
-        # True branch
-        if k > 0:
-            current_path.append(True)
-            yield from self.backtrack(h_child, var_idx + 1, k - 1, current_path)
-            current_path.pop()
-
-    def _handle_skipped_var(self, node: Any, var_idx: int, k: int,
-                            current_path: list[bool]) -> Generator[Configuration, None, None]:
-        """Processes skipped variables (Don't Care)."""
-        # Try False
-        current_path.append(False)
-        yield from self.backtrack(node, var_idx + 1, k, current_path)
-        current_path.pop()
-
-        # Try True
-        if k > 0:
-            current_path.append(True)
-            yield from self.backtrack(node, var_idx + 1, k - 1, current_path)
-            current_path.pop()
 
 def get_configs_with_n_features(bdd_model: BDDModel,
-                                target_n: int) -> Generator[Configuration, None, None]:
-    """Generate configurations with exactly target_n features."""
-    helper = _NFeatureConfigHelper(bdd_model)
-    yield from helper.backtrack(bdd_model.root, 0, target_n, [])
+                                target_n: int,
+                                max_n: Optional[int] = None,
+                                assignment: Optional[dict[str, bool]] = None
+                                ) -> Generator[Configuration, None, None]:
+    """Generate configurations with exactly target_n features (between target_n and max_n if
+    given), extending the partial assignment."""
+    helper = _NFeatureConfigHelper(bdd_model, assignment or {})
+    yield from helper.backtrack(target_n, target_n if max_n is None else max_n)
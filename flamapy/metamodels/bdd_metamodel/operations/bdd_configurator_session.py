@@ -0,0 +1,192 @@
+from typing import Any, NamedTuple, Optional
+
+from flamapy.core.exceptions import FlamaException
+from flamapy.metamodels.configuration_metamodel.models import Configuration
+from flamapy.metamodels.bdd_metamodel.models import BDDModel
+
+
+class DecisionStep(NamedTuple):
+    """Changes caused by a decision (or its retraction) in a configurator session."""
+
+    implied: list[Any]  # Features that became implied (selected in every remaining solution)
+    excluded: list[Any]  # Features that became excluded (deselected in every remaining solution)
+    released: list[Any]  # Features that are no longer implied nor excluded
+    n_configurations: int  # Remaining number of solutions
+
+
+# Implied (selected, deselected) variables of a function, as bitmasks over the positions of
+# `vars_order`, or None for the unsatisfiable function.
+_Implications = Optional[tuple[int, int]]
+
+
+class BDDConfiguratorSession:
+    """Interactive configuration of a BDD model, one decision at a time.
+
+    The session keeps the current restricted root, so each decision only restricts it by one
+    variable (`let` rebuilds just the nodes above that variable). Solution counts and implied
+    variables are memoized per node of the manager: they do not depend on the decisions, so after
+    each step only the nodes created by the restriction are evaluated. Decisions are kept in an
+    undo stack with the root and the implications after each of them, so undoing is immediate.
+
+    A decision that leaves no solutions raises a FlamaException and is not applied.
+    """
+
+    def __init__(self, bdd_model: BDDModel) -> None:
+        self.bdd_model = bdd_model
+        self.bdd = bdd_model.bdd
+        self.n_vars = len(bdd_model.vars_order)
+        self.var_to_idx = {var: i for i, var in enumerate(bdd_model.vars_order)}
+        # Regular node -> (solutions over its level and below, implications, of its complement)
+        self._memo: dict[Any, tuple[int, _Implications, _Implications]] = {}
+        if bdd_model.root == self.bdd.false:
+            raise FlamaException("The model has no solutions.")
+        implied, excluded = self._implications(bdd_model.root)
+        # Undo stack: (feature, selected, root, implied mask, excluded mask) after each decision
+        self._steps: list[tuple[Any, bool, Any, int, int]] = [
+            (None, False, bdd_model.root, implied, excluded)]
+
+    @property
+    def root(self) -> Any:
+        """Root of the model restricted by the current decisions."""
+        return self._steps[-1][2]
+
+    @property
+    def decisions(self) -> dict[Any, bool]:
+        """Current decisions (feature -> selected), in the order they were taken."""
+        return {feature: selected for feature, selected, *_ in self._steps[1:]}
+
+    def decide(self, feature: Any, selected: bool = True) -> DecisionStep:
+        """Selects or deselects a feature."""
+        if feature not in self.bdd_model.features_vars:
+            raise FlamaException(f"Feature {feature} is not in the model.")
+        decisions = self.decisions
+        if feature in decisions:
+            if decisions[feature] == selected:
+                return DecisionStep([], [], [], self.count())
+            raise FlamaException(f"Feature {feature} is already decided. Retract it first.")
+        variable = self.bdd_model.features_vars[feature]
+        root = self.bdd.let({variable: selected}, self.root)
+        if root == self.bdd.false:
+            raise FlamaException(f"{'Selecting' if selected else 'Deselecting'} {feature} "
+                                 "leaves no solutions.")
+        previous = self._steps[-1]
+        self._steps.append((feature, selected, root, *self._implications(root)))
+        return self._diff(previous)
+
+    def undo(self) -> DecisionStep:
+        """Retracts the last decision."""
+        if len(self._steps) == 1:
+            raise FlamaException("There are no decisions to undo.")
+        previous = self._steps.pop()
+        return self._diff(previous)
+
+    def retract(self, feature: Any) -> DecisionStep:
+        """Retracts the decision about a feature, keeping the decisions taken after it."""
+        features = [step[0] for step in self._steps]
+        if feature not in features[1:]:
+            raise FlamaException(f"Feature {feature} is not decided.")
+        previous = self._steps[-1]
+        position = features.index(feature)
+        redo = [(step[0], step[1]) for step in self._steps[position + 1:]]
+        del self._steps[position:]
+        for later_feature, selected in redo:
+            root = self.bdd.let({self.bdd_model.features_vars[later_feature]: selected},
+                                self.root)
+            self._steps.append((later_feature, selected, root, *self._implications(root)))
+        return self._diff(previous)
+
+    def count(self) -> int:
+        """Number of solutions that extend the current decisions."""
+        root = self.root
+        count, _ = self._edge(root, 0)
+        return (count << self._level(root)) >> (len(self._steps) - 1)
+
+    def implied_features(self) -> list[Any]:
+        """Undecided features selected in every remaining solution."""
+        return self._features(self._steps[-1][3])
+
+    def excluded_features(self) -> list[Any]:
+        """Undecided features deselected in every remaining solution."""
+        return self._features(self._steps[-1][4])
+
+    def configuration(self) -> Configuration:
+        """Decided, implied and excluded features."""
+        elements = dict(self.decisions)
+        elements.update(dict.fromkeys(self.implied_features(), True))
+        elements.update(dict.fromkeys(self.excluded_features(), False))
+        return Configuration(elements)
+
+    def _diff(self, previous: tuple[Any, bool, Any, int, int]) -> DecisionStep:
+        _, _, _, old_implied, old_excluded = previous
+        _, _, _, implied, excluded = self._steps[-1]
+        # Decided features are neither implied nor excluded, but they are not released either
+        decided = sum(1 << self.var_to_idx[self.bdd_model.features_vars[feature]]
+                      for feature in self.decisions)
+        released = (old_implied | old_excluded) & ~(implied | excluded) & ~decided
+        return DecisionStep(self._features(implied & ~old_implied),
+                            self._features(excluded & ~old_excluded),
+                            self._features(released),
+                            self.count())
+
+    def _features(self, mask: int) -> list[Any]:
+        vars_order = self.bdd_model.vars_order
+        return [self.bdd_model.vars_features[vars_order[i]]
+                for i in range(mask.bit_length()) if mask >> i & 1]
+
+    def _level(self, node: Any) -> int:
+        return self.n_vars if node.var is None else self.var_to_idx[node.var]
+
+    def _implications(self, root: Any) -> tuple[int, int]:
+        implications = self._edge(root, 0)[1]
+        if implications is None:
+            raise FlamaException("The configuration has no solutions.")
+        return implications
+
+    def _edge(self, node: Any, parity: int) -> tuple[int, _Implications]:
+        """Solutions over the variables from the level of `node` and implications of the function
+        of an edge to `node` (complemented if `node.negated` differs from `parity`)."""
+        regular = ~node if node.negated else node
+        negated = bool(node.negated) != bool(parity)
+        if regular.var is None:
+            return (0, None) if negated else (1, (0, 0))
+        if regular not in self._memo:
+            self._evaluate(regular)
+        count, implications, complement_implications = self._memo[regular]
+        if negated:
+            return (1 << (self.n_vars - self._level(regular))) - count, complement_implications
+        return count, implications
+
+    def _evaluate(self, node: Any) -> None:
+        """Memoizes `node` and its descendants not seen before, bottom-up (with an explicit stack
+        so deep diagrams do not hit the recursion limit)."""
+        stack = [node]
+        while stack:
+            u = stack[-1]
+            if u in self._memo:
+                stack.pop()
+                continue
+            children = [~c if c.negated else c for c in (u.low, u.high)]
+            pending = [c for c in children if c.var is not None and c not in self._memo]
+            if pending:
+                stack.extend(pending)
+                continue
+            stack.pop()
+            self._memo[u] = self._combine(u)
+
+    def _combine(self, u: Any) -> tuple[int, _Implications, _Implications]:
+        lvl = self._level(u)
+        bit = 1 << lvl
+        count = sum(self._edge(child, 0)[0] << (self._level(child) - lvl - 1)
+                    for child in (u.low, u.high))
+        implications: list[_Implications] = []
+        for parity in (0, 1):
+            low = self._edge(u.low, parity)[1]
+            high = self._edge(u.high, parity)[1]
+            if low is None:
+                implications.append(None if high is None else (high[0] | bit, high[1]))
+            elif high is None:
+                implications.append((low[0], low[1] | bit))
+            else:
+                # Variables skipped by a branch are free in it, so they are never implied
+                implications.append((low[0] & high[0], low[1] & high[1]))
+        return count, implications[0], implications[1]
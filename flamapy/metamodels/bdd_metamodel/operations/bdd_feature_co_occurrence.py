@@ -0,0 +1,323 @@
+from typing import Any, Generator, Optional, cast
+
+import numpy as np
+import numpy.typing as npt
+
+from flamapy.core.models import VariabilityModel
+from flamapy.core.operations import Operation
+from flamapy.core.exceptions import FlamaException
+from flamapy.metamodels.configuration_metamodel.models import Configuration
+from flamapy.metamodels.bdd_metamodel.models import BDDModel
+from flamapy.metamodels.bdd_metamodel.models.utils import BDDNodeIndex
+
+
+# Maximum number of values per table of a pass (block size times nodes of the diagram)
+BLOCK_CELLS = 1 << 23
+
+
+class BDDFeatureCoOccurrence(Operation):
+    """It computes the pairwise co-occurrence of the features: for every pair of features A and
+    B, the joint inclusion probability P(A and B), the fraction of the products that select both
+    of them.
+
+    The result is a symmetric matrix whose rows and columns follow `get_features` (its diagonal
+    holds the inclusion probability of each feature), and the co-occurrence counts are the
+    probabilities times the number of products. With a threshold, only the pairs of distinct
+    features whose joint probability reaches it are kept (see `get_pairs`) and the dense matrix
+    is not built. It also supports a partial configuration.
+    """
+
+    def __init__(self) -> None:
+        self._result: Optional[npt.NDArray[np.float64]] = None
+        self._pairs: dict[tuple[Any, Any], float] = {}
+        self._features: list[Any] = []
+        self._total: int = 0
+        self._threshold: Optional[float] = None
+        self._block_size: Optional[int] = None
+        self._partial_configuration: Optional[Configuration] = None
+
+    def set_threshold(self, threshold: Optional[float]) -> None:
+        """Minimum (positive) joint probability of the pairs to keep, instead of the dense
+        matrix. None keeps the dense matrix."""
+        if threshold is not None and threshold <= 0:
+            raise FlamaException(f"Threshold {threshold} must be positive.")
+        self._threshold = threshold
+
+    def set_block_size(self, block_size: Optional[int]) -> None:
+        """Number of rows of the matrix computed per pass (by default, as many as fit in
+        BLOCK_CELLS values per table)."""
+        self._block_size = block_size
+
+    def set_partial_configuration(self, partial_configuration: Optional[Configuration]) -> None:
+        self._partial_configuration = partial_configuration
+
+    def execute(self, model: VariabilityModel) -> "BDDFeatureCoOccurrence":
+        bdd_model = cast(BDDModel, model)
+        # Handle partial configuration
+        assignment = {}
+        if self._partial_configuration is not None:
+            assignment = {bdd_model.features_vars[feat]: selected
+                          for feat, selected in self._partial_configuration.elements.items()}
+            if self._partial_configuration.is_full:
+                for feature in bdd_model.features_vars.keys():
+                    if feature not in self._partial_configuration.elements:
+                        assignment[bdd_model.features_vars[feature]] = False
+        self._features = [bdd_model.vars_features[var] for var in bdd_model.vars_order]
+        engine = CoOccurrenceEngine(bdd_model, assignment, self._block_size)
+        self._total = engine.total
+        if self._threshold is None:
+            self._result = engine.matrix()
+            self._pairs = {}
+        else:
+            self._result = None
+            self._pairs = {(self._features[i], self._features[j]): probability
+                           for i, j, probability in engine.pairs(self._threshold)}
+        return self
+
+    def get_result(self) -> Optional[npt.NDArray[np.float64]]:
+        """Dense matrix of joint probabilities (None when a threshold is set)."""
+        return self._result
+
+    def co_occurrence(self) -> Optional[npt.NDArray[np.float64]]:
+        return self.get_result()
+
+    def get_features(self) -> list[Any]:
+        return self._features
+
+    def get_configurations_number(self) -> int:
+        """Number of products (that extend the partial configuration)."""
+        return self._total
+
+    def get_pairs(self) -> dict[tuple[Any, Any], float]:
+        """Pairs of distinct features (in the order of `get_features`) whose joint probability
+        reaches the threshold, with their joint probability."""
+        return self._pairs
+
+
+class CoOccurrenceEngine:
+    """Joint inclusion probabilities of every pair of variables, a block of rows per pass.
+
+    Row i holds the probability that a product selects variable i and each other variable. The
+    rows of a block are computed together over the diagram restricted by the partial assignment,
+    and each pass processes all the nodes of a level at once with NumPy along the nodes and the
+    rows of the block.
+
+    Counts of 2k-variable models do not fit in machine integers, so the passes propagate
+    probabilities instead of counts, and none of them is a difference that could cancel:
+      - Bottom-up, the ratio of the solutions of each node (and of its complement) that select
+        the variable of the row over all its solutions. It mixes the ratios of the two branches
+        with the exact probabilities of the branches (`high_probabilities`), masks the low branch
+        at the level of the variable of the row, and halves the edges that skip it.
+      - Top-down, the probability that a random product goes through each node with a prefix
+        that agrees with the row (the prefix and the suffix of the products through a node are
+        independent), and from both the probability of selecting each variable along with the
+        one of the row, as in the feature inclusion probability.
+    The matrix is symmetric, so a block of rows only needs the columns from its first variable
+    on: the bottom-up pass stops at that variable, and the top-down pass starts there from the
+    unconditioned probabilities of the paths. The block size bounds the size of the tables, so
+    memory is linear in the size of the diagram whatever the number of variables.
+    """
+
+    def __init__(self,
+                 bdd_model: BDDModel,
+                 assignment: Optional[dict[str, bool]] = None,
+                 block_size: Optional[int] = None) -> None:
+        assignment = assignment or {}
+        self.n_vars = len(bdd_model.vars_order)
+        root = bdd_model.bdd.let(assignment, bdd_model.root) if assignment else bdd_model.root
+        remaining_vars = [var for var in bdd_model.vars_order if var not in assignment]
+        self.index = index = BDDNodeIndex(bdd_model, root, remaining_vars)
+        self.total = index.root_count()
+
+        var_to_pos = {var: i for i, var in enumerate(bdd_model.vars_order)}
+        # Positions in `vars_order` of the remaining and the selected variables
+        self.positions = np.array([var_to_pos[var] for var in remaining_vars], dtype=np.int64)
+        self.selected = np.array([var_to_pos[var] for var, value in assignment.items() if value],
+                                 dtype=np.int64)
+
+        n_nodes = len(index) + 1
+        self.level = np.array(index.level, dtype=np.int64)
+        # children[value, u] and child_neg[value, u]: edge of the low (0) or high (1) branch of u
+        self.children = np.array([[*index.low, index.terminal], [*index.high, index.terminal]],
+                                 dtype=np.int64)
+        self.child_neg = np.array([[*index.low_neg, False], [*index.high_neg, False]],
+                                  dtype=np.int64)
+        self.slices = [(lvl, start, end) for lvl, (start, end) in enumerate(index.level_slices())
+                       if start < end]
+        self._index_edges()
+        if block_size is None:
+            block_size = BLOCK_CELLS // (2 * n_nodes)
+        self.block_size = max(1, min(block_size, max(1, index.n_vars)))
+
+        # A row that conditions on nothing gives the probabilities of the paths through each
+        # node and the inclusion probability of each remaining variable
+        self.paths: Optional[npt.NDArray[np.float64]] = None
+        self.inclusion = np.zeros(index.n_vars)
+        if self.total:
+            self.inclusion = self._joint(np.array([index.n_vars]))[0]
+
+    def blocks(self) -> Generator[tuple[npt.NDArray[np.int64], npt.NDArray[np.float64]],
+                                  None, None]:
+        """Yields the indices of a block of remaining variables and their joint probabilities
+        with the remaining variables from the first of the block on (zero before it)."""
+        if not self.total:
+            return
+        for start in range(0, self.index.n_vars, self.block_size):
+            rows = np.arange(start, min(start + self.block_size, self.index.n_vars))
+            yield rows, self._joint(rows)
+
+    def matrix(self) -> npt.NDArray[np.float64]:
+        """Dense (n_vars, n_vars) matrix of joint probabilities."""
+        joint = np.zeros((self.index.n_vars, self.index.n_vars))
+        for rows, block in self.blocks():
+            joint[rows] = block
+        joint = np.triu(joint) + np.triu(joint, 1).T
+        # Variables selected in every product co-occur with each variable as often as it
+        # appears, and the deselected ones with none
+        inclusion = self._full_inclusion()
+        result = np.zeros((self.n_vars, self.n_vars))
+        result[np.ix_(self.positions, self.positions)] = joint
+        result[self.selected] = inclusion
+        result[:, self.selected] = inclusion[:, np.newaxis]
+        return result
+
+    def pairs(self, threshold: float) -> list[tuple[int, int, float]]:
+        """Pairs (i, j) of variables (positions in `vars_order`) with i < j whose joint
+        probability reaches the (positive) threshold, with their probability. Only the pairs
+        kept are stored."""
+        result: list[tuple[int, int, float]] = []
+        for rows, block in self.blocks():
+            block_rows, columns = np.nonzero(block >= threshold)
+            upper = columns > rows[block_rows]
+            first, second = rows[block_rows[upper]], columns[upper]
+            result.extend(zip(self.positions[first].tolist(), self.positions[second].tolist(),
+                              block[block_rows[upper], second].tolist()))
+        inclusion = self._full_inclusion()
+        selected = set(self.selected.tolist())
+        for i in sorted(selected):
+            for j in np.nonzero(inclusion >= threshold)[0].tolist():
+                # Pairs of two selected variables are kept once
+                if j != i and (j > i or j not in selected):
+                    result.append((min(i, j), max(i, j), float(inclusion[j])))
+        return result
+
+    def _full_inclusion(self) -> npt.NDArray[np.float64]:
+        """Inclusion probability of every variable of `vars_order`."""
+        inclusion = np.zeros(self.n_vars)
+        if self.total:
+            inclusion[self.positions] = self.inclusion
+            inclusion[self.selected] = 1.0
+        return inclusion
+
+    def _index_edges(self) -> None:
+        """Arrays of the edges of the diagram under both parities: edge 4u + 2p + v is the
+        branch v of node u under parity p, so the edges of a range of nodes are contiguous. The
+        top-down pass pulls the edges that reach the nodes of each level, sorted by their target
+        so that the contributions to each node are contiguous segments."""
+        n_edges = 4 * len(self.index)
+        parent = np.arange(n_edges) // 4
+        value = np.arange(n_edges) % 2
+        self.edge_parity = np.arange(n_edges) // 2 % 2
+        self.edge_parent = parent
+        self.edge_child = self.children[value, parent]
+        self.edge_child_parity = self.edge_parity ^ self.child_neg[value, parent]
+        p_high = self.index.high_probabilities()[self.edge_parity, parent]
+        self.edge_branch = np.where(value == 1, p_high, 1 - p_high)
+        self.edge_low = value == 0
+        self.edge_from = self.level[parent]
+        self.edge_to = self.level[self.edge_child]
+
+        targets = 2 * self.edge_child + self.edge_child_parity
+        order = np.argsort(targets, kind="stable")
+        self.pull_order = order[self.edge_child[order] != self.index.terminal]
+        sorted_targets = targets[self.pull_order]
+        # pulls[lvl]: range of `pull_order`, starts of its segments and their target nodes
+        self.pulls: dict[int, tuple[int, int, Any, Any, Any]] = {}
+        for lvl, start, end in self.slices:
+            low, high = np.searchsorted(sorted_targets, (2 * start, 2 * end))
+            segment_targets = sorted_targets[low:high]
+            starts = np.flatnonzero(np.diff(segment_targets, prepend=-1))
+            self.pulls[lvl] = (int(low), int(high), starts, segment_targets[starts] % 2,
+                               segment_targets[starts] // 2)
+
+    def _factors(self, edges: Any, rows: npt.NDArray[np.int64]) -> npt.NDArray[np.float64]:
+        """Probability of taking each edge from its node times the one that it agrees with each
+        row: 0 for the low branch at the variable of the row, and 1/2 for the edges that skip
+        it."""
+        edge_from = self.edge_from[edges][:, np.newaxis]
+        skipped = (rows > edge_from) & (rows < self.edge_to[edges][:, np.newaxis])
+        factors: npt.NDArray[np.float64] = (self.edge_branch[edges][:, np.newaxis] *
+                                            np.where(skipped, 0.5, 1.0))
+        factors[(rows == edge_from) & self.edge_low[edges][:, np.newaxis]] = 0.0
+        return factors
+
+    def _branch_ratios(self,
+                       ratios: npt.NDArray[np.float64],
+                       start: int,
+                       end: int,
+                       rows: npt.NDArray[np.int64]) -> npt.NDArray[np.float64]:
+        """(node, parity, value, row) contributions of the branches of the nodes in [start, end)
+        to their ratios."""
+        edges = slice(4 * start, 4 * end)
+        contributions: npt.NDArray[np.float64] = self._factors(edges, rows) * ratios[
+            self.edge_child_parity[edges], self.edge_child[edges]]
+        return contributions.reshape(end - start, 2, 2, len(rows))
+
+    def _joint(self, rows: npt.NDArray[np.int64]) -> npt.NDArray[np.float64]:
+        """(len(rows), n) joint probabilities of the remaining variables at positions `rows` (a
+        row equal to n conditions on nothing) with every remaining variable from the first row
+        on (zero before it)."""
+        index = self.index
+        first = 0 if self.paths is None else int(rows.min())
+        # Bottom-up step: ratios[parity, u, b] is the fraction of the solutions of (u, parity)
+        # that agree with row b (1 below the deepest row)
+        ratios = np.ones((2, len(index) + 1, len(rows)))
+        deepest = rows.max()
+        for lvl, start, end in reversed(self.slices):
+            if first <= lvl <= deepest:
+                branches = self._branch_ratios(ratios, start, end, rows)
+                ratios[:, start:end] = branches.sum(axis=2).transpose(1, 0, 2)
+
+        # Top-down step: paths[parity, u, b] is the probability of the products through
+        # (u, parity) whose prefix agrees with row b. Up to level `first` the prefixes are above
+        # all the rows, so they are the unconditioned ones
+        paths = np.zeros((2, len(index) + 1, len(rows)))
+        if self.paths is not None:
+            upto = np.searchsorted(self.level, first, side="right")
+            paths[:, :upto] = self.paths[:, :upto, np.newaxis]
+        root = (int(index.root_neg), index.root)
+        if self.paths is None or index.level[index.root] > first:
+            paths[root] = np.where(rows < index.level[index.root], 0.5, 1.0)
+        total = paths[root] * ratios[root] if self.paths is None else self.inclusion[rows]
+        through = np.zeros((index.n_vars, len(rows)))
+        high = np.zeros((index.n_vars, len(rows)))
+        for lvl, start, end in self.slices:
+            if lvl < first:
+                continue
+            if lvl > first:
+                low, upper, starts, target_parity, target_child = self.pulls[lvl]
+                edges = self.pull_order[low:upper]
+                weights = paths[self.edge_parity[edges], self.edge_parent[edges]]
+                paths[target_parity, target_child] += np.add.reduceat(
+                    weights * self._factors(edges, rows), starts, axis=0)
+            node_paths = paths[:, start:end]
+            through[lvl] = (node_paths * ratios[:, start:end]).sum(axis=(0, 1))
+            branches = self._branch_ratios(ratios, start, end, rows)
+            high[lvl] = (node_paths * branches[:, :, 1].transpose(1, 0, 2)).sum(axis=(0, 1))
+        if self.paths is None:
+            self.paths = paths[..., 0]
+
+        # Products that skip a variable select it in half of the cases
+        joint: npt.NDArray[np.float64] = (high + (total - through) / 2).T
+        joint[:, :first] = 0.0
+        conditioned = rows < index.n_vars
+        joint[conditioned, rows[conditioned]] = total[conditioned]
+        return joint
+
+
+def co_occurrence_matrix(bdd_model: BDDModel,
+                         assignment: Optional[dict[str, bool]] = None,
+                         block_size: Optional[int] = None) -> npt.NDArray[np.float64]:
+    """Returns the (len(vars_order), len(vars_order)) matrix with the probability that a
+    solution (that extends the partial assignment) selects each pair of variables."""
+    return CoOccurrenceEngine(bdd_model, assignment, block_size).matrix()
@@ -0,0 +1,162 @@
+from typing import Any, Optional, cast
+
+from flamapy.core.models import VariabilityModel
+from flamapy.core.operations import Operation
+from flamapy.metamodels.configuration_metamodel.models import Configuration
+from flamapy.metamodels.bdd_metamodel.models import BDDModel
+from flamapy.metamodels.bdd_metamodel.models.utils import BDDNodeIndex
+
+
+class BDDOptimalConfiguration(Operation):
+    """It computes a configuration of the BDD model that minimizes (or maximizes) a linear
+    objective: the sum of the weights of its selected features.
+
+    Weights can be ints, floats or Fractions; features without a weight weigh 0. It also supports
+    a partial configuration. Ties are broken towards the lexicographically smallest configuration
+    (following `vars_order`, with deselected before selected). The result is None if there are no
+    solutions.
+    """
+
+    def __init__(self) -> None:
+        self._result: Optional[Configuration] = None
+        self._value: Optional[Any] = None
+        self._weights: dict[Any, Any] = {}
+        self._maximize: bool = False
+        self._partial_configuration: Optional[Configuration] = None
+
+    def set_weights(self, weights: dict[Any, Any]) -> None:
+        self._weights = weights
+
+    def set_maximize(self, maximize: bool) -> None:
+        self._maximize = maximize
+
+    def set_partial_configuration(self, partial_configuration: Optional[Configuration]) -> None:
+        self._partial_configuration = partial_configuration
+
+    def execute(self, model: VariabilityModel) -> "BDDOptimalConfiguration":
+        bdd_model = cast(BDDModel, model)
+        # Handle partial configuration
+        assignment = {}
+        if self._partial_configuration is not None:
+            assignment = {bdd_model.features_vars[feat]: selected
+                          for feat, selected in self._partial_configuration.elements.items()}
+            if self._partial_configuration.is_full:
+                for feature in bdd_model.features_vars.keys():
+                    if feature not in self._partial_configuration.elements:
+                        assignment[bdd_model.features_vars[feature]] = False
+        weights = {bdd_model.features_vars[feat]: weight for feat, weight in self._weights.items()}
+        self._result, self._value = optimal_configuration(bdd_model, weights, self._maximize,
+                                                          assignment)
+        return self
+
+    def get_result(self) -> Optional[Configuration]:
+        return self._result
+
+    def get_value(self) -> Optional[Any]:
+        """Objective value of the optimal configuration (None if there are no solutions)."""
+        return self._value
+
+    def optimal_configuration(self) -> Optional[Configuration]:
+        return self.get_result()
+
+
+class LinearObjective:
+    """Minimum of a linear objective over the solutions of a BDD restricted by a partial
+    assignment, as a shortest path over the node index.
+
+    `best[parity][u]` is the minimum cost over the variables from the level of node u of the
+    function of an edge to u (complemented with parity 1), or None if it has no solutions. A
+    variable skipped by an edge is a free choice, so it costs the minimum of its weight and 0.
+    Both tables take one bottom-up pass, linear in the size of the diagram.
+    """
+
+    def __init__(self,
+                 bdd_model: BDDModel,
+                 weights: dict[str, Any],
+                 assignment: Optional[dict[str, bool]] = None) -> None:
+        self.bdd_model = bdd_model
+        self.assignment = assignment or {}
+        root = bdd_model.root
+        if self.assignment:
+            root = bdd_model.bdd.let(self.assignment, root)
+        self.remaining_vars = [v for v in bdd_model.vars_order if v not in self.assignment]
+        self.index = BDDNodeIndex(bdd_model, root, self.remaining_vars)
+        self.weights = [weights.get(var, 0) for var in self.remaining_vars]
+        # Cost of the selected features of the partial assignment
+        self.fixed_cost = sum((weights.get(var, 0) for var, value in self.assignment.items()
+                               if value), 0)
+        # free_prefix[i]: minimum cost of the variables [0, i) chosen freely
+        self.free_prefix = [0]
+        for weight in self.weights:
+            self.free_prefix.append(self.free_prefix[-1] + min(weight, 0))
+        self.best: tuple[list[Any], list[Any]] = ([None] * len(self.index) + [0],
+                                                  [None] * (len(self.index) + 1))
+        self._compute_best()
+
+    def _compute_best(self) -> None:
+        """Bottom-up step: fills the minimum costs of both parities of each node."""
+        index = self.index
+        for u in range(len(index) - 1, -1, -1):
+            for parity in (0, 1):
+                low, high = index.branches(u, bool(parity), index.level[u])
+                self.best[parity][u] = self.choose(index.level[u], low, high)[1]
+
+    def edge_cost(self, node: int, negated: bool, lvl: int) -> Optional[Any]:
+        """Minimum cost over the variables [lvl, n) of the function of an edge to `node`."""
+        cost = self.best[negated][node]
+        if cost is None:
+            return None
+        return cost + self.free_prefix[self.index.level[node]] - self.free_prefix[lvl]
+
+    def choose(self,
+               lvl: int,
+               low: tuple[int, bool],
+               high: tuple[int, bool]) -> tuple[bool, Optional[Any]]:
+        """Best value of the variable at `lvl` given the edges of its two branches, and the
+        minimum cost over [lvl, n). Ties choose False."""
+        low_cost = self.edge_cost(*low, lvl + 1)
+        high_cost = self.edge_cost(*high, lvl + 1)
+        if high_cost is not None:
+            high_cost += self.weights[lvl]
+        if high_cost is None or (low_cost is not None and low_cost <= high_cost):
+            return False, low_cost
+        return True, high_cost
+
+    def optimum(self) -> Optional[tuple[list[bool], Any]]:
+        """Values (following the remaining variables) and cost of the optimal solution."""
+        index = self.index
+        cost = self.edge_cost(index.root, index.root_neg, 0)
+        if cost is None:
+            return None
+        edge = (index.root, index.root_neg)
+        values = []
+        for lvl in range(index.n_vars):
+            low, high = index.branches(*edge, lvl)
+            value = self.choose(lvl, low, high)[0]
+            edge = high if value else low
+            values.append(value)
+        return values, self.fixed_cost + cost
+
+    def configuration(self, values: list[bool]) -> Configuration:
+        """Configuration with all the features, from the values of the remaining variables."""
+        full_values: dict[str, Any] = dict(self.assignment)
+        full_values.update(zip(self.remaining_vars, values))
+        return Configuration({self.bdd_model.vars_features[var]: full_values[var]
+                              for var in self.bdd_model.vars_order})
+
+
+def optimal_configuration(bdd_model: BDDModel,
+                          weights: dict[str, Any],
+                          maximize: bool = False,
+                          assignment: Optional[dict[str, bool]] = None
+                          ) -> tuple[Optional[Configuration], Optional[Any]]:
+    """Returns the configuration that minimizes (maximizes) the sum of the weights (by variable)
+    of its selected features, and that sum."""
+    if maximize:
+        weights = {var: -weight for var, weight in weights.items()}
+    objective = LinearObjective(bdd_model, weights, assignment)
+    optimum = objective.optimum()
+    if optimum is None:
+        return None, None
+    values, cost = optimum
+    return objective.configuration(values), -cost if maximize else cost
@@ -1,19 +1,88 @@
-from typing import cast, Any
+import os
+import tempfile
+from typing import cast, Any, Iterable, NamedTuple, Optional
+
+import numpy as np
+import numpy.typing as npt
 
 from flamapy.core.models import VariabilityModel
+from flamapy.metamodels.configuration_metamodel.models.configuration import Configuration
 from flamapy.metamodels.bdd_metamodel.models import BDDModel
+from flamapy.metamodels.bdd_metamodel.models.utils import BDDNodeIndex, count_dtype
+from flamapy.metamodels.bdd_metamodel.models.utils.node_index import MAX_FIXED_WIDTH_VARS
+from flamapy.metamodels.bdd_metamodel.models.utils.modular import crt_reconstruct, primes_for
 from flamapy.metamodels.bdd_metamodel.operations.interfaces import ProductDistribution
 
 
+# Alive distributions above which the memory-bounded sweep starts spilling to disk.
+SPILL_THRESHOLD = 100_000
+
+
 class BDDProductDistribution(ProductDistribution):
+    """It also supports computing the distribution from a given partial configuration.
+
+    The engine is kept between executions on the same model, so the distributions of the
+    sub-diagrams that a new partial configuration does not change are reused.
+    """
+
     def __init__(self) -> None:
         self._result: list[int] = []
+        self._modular: bool = False
+        self._partial_configuration: Optional[Configuration] = None
+        self._memory_bounded: bool = False
+        self._spill_dir: Optional[str] = None
+        self._spill_threshold: int = SPILL_THRESHOLD
+        self._engine: Optional[DistributionEngine] = None
+
+    def set_partial_configuration(self, partial_configuration: Optional[Configuration]) -> None:
+        self._partial_configuration = partial_configuration
+
+    def set_modular(self, modular: bool) -> None:
+        """Computes the distribution with native modular arithmetic and reconstructs the exact
+        counts by CRT. Faster for models whose counts have hundreds of digits."""
+        self._modular = modular
+
+    def set_memory_bounded(self, memory_bounded: bool) -> None:
+        """Computes the distribution with a level sweep that releases each node distribution as
+        soon as all its parents have consumed it, instead of memoizing all of them."""
+        self._memory_bounded = memory_bounded
+
+    def set_spill_directory(self,
+                            spill_dir: Optional[str],
+                            spill_threshold: int = SPILL_THRESHOLD) -> None:
+        """In the memory-bounded sweep, writes distributions to `spill_dir` whenever more than
+        `spill_threshold` of them are alive at once."""
+        self._spill_dir = spill_dir
+        self._spill_threshold = spill_threshold
 
     def execute(self, model: VariabilityModel) -> "BDDProductDistribution":
         bdd_model = cast(BDDModel, model)
-        self._result = product_distribution(bdd_model)
+        # Handle partial configuration
+        assignment = None
+        if self._partial_configuration is not None:
+            assignment = {bdd_model.features_vars[feat]: selected
+                          for feat, selected in self._partial_configuration.elements.items()}
+            if self._partial_configuration.is_full:
+                for feature in bdd_model.features_vars.keys():
+                    if feature not in self._partial_configuration.elements:
+                        assignment[bdd_model.features_vars[feature]] = False
+        if not self._reusable_engine(bdd_model):
+            self._engine = None
+            if bdd_model.root is not None:
+                engine_class = ModularDistributionEngine if self._modular else DistributionEngine
+                self._engine = engine_class(bdd_model, self._memory_bounded, self._spill_dir,
+                                            self._spill_threshold)
+        self._result = product_distribution(bdd_model, self._modular, assignment, self._engine)
         return self
 
+    def _reusable_engine(self, bdd_model: BDDModel) -> bool:
+        engine = self._engine
+        return (engine is not None and engine.bdd_model is bdd_model
+                and isinstance(engine, ModularDistributionEngine) == self._modular
+                and engine.memory_bounded == self._memory_bounded
+                and engine.spill_dir == self._spill_dir
+                and engine.spill_threshold == self._spill_threshold)
+
     def get_result(self) -> list[int]:
         return self._result
 
@@ -24,7 +93,10 @@ class BDDProductDistribution(ProductDistribution):
         return descriptive_statistics(self._result)
 
 
-def product_distribution(bdd_model: BDDModel) -> list[int]:
+def product_distribution(bdd_model: BDDModel,
+                         modular: bool = False,
+                         assignment: Optional[dict[str, bool]] = None,
+                         engine: Optional["DistributionEngine"] = None) -> list[int]:
     """Computes the distribution of the number of activated features per product.
 
     That is,
@@ -44,108 +116,409 @@ def product_distribution(bdd_model: BDDModel) -> list[int]:
         + In index 1, the number of products with 1 feature activated.
         ...
         + In index n, the number of products with n features activated.
+
+    With `modular`, the engine works modulo several machine-word primes and the exact counts are
+    reconstructed at the end (see ModularDistributionEngine).
+
+    Under a partial `assignment` only the products that extend it are counted, and the indexes
+    still refer to the total number of activated features (pre-selected ones included).
+    An existing `engine` for the same model can be given to reuse its memoized distributions.
     """
     if bdd_model.root is None:
         return [0] * (len(bdd_model.vars_order) + 1)
 
     # Delegate the entire complexity to a dedicated object
-    engine = DistributionEngine(bdd_model)
-    return engine.run()
+    if engine is None:
+        engine = ModularDistributionEngine(bdd_model) if modular else DistributionEngine(bdd_model)
+    return engine.run(assignment)
+
+
+class PascalTable:
+    """Rows of Pascal's triangle (binomial coefficients), each one computed once and cached.
+
+    Row k holds C(k, 0..k) as int64 while it fits, and as exact Python integers otherwise.
+    """
+
+    def __init__(self) -> None:
+        self._rows: dict[int, npt.NDArray[Any]] = {}
+
+    def row(self, k: int) -> npt.NDArray[Any]:
+        row = self._rows.get(k)
+        if row is None:
+            values = [1] * (k + 1)
+            for j in range(1, k // 2 + 1):
+                values[j] = values[k - j] = values[j - 1] * (k - j + 1) // j
+            row = np.array(values, dtype=count_dtype(k))
+            self._rows[k] = row
+        return row
+
+
+class Distribution(NamedTuple):
+    """Polynomial sum(coeffs[i] * z^(offset + i)) holding a product distribution.
+
+    Only the span between the first and the last non-zero count is stored, so long chains of
+    mandatory or excluded variables do not carry arrays of zeros. The last axis of `coeffs` runs
+    over the degrees (the modular engine stacks one row of residues per prime before it).
+    """
+
+    offset: int
+    coeffs: npt.NDArray[Any]
+
+    def coefficient(self, k: int) -> Any:
+        """Count (or residues) of degree k."""
+        i = k - self.offset
+        return self.coeffs[..., i] if 0 <= i < self.coeffs.shape[-1] else 0
+
+
+class DistributionStore:
+    """Distributions of a level sweep that are still waiting for some of their parents.
+
+    The reference counts (incoming edges per node) come from the node index, and a distribution
+    is released as soon as its last parent has consumed it, so memory is bounded by the widest
+    cut of the diagram. With a spill directory, whenever more than `spill_threshold`
+    distributions are alive, the ones whose first consumer is farthest away are written to disk
+    and read back when needed.
+    """
+
+    def __init__(self,
+                 index: BDDNodeIndex,
+                 spill_dir: Optional[str] = None,
+                 spill_threshold: int = SPILL_THRESHOLD) -> None:
+        self.spill_dir = spill_dir
+        self.spill_threshold = spill_threshold
+        self.pending = [0] * (len(index) + 1)
+        self.first_use = [-1] * (len(index) + 1)
+        for u in range(len(index)):
+            for child in (index.low[u], index.high[u]):
+                self.pending[child] += 1
+                self.first_use[child] = max(self.first_use[child], u)
+        self.pending[index.root] += 1  # Consumed by the root edge at the end of the sweep
+        self.alive: dict[int, Distribution] = {}
+        self.spilled: dict[int, tuple[str, int]] = {}
+        self.peak_alive = 0
+
+    def put(self, u: int, dist: Distribution) -> None:
+        self.alive[u] = dist
+        self.peak_alive = max(self.peak_alive, len(self.alive))
+        if self.spill_dir is not None and len(self.alive) > self.spill_threshold:
+            self._spill()
+
+    def get(self, u: int) -> Distribution:
+        if u in self.spilled:
+            path, offset = self.spilled.pop(u)
+            self.alive[u] = Distribution(offset, np.load(path, allow_pickle=True))
+            os.remove(path)
+        return self.alive[u]
+
+    def release(self, u: int) -> None:
+        self.pending[u] -= 1
+        if self.pending[u] == 0:
+            self.alive.pop(u, None)
+            if u in self.spilled:
+                os.remove(self.spilled.pop(u)[0])
+
+    def _spill(self) -> None:
+        # Nodes are consumed in decreasing index order: spill the latest needed first
+        victims = sorted(self.alive, key=lambda u: self.first_use[u])
+        for u in victims[:len(self.alive) - self.spill_threshold // 2]:
+            file_descriptor, path = tempfile.mkstemp(suffix=".npy", dir=self.spill_dir)
+            dist = self.alive.pop(u)
+            with os.fdopen(file_descriptor, "wb") as file:
+                np.save(file, dist.coeffs, allow_pickle=True)
+            self.spilled[u] = (path, dist.offset)
 
 
 class DistributionEngine:
-    def __init__(self, bdd_model: BDDModel):
+    """Computes the product distribution of every node of the BDD.
+
+    The distribution of a node labelled with the variable at position i is a polynomial over
+    the n - i variables from its level down (see Distribution). Nodes are processed level by
+    level from the bottom of the diagram with plain loops over the node index, so the depth of
+    the diagram never reaches Python's recursion limit, convolving the children's distributions
+    with the cached binomial rows of the skipped variables. Arrays are int64 while their counts
+    cannot overflow and exact Python integers otherwise.
+
+    Under a partial assignment the engine runs on the restricted root, and the assigned variables
+    are neither counted as skipped variables nor as part of the width of the nodes above them.
+    Memoized distributions are keyed by the node and the assigned positions below its level, so
+    the sub-diagrams that a restriction does not change are shared across runs.
+
+    With `memory_bounded`, nothing is memoized: a level sweep over the node index keeps each
+    distribution in a DistributionStore only until all its parents have consumed it.
+    """
+
+    def __init__(self,
+                 bdd_model: BDDModel,
+                 memory_bounded: bool = False,
+                 spill_dir: Optional[str] = None,
+                 spill_threshold: int = SPILL_THRESHOLD):
+        self.bdd_model = bdd_model
+        self.memory_bounded = memory_bounded
+        self.spill_dir = spill_dir
+        self.spill_threshold = spill_threshold
+        self.store: Optional[DistributionStore] = None
         self.bdd = bdd_model.bdd
         self.root = bdd_model.root
         self.n = len(bdd_model.vars_order)
         self.var_to_idx = {var: i for i, var in enumerate(bdd_model.vars_order)}
-        self.memo: dict[Any, list[int]] = {}
-
-    def run(self) -> list[int]:
-        # 1. Calculate recursion from the root
-        raw_dist = self._solve(self.root)
+        self.pascal = PascalTable()
+        self.memo: dict[tuple[Any, tuple[int, ...]], Distribution] = {}
+        # free_suffix[i]: unassigned variables in positions [i, n)
+        self.free_suffix = list(range(self.n, -1, -1))
+        # memo_keys[i]: assigned positions below level i
+        self.memo_keys: list[tuple[int, ...]] = [()] * (self.n + 1)
 
-        # 2. Adjust for variables skipped before the root
-        root_idx = self.var_to_idx.get(self.root.var, self.n) if self.root.var else self.n
-        final_dist = self._apply_skipped(raw_dist, root_idx)
+    def run(self, assignment: Optional[dict[str, bool]] = None) -> list[int]:
+        assignment = assignment or {}
+        self._set_assignment(assignment)
+        root = self.bdd.let(assignment, self.root) if assignment else self.root
 
-        # 3. Format final output
-        output = final_dist + [0] * (self.n + 1 - len(final_dist))
-        return output[:self.n + 1]
+        # 1. Calculate the distributions bottom-up from the root
+        raw_dist = self._sweep(root) if self.memory_bounded else self._solve(root)
 
-    def _solve(self, node: Any) -> list[int]:
+        # 2. Adjust for variables skipped before the root
+        root_idx = self.var_to_idx.get(root.var, self.n) if root.var else self.n
+        final_dist = self._apply_skipped(raw_dist, self.free_suffix[0] - self.free_suffix[root_idx])
+
+        # 3. Format final output, offset by the pre-selected features
+        counts = self._to_counts(final_dist.coeffs)
+        offset = final_dist.offset + sum(1 for value in assignment.values() if value)
+        return [0] * offset + counts + [0] * (self.n + 1 - offset - len(counts))
+
+    def node_table(self, node: Any, skipped: int = 0) -> Distribution:
+        """Counts by number of selected features of the function of a node (possibly
+        complemented) of the diagram restricted by the last `run`, over the unassigned variables
+        from its level down and `skipped` more don't care variables."""
+        return self._apply_skipped(self._solve(node), skipped)
+
+    def _set_assignment(self, assignment: dict[str, bool]) -> None:
+        assigned = {self.var_to_idx[var] for var in assignment}
+        below: tuple[int, ...] = ()
+        for lvl in range(self.n - 1, -1, -1):
+            self.free_suffix[lvl] = self.free_suffix[lvl + 1] + (0 if lvl in assigned else 1)
+            self.memo_keys[lvl] = below
+            if lvl in assigned:
+                below = (lvl, *below)
+
+    def _to_counts(self, dist: npt.NDArray[Any]) -> list[int]:
+        return [int(count) for count in dist]
+
+    def _one(self) -> Distribution:
+        """Distribution of the TRUE terminal."""
+        return Distribution(0, np.ones(1, dtype=np.int64))
+
+    def _binom(self, k: int) -> npt.NDArray[Any]:
+        return self.pascal.row(k)
+
+    def _dtype(self, width: int) -> Any:
+        """Dtype of the distributions of nodes over `width` variables."""
+        return count_dtype(width)
+
+    def _reduce(self, values: npt.NDArray[Any]) -> npt.NDArray[Any]:
+        """Brings combined counts back to their representation (exact counts need nothing)."""
+        return values
+
+    def _trim(self, coeffs: npt.NDArray[Any]) -> Distribution:
+        """Drops the leading and trailing zero counts of a dense distribution."""
+        nonzero = np.flatnonzero((coeffs != 0).reshape(-1, coeffs.shape[-1]).any(axis=0))
+        if len(nonzero) == 0:
+            return Distribution(0, coeffs[..., :0])
+        return Distribution(int(nonzero[0]), coeffs[..., nonzero[0]:nonzero[-1] + 1])
+
+    def _solve(self, node: Any) -> Distribution:
         is_complemented = node.negated
         actual_node = ~node if is_complemented else node
 
+        if actual_node.var:
+            curr_var_idx = self.var_to_idx.get(actual_node.var, self.n)
+        else:
+            curr_var_idx = self.n
+
         if actual_node == self.bdd.true:
-            res = [1]
-        elif actual_node in self.memo:
-            res = self.memo[actual_node]
+            res = self._one()
         else:
-            res = self._compute_internal_node(actual_node)
-            self.memo[actual_node] = res
+            key = (actual_node, self.memo_keys[curr_var_idx])
+            if key not in self.memo:
+                self._compute_from(actual_node)
+            res = self.memo[key]
 
         if is_complemented:
-            if actual_node.var:
-                curr_var_idx = self.var_to_idx.get(actual_node.var, self.n)
-            else:
-                curr_var_idx = self.n
-            return self._complement_dist(res, self.n - curr_var_idx)
-        return res
-
-    def _compute_internal_node(self, node: Any) -> list[int]:
-        curr_idx = self.var_to_idx[node.var]
-
-        # Distances to children (Don't cares)
-        idx_low = self.var_to_idx.get(node.low.var, self.n) if node.low.var else self.n
-        idx_high = self.var_to_idx.get(node.high.var, self.n) if node.high.var else self.n
-
-        d_low = self._apply_skipped(self._solve(node.low), idx_low - curr_idx - 1)
-        d_high = self._apply_skipped(self._solve(node.high), idx_high - curr_idx - 1)
-
-        # Combine LOW (z^0) and HIGH (z^1)
-        res = [0] * max(len(d_low), len(d_high) + 1)
-        for i, v in enumerate(d_low):
-            res[i] += v
-        for i, v in enumerate(d_high):
-            res[i+1] += v
-        return res
-
-    @staticmethod
-    def _get_binom(k: int) -> list[int]:
-        res = [1]
-        for _ in range(k):
-            res = [a + b for a, b in zip([0, *res], [*res, 0])]
+            return self._complement_dist(res, self.free_suffix[curr_var_idx])
         return res
 
-    def _apply_skipped(self, dist: list[int], k: int) -> list[int]:
-        if k <= 0:
+    def _sweep(self, root: Any) -> Distribution:
+        """Level sweep that only keeps the distributions still waiting for a parent."""
+        index = BDDNodeIndex(self.bdd_model, root)
+        self.store = DistributionStore(index, self.spill_dir, self.spill_threshold)
+        for u in range(len(index) - 1, -1, -1):
+            dist = self._compute_internal_node(index, u)
+            for child in (index.low[u], index.high[u]):
+                if child != index.terminal:
+                    self.store.release(child)
+            self.store.put(u, dist)
+        return self._edge_dist(index, index.root, index.root_neg)
+
+    def _compute_from(self, node: Any) -> None:
+        """Fills the memo for all nodes below `node`, level by level from the bottom."""
+        index = BDDNodeIndex(self.bdd_model, node)
+        for u in range(len(index) - 1, -1, -1):
+            key = self._memo_key(index, u)
+            if key not in self.memo:
+                self.memo[key] = self._compute_internal_node(index, u)
+
+    def _memo_key(self, index: BDDNodeIndex, u: int) -> tuple[Any, tuple[int, ...]]:
+        return index.nodes[u], self.memo_keys[index.level[u]]
+
+    def _edge_dist(self, index: BDDNodeIndex, child: int, negated: bool) -> Distribution:
+        if child == index.terminal:
+            dist = self._one()
+        elif self.store is not None:
+            dist = self.store.get(child)
+        else:
+            dist = self.memo[self._memo_key(index, child)]
+        if negated:
+            return self._complement_dist(dist, self.free_suffix[index.level[child]])
+        return dist
+
+    def _compute_internal_node(self, index: BDDNodeIndex, u: int) -> Distribution:
+        curr_idx = index.level[u]
+        width = self.free_suffix[curr_idx]
+
+        # Distances to children (Don't cares), not counting assigned variables
+        skip_low = self.free_suffix[curr_idx + 1] - self.free_suffix[index.level[index.low[u]]]
+        skip_high = self.free_suffix[curr_idx + 1] - self.free_suffix[index.level[index.high[u]]]
+        d_low = self._apply_skipped(self._edge_dist(index, index.low[u], index.low_neg[u]),
+                                    skip_low)
+        d_high = self._apply_skipped(self._edge_dist(index, index.high[u], index.high_neg[u]),
+                                     skip_high)
+
+        return self._combine(d_low, d_high, width)
+
+    def _combine(self, d_low: Distribution, d_high: Distribution, width: int) -> Distribution:
+        """Combines LOW (z^0) and HIGH (z^1) distributions of a node over `width` variables."""
+        d_high = Distribution(d_high.offset + 1, d_high.coeffs)
+        if d_low.coeffs.shape[-1] == 0:
+            return d_high
+        if d_high.coeffs.shape[-1] == 0:
+            return d_low
+        start = min(d_low.offset, d_high.offset)
+        end = max(d_low.offset + d_low.coeffs.shape[-1], d_high.offset + d_high.coeffs.shape[-1])
+        dtype = self._dtype(width)
+        res = np.zeros((*d_low.coeffs.shape[:-1], end - start), dtype=dtype)
+        for dist in (d_low, d_high):
+            first = dist.offset - start
+            res[..., first:first + dist.coeffs.shape[-1]] += dist.coeffs.astype(dtype, copy=False)
+        return Distribution(start, self._reduce(res))
+
+    def _apply_skipped(self, dist: Distribution, k: int) -> Distribution:
+        """Multiplies the distribution by (1 + z)^k, i.e., adds k don't care variables."""
+        if k <= 0 or dist.coeffs.shape[-1] == 0:
             return dist
-        binom = self._get_binom(k)
-        new_dist = [0] * (len(dist) + k)
-        for i, val in enumerate(dist):
-            for j, b_val in enumerate(binom):
-                new_dist[i + j] += val * b_val
-        return new_dist
+        binom = self._binom(k)
+        # Every count of the product is at most the sum of the counts times 2^k
+        fits = (object not in (binom.dtype, dist.coeffs.dtype) and
+                int(dist.coeffs.sum()).bit_length() + k <= MAX_FIXED_WIDTH_VARS)
+        dtype = np.int64 if fits else object
+        return Distribution(dist.offset, np.convolve(dist.coeffs.astype(dtype, copy=False),
+                                                     binom.astype(dtype, copy=False)))
+
+    def _complement_dist(self, dist: Distribution, k: int) -> Distribution:
+        """Distribution of the negated function over k variables: C(k, i) - dist[i]."""
+        res = self._binom(k).copy()
+        first = dist.offset
+        res[..., first:first + dist.coeffs.shape[-1]] -= dist.coeffs.astype(res.dtype, copy=False)
+        return self._trim(res)
+
+
+class ModularDistributionEngine(DistributionEngine):
+    """Product distribution computed modulo several machine-word primes.
+
+    Each node distribution is an int64 matrix with one row of residues per prime, so additions
+    and convolutions run as native vectorized arithmetic regardless of how many digits the
+    counts have. The primes are sized so that accumulating n + 1 products of residues cannot
+    overflow, and their product exceeds 2^n, the largest possible count, so the exact
+    distribution is recovered by the Chinese Remainder Theorem at the end.
+    """
 
-    def _complement_dist(self, dist: list[int], k: int) -> list[int]:
-        total = self._get_binom(k)
-        extended = dist + [0] * (len(total) - len(dist))
-        return [t - d for t, d in zip(total, extended)]
+    def __init__(self,
+                 bdd_model: BDDModel,
+                 memory_bounded: bool = False,
+                 spill_dir: Optional[str] = None,
+                 spill_threshold: int = SPILL_THRESHOLD):
+        super().__init__(bdd_model, memory_bounded, spill_dir, spill_threshold)
+        self.primes = primes_for(self.n + 1, self.n + 1)
+        self.moduli = np.array(self.primes, dtype=np.int64)[:, np.newaxis]
+        self._binom_residues: dict[int, npt.NDArray[np.int64]] = {}
+
+    def _to_counts(self, dist: npt.NDArray[Any]) -> list[int]:
+        return crt_reconstruct(dist, self.primes)
+
+    def _one(self) -> Distribution:
+        return Distribution(0, np.ones((len(self.primes), 1), dtype=np.int64))
+
+    def _dtype(self, width: int) -> Any:
+        return np.int64
+
+    def _binom(self, k: int) -> npt.NDArray[Any]:
+        residues = self._binom_residues.get(k)
+        if residues is None:
+            # Advance Pascal's rule from the closest cached row below k, modulo every prime
+            start = max((j for j in self._binom_residues if j < k), default=0)
+            residues = self._binom_residues.get(start, self._one().coeffs)
+            for j in range(start, k):
+                row = np.zeros((len(self.primes), j + 2), dtype=np.int64)
+                row[:, :-1] = residues
+                row[:, 1:] += residues
+                residues = self._reduce(row)
+            self._binom_residues[k] = residues
+        return residues
+
+    def _reduce(self, values: npt.NDArray[Any]) -> npt.NDArray[Any]:
+        values %= self.moduli
+        return values
+
+    def _apply_skipped(self, dist: Distribution, k: int) -> Distribution:
+        if k <= 0 or dist.coeffs.shape[-1] == 0:
+            return dist
+        binom = self._binom(k)
+        coeffs = dist.coeffs
+        length = coeffs.shape[1]
+        if k + 1 > len(self.primes):
+            # Long binomial rows: one native convolution per prime
+            res = np.stack([np.convolve(coeffs[i], binom[i]) for i in range(len(self.primes))])
+        else:
+            # Short binomial rows: sum of shifted scaled copies, vectorized across the primes
+            res = np.zeros((len(self.primes), length + k), dtype=np.int64)
+            for j in range(k + 1):
+                res[:, j:j + length] += coeffs * binom[:, j:j + 1]
+        res %= self.moduli
+        return Distribution(dist.offset, res)
+
+    def _complement_dist(self, dist: Distribution, k: int) -> Distribution:
+        res = super()._complement_dist(dist, k)
+        np.add(res.coeffs, self.moduli, out=res.coeffs, where=res.coeffs < 0)
+        return res
 
 
 def descriptive_statistics(prod_dist: list[int]) -> dict[str, Any]:
     """Computes statistics from a frequency distribution in O(N) time."""
-    total_elements = sum(prod_dist)
+    return frequency_statistics(enumerate(prod_dist))
+
+
+def frequency_statistics(frequencies: Iterable[tuple[int, int]]) -> dict[str, Any]:
+    """Computes statistics from (value, count) pairs sorted by value, such as a sparse
+    distribution of a numeric attribute."""
+    items = [(value, count) for value, count in frequencies if count > 0]
+    total_elements = sum(count for _, count in items)
     if total_elements == 0:
         return _get_empty_stats()
 
     # Fase 1: Limits and LLimits and Central Tendency (First pass)
-    central_stats = _compute_central_tendency(prod_dist, total_elements)
+    central_stats = _compute_central_tendency(items, total_elements)
 
     # Phase 2: Dispersion and Deviation (Second pass)
     dispersion_stats = _compute_dispersion(
-        prod_dist,
+        items,
         total_elements,
         central_stats["Mean"],
         central_stats["Median"]
@@ -153,7 +526,7 @@ def descriptive_statistics(prod_dist: list[int]) -> dict[str, Any]:
 
     return {**central_stats, **dispersion_stats}
 
-def _compute_central_tendency(prod_dist: list[int], total: int) -> dict[str, Any]:
+def _compute_central_tendency(items: list[tuple[int, int]], total: int) -> dict[str, Any]:
     """Calculates min, max, mode, mean and median in one pass."""
     total_sum = 0
     running_total = 0
@@ -164,10 +537,7 @@ def _compute_central_tendency(prod_dist: list[int], total: int) -> dict[str, Any
     m_pos1, m_pos2 = (total + 1) // 2, (total + 2) // 2
     med1, med2 = None, None
 
-    for i, count in enumerate(prod_dist):
-        if count <= 0:
-            continue
-
+    for i, count in items:
         # Min, Max y Mode
         if min_val is None:
             min_val = i
@@ -197,7 +567,7 @@ def _compute_central_tendency(prod_dist: list[int], total: int) -> dict[str, Any
         "Range": (max_val - min_val) if min_val is not None and max_val is not None else 0
     }
 
-def _compute_dispersion(prod_dist: list[int],
+def _compute_dispersion(items: list[tuple[int, int]],
                         total: int,
                         mean: float,
                         median: float) -> dict[str, Any]:
@@ -208,14 +578,13 @@ def _compute_dispersion(prod_dist: list[int],
     # We build a frequency distribution of the deviations
     abs_deviations_dist: dict[float, int] = {}
 
-    for i, count in enumerate(prod_dist):
-        if count > 0:
-            # For Standard Deviation
-            sum_squared_diff += count * (i - mean) ** 2
+    for i, count in items:
+        # For Standard Deviation
+        sum_squared_diff += count * (i - mean) ** 2
 
-            # For MAD: we group by magnitude of deviation
-            dev = abs(i - median)
-            abs_deviations_dist[dev] = abs_deviations_dist.get(dev, 0) + count
+        # For MAD: we group by magnitude of deviation
+        dev = abs(i - median)
+        abs_deviations_dist[dev] = abs_deviations_dist.get(dev, 0) + count
 
     std_dev = (sum_squared_diff / total) ** 0.5
     mad = _calculate_median_from_dist(abs_deviations_dist, total)
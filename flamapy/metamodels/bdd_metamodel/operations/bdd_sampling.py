@@ -1,12 +1,24 @@
+import itertools
 import random
-from dataclasses import dataclass
-from typing import Optional, cast, Any
+from fractions import Fraction
+from typing import Optional, cast, Any, Generator, Iterator
+
+import numpy as np
+import numpy.typing as npt
 
 from flamapy.core.models import VariabilityModel
 from flamapy.core.exceptions import FlamaException
 from flamapy.core.operations import Sampling
 from flamapy.metamodels.configuration_metamodel.models import Configuration
 from flamapy.metamodels.bdd_metamodel.models import BDDModel
+from flamapy.metamodels.bdd_metamodel.models.utils import BDDNodeIndex
+from flamapy.metamodels.bdd_metamodel.operations.bdd_product_distribution import (
+    Distribution,
+    DistributionEngine,
+)
+from flamapy.metamodels.bdd_metamodel.operations.bdd_weighted_model_counting import (
+    WeightedCountingEngine,
+)
 
 
 class BDDSampling(Sampling):
@@ -20,6 +32,12 @@ class BDDSampling(Sampling):
 
     This implementation supports samples with and without replacement,
     as well as samples from a given partial configuration.
+    With a weight per feature, products are sampled with probability proportional to the
+    product of the weights of their selected features instead of uniformly.
+    Samples can also be stratified by their number of selected features: uniform among the
+    products with exactly n features, or a quota of products for each number of features.
+    The sampler (and its solution counts) is kept between executions on the same model and
+    partial configuration, so repeated small samples do not repeat the precomputation.
     """
 
     def __init__(self) -> None:
@@ -27,6 +45,12 @@ class BDDSampling(Sampling):
         self._sample_size: int = 0
         self._with_replacement: bool = False
         self._partial_configuration: Optional[Configuration] = None
+        self._seed: Optional[int] = None
+        self._reseed: bool = False
+        self._sampler: Optional[BDDSampler] = None
+        self._weights: Optional[dict[Any, Any]] = None
+        self._n_features_quotas: Optional[dict[int, int]] = None
+        self._n_features: Optional[int] = None
 
     def set_sample_size(self, sample_size: int) -> None:
         if sample_size < 0:
@@ -39,12 +63,38 @@ class BDDSampling(Sampling):
     def set_partial_configuration(self, partial_configuration: Configuration) -> None:
         self._partial_configuration = partial_configuration
 
+    def set_weights(self, weights: Optional[dict[Any, Any]]) -> None:
+        """Positive weight of the selection of each feature (1 for the features without one),
+        for weighted sampling. None samples uniformly."""
+        self._weights = weights
+
+    def set_n_features(self, n_features: Optional[int]) -> None:
+        """Samples uniformly among the products with exactly `n_features` selected features.
+        None samples among all the products."""
+        self._n_features = n_features
+        self._n_features_quotas = None
+
+    def set_n_features_quotas(self, quotas: Optional[dict[int, int]]) -> None:
+        """Number of products to sample (instead of the sample size) for each number of
+        selected features, uniformly among the products with that number of features."""
+        self._n_features_quotas = quotas
+        self._n_features = None
+
+    def set_seed(self, seed: Optional[int]) -> None:
+        """Seeds the random number generator of the sampler, for reproducible samples."""
+        self._seed = seed
+        self._reseed = True
+
     def get_result(self) -> list[Configuration]:
         return self._result
 
     def get_sample(self) -> list[Configuration]:
         return self.get_result()
 
+    def get_sampler(self) -> Optional["BDDSampler"]:
+        """Sampler used by the last execution, to keep drawing samples lazily from it."""
+        return self._sampler
+
     def execute(self, model: VariabilityModel) -> "BDDSampling":
         bdd_model = cast(BDDModel, model)
         # Handle partial configuration
@@ -56,147 +106,417 @@ class BDDSampling(Sampling):
                 for feature in bdd_model.features_vars.keys():
                     if feature not in self._partial_configuration.elements:
                         assignment[bdd_model.features_vars[feature]] = False
-        self._result = get_random_solutions(
-            bdd_model, self._sample_size, self._with_replacement, assignment
-        )
+        assignment = assignment or {}
+        weights = None
+        if self._weights is not None:
+            weights = {bdd_model.features_vars[feat]: w for feat, w in self._weights.items()}
+        if self._sampler is None or not self._reusable_sampler(bdd_model, assignment, weights):
+            self._sampler = BDDSampler(bdd_model, assignment, self._seed, weights)
+        elif self._reseed:
+            self._sampler.seed(self._seed)
+        self._reseed = False
+        quotas = self._n_features_quotas
+        if self._n_features is not None:
+            quotas = {self._n_features: self._sample_size}
+        if quotas is not None:
+            self._result = self._sampler.stratified_sample(quotas, self._with_replacement)
+        else:
+            self._result = self._sampler.sample(self._sample_size, self._with_replacement)
         return self
 
+    def _reusable_sampler(self,
+                          bdd_model: BDDModel,
+                          assignment: dict[str, bool],
+                          weights: Optional[dict[str, Any]]) -> bool:
+        sampler = self._sampler
+        return (sampler is not None and sampler.bdd_model is bdd_model
+                and sampler.assignment == assignment and sampler.weights == weights)
+
+
+class BDDSampler:
+    """Stateful random sampler of the products of a BDD model.
+
+    The restriction to the partial assignment and the solution counts of every node (in the
+    BDDNodeIndex of the restricted diagram) are computed once, when the sampler is created, and
+    every draw goes down that index: then any number of samples can be drawn from it,
+    either in batches (`sample`) or lazily (`samples`, or iterating the sampler). Samples are
+    dictionaries from features to their selection, as returned by `get_random_solutions`.
+    Large batches are better drawn with `sample_matrix`, which returns a 0/1 matrix and only
+    builds Configuration objects on request (`configurations`).
+
+    Without replacement, distinct positions of the lexicographic order of the products are
+    drawn (a lazy, sparse Fisher-Yates shuffle) and unranked with the node counts, so the cost
+    is linear in the number of samples even when they approach the total number of products.
+
+    With `weights` (a positive weight for the selection of each variable, 1 by default), products
+    are drawn with probability proportional to the product of the weights of their selected
+    variables. The exact weighted counts of every node (WeightedCountingEngine, with Fractions)
+    replace the solution counts, and their ratios give the probability of each branch. Without
+    replacement, the weight of the products already drawn is kept in a trie of their values and
+    subtracted from the weight of each branch, so each next product is drawn with probability
+    proportional to its weight among the ones not drawn yet, in one pass down the diagram.
+
+    Stratified samples (`samples_with_n_features`, `stratified_sample`) are drawn uniformly
+    among the products with a given number of selected features by a StratifiedSampler, built
+    on the first request.
+    """
 
-@dataclass
-class SamplingContext:
-    target_root: Any
-    remaining_vars: list[str]
-    s_count: dict[Any, tuple[int, int]]
-    assignment: dict[str, bool]
-    vars_features: dict[str, Any]
+    def __init__(self,
+                 bdd_model: BDDModel,
+                 assignment: Optional[dict[str, bool]] = None,
+                 seed: Optional[int] = None,
+                 weights: Optional[dict[str, Any]] = None) -> None:
+        self.bdd_model = bdd_model
+        self.assignment = assignment or {}
+        self.weights = weights
+        if weights is not None and any(weight <= 0 for weight in weights.values()):
+            raise FlamaException("Sampling weights must be positive.")
+        self.rng = random.Random(seed)
+        self.np_rng = np.random.default_rng(seed)
+        self.remaining_vars = [var for var in bdd_model.vars_order if var not in self.assignment]
+        root = bdd_model.bdd.let(self.assignment, bdd_model.root) if self.assignment \
+            else bdd_model.root
+        # The node index (and its solution counts) of the restricted diagram, None if it is
+        # unsatisfiable
+        self.index: Optional[BDDNodeIndex] = None
+        self.total_sat = 0
+        if root != bdd_model.bdd.false:
+            self.index = BDDNodeIndex(bdd_model, root, self.remaining_vars)
+            self.total_sat = self.index.root_count()
+        self._p_high: Optional[npt.NDArray[np.float64]] = None
+        self._weighted: Optional[WeightedCountingEngine] = None
+        self._stratified: Optional[StratifiedSampler] = None
+        # Probability of selecting each remaining variable when a path skips it
+        self._p_free = np.full(len(self.remaining_vars), 0.5)
+        if weights is not None:
+            for i, var in enumerate(self.remaining_vars):
+                weight = weights.get(var, 1)
+                self._p_free[i] = weight / (weight + 1)
+
+    def seed(self, seed: Optional[int]) -> None:
+        """Restarts the random number generators from the given seed."""
+        self.rng.seed(seed)
+        self.np_rng = np.random.default_rng(seed)
+
+    def sample(self, n_samples: int, with_replacement: bool = False) -> list[dict[Any, bool]]:
+        """Draws `n_samples` products (at most all of them when sampling without replacement)."""
+        return list(itertools.islice(self.samples(with_replacement), n_samples))
+
+    def samples(self, with_replacement: bool = True) -> Generator[dict[Any, bool], None, None]:
+        """Lazily draws products. With replacement the stream is endless; without replacement
+        it stops after yielding every product once."""
+        if self.index is None:
+            return
+        if with_replacement:
+            yield from self._iter_walk_samples()
+        elif self.weights is not None:
+            yield from self._iter_weighted_distinct()
+        else:
+            for rank in _distinct_ranks(self.total_sat, self.rng):
+                yield self._unrank(rank)
+
+    def __iter__(self) -> Iterator[dict[Any, bool]]:
+        return self.samples()
+
+    def samples_with_n_features(self,
+                                n_features: int,
+                                with_replacement: bool = True
+                                ) -> Generator[dict[Any, bool], None, None]:
+        """Lazily draws products with exactly `n_features` selected features (counting the
+        selected features of the partial assignment), uniformly among them."""
+        if self.weights is not None:
+            raise FlamaException("Stratified sampling does not support weights.")
+        if self.index is None:
+            return
+        if self._stratified is None:
+            self._stratified = StratifiedSampler(self.bdd_model, self.assignment)
+        stratified = self._stratified
+        total = stratified.count(n_features)
+        if total == 0:
+            return
+        if with_replacement:
+            ranks: Iterator[int] = (self.rng.randrange(total) for _ in itertools.count())
+        else:
+            ranks = _distinct_ranks(total, self.rng)
+        for rank in ranks:
+            yield self._to_sample(stratified.unrank(n_features, rank))
+
+    def stratified_sample(self,
+                          quotas: dict[int, int],
+                          with_replacement: bool = False) -> list[dict[Any, bool]]:
+        """Draws `quotas[n]` products with exactly n selected features for each n (at most all
+        of them when sampling without replacement)."""
+        sample: list[dict[Any, bool]] = []
+        for n_features, n_samples in quotas.items():
+            stream = self.samples_with_n_features(n_features, with_replacement)
+            sample.extend(itertools.islice(stream, n_samples))
+        return sample
+
+    def sample_matrix(self, n_samples: int, packed: bool = False) -> npt.NDArray[np.uint8]:
+        """Draws `n_samples` products with replacement as a (n_samples, len(vars_order)) uint8
+        matrix of 0/1 values whose columns follow `vars_order`, or with its rows bit-packed
+        (`np.packbits`) when `packed` is set.
+
+        All the samples go down the diagram together: at each level, one vectorized draw decides
+        the value of the variable for every sample, with the precomputed probability of the high
+        branch of the node each sample is at (1/2 for the samples that skip the variable).
+        """
+        vars_order = self.bdd_model.vars_order
+        if self.index is None:
+            n_samples = 0
+        matrix = np.zeros((n_samples, len(vars_order)), dtype=np.uint8)
+        if n_samples > 0:
+            var_to_pos = {var: i for i, var in enumerate(vars_order)}
+            for var, value in self.assignment.items():
+                matrix[:, var_to_pos[var]] = value
+            columns = [var_to_pos[var] for var in self.remaining_vars]
+            self._walk(matrix, columns)
+        return np.packbits(matrix, axis=1) if packed else matrix
+
+    def configurations(self,
+                       matrix: npt.NDArray[np.uint8],
+                       packed: bool = False) -> list[Configuration]:
+        """Converts a matrix of samples (see `sample_matrix`) into configurations."""
+        features = [self.bdd_model.vars_features[var] for var in self.bdd_model.vars_order]
+        if packed:
+            matrix = np.unpackbits(matrix, axis=1, count=len(features))
+        return [Configuration(dict(zip(features, row))) for row in matrix.astype(bool).tolist()]
+
+    def _unrank(self, rank: int) -> dict[Any, bool]:
+        return self._to_sample(cast(BDDNodeIndex, self.index).unrank(rank))
+
+    def _to_sample(self, values: list[bool]) -> dict[Any, bool]:
+        """Sample (features to their selection) from the values of the remaining variables."""
+        full_config = {**self.assignment, **dict(zip(self.remaining_vars, values))}
+        return {self.bdd_model.vars_features[k]: v for k, v in full_config.items()}
+
+    def _walk(self, matrix: npt.NDArray[np.uint8], columns: list[int]) -> None:
+        index = cast(BDDNodeIndex, self.index)
+        p_high = self._get_p_high()
+        level = np.array(index.level)
+        low = np.array([*index.low, index.terminal])
+        high = np.array([*index.high, index.terminal])
+        low_neg = np.array([*index.low_neg, False])
+        high_neg = np.array([*index.high_neg, False])
+
+        n_samples = len(matrix)
+        node = np.full(n_samples, index.root)
+        negated = np.full(n_samples, index.root_neg)
+        for lvl, column in enumerate(columns):
+            at_node = level[node] == lvl
+            probability = np.where(at_node, p_high[negated.astype(np.int8), node],
+                                   self._p_free[lvl])
+            bits = self.np_rng.random(n_samples) < probability
+            matrix[:, column] = bits
+            move = at_node.nonzero()[0]
+            taken = bits[move]
+            current = node[move]
+            node[move] = np.where(taken, high[current], low[current])
+            negated[move] ^= np.where(taken, high_neg[current], low_neg[current])
+
+    def _iter_walk_samples(self) -> Generator[dict[Any, bool], None, None]:
+        """Endless stream of products drawn with the branch probabilities of `_get_p_high`."""
+        index = cast(BDDNodeIndex, self.index)
+        p_high = self._get_p_high()
+        while True:
+            edge = (index.root, index.root_neg)
+            values = []
+            for lvl in range(index.n_vars):
+                node, negated = edge
+                at_node = index.level[node] == lvl
+                probability = p_high[int(negated), node] if at_node else self._p_free[lvl]
+                value = bool(self.rng.random() < probability)
+                edge = index.branches(node, negated, lvl)[value]
+                values.append(value)
+            yield self._to_sample(values)
+
+    def _iter_weighted_distinct(self) -> Generator[dict[Any, bool], None, None]:
+        """Products drawn without replacement with probability proportional to their weight
+        among the ones not drawn yet, until all of them have been drawn.
+
+        Each node of the trie of the drawn products holds the weight of the drawn products with
+        its prefix of values ([weight, low child, high child]), which is removed from the weight
+        of the solutions through the branch with that prefix.
+        """
+        index = cast(BDDNodeIndex, self.index)
+        engine = self._get_weighted_engine()
+        trie: list[Any] = [Fraction(0), None, None]
+        for _ in range(self.total_sat):
+            edge, node, prefix_weight = (index.root, index.root_neg), trie, Fraction(1)
+            values = []
+            for lvl in range(index.n_vars):
+                literals = (engine.negative[lvl], engine.positive[lvl])
+                branch_weights = []
+                for value, branch in enumerate(index.branches(*edge, lvl)):
+                    weight = prefix_weight * literals[value] * engine.edge_weight(*branch, lvl + 1)
+                    drawn = node[value + 1] if node is not None else None
+                    branch_weights.append(weight - drawn[0] if drawn is not None else weight)
+                low_weight, high_weight = branch_weights
+                value = bool(self.rng.random() < float(high_weight / (low_weight + high_weight)))
+                edge = index.branches(*edge, lvl)[value]
+                prefix_weight *= literals[value]
+                if node is not None:
+                    node = node[value + 1]
+                values.append(value)
+            # Remove the drawn product from the weight of its prefixes
+            node = trie
+            node[0] += prefix_weight
+            for value in values:
+                if node[value + 1] is None:
+                    node[value + 1] = [Fraction(0), None, None]
+                node = node[value + 1]
+                node[0] += prefix_weight
+            yield self._to_sample(values)
+
+    def _get_weighted_engine(self) -> WeightedCountingEngine:
+        """Exact weighted counts of the nodes of the restricted diagram. Computed once."""
+        if self._weighted is None:
+            index = cast(BDDNodeIndex, self.index)
+            weights = self.weights or {}
+            positive = [Fraction(weights.get(var, 1)) for var in index.vars_order]
+            negative = [Fraction(1)] * index.n_vars
+            self._weighted = WeightedCountingEngine(index, positive, negative)
+            self._weighted.compute_weights()
+        return self._weighted
+
+    def _get_p_high(self) -> npt.NDArray[np.float64]:
+        """Probability of the high branch of each node of the restricted diagram, for paths of
+        even (row 0) and odd (row 1) parity of complemented edges. Computed once."""
+        if self._p_high is None and self.weights is not None:
+            self._p_high = self._get_weighted_engine().high_probabilities()
+        if self._p_high is None:
+            self._p_high = cast(BDDNodeIndex, self.index).high_probabilities()
+        return self._p_high
+
+
+class StratifiedSampler:
+    """Unranking of the products with a given number of selected features, for uniform sampling
+    among them.
+
+    The tables of counts by number of selected features of the nodes of the restricted diagram
+    (the distributions of the DistributionEngine) are computed once. A product is unranked
+    going down the diagram: the tables of the two branches of a node (with the variables each
+    one skips) tell how many products with the pending number of selected features continue
+    through each one. For the variables skipped by an edge, how many of them are selected is
+    chosen first, in proportion to the binomial coefficient times the count of the node the edge
+    reaches, and then which ones, in combinatorial order. So each product takes O(variables)
+    steps, and a uniform random rank gives a uniform random product.
+    """
+
+    def __init__(self, bdd_model: BDDModel, assignment: Optional[dict[str, bool]] = None) -> None:
+        assignment = assignment or {}
+        self.bdd_model = bdd_model
+        self.preselected = sum(1 for value in assignment.values() if value)
+        root = bdd_model.bdd.let(assignment, bdd_model.root) if assignment else bdd_model.root
+        remaining_vars = [var for var in bdd_model.vars_order if var not in assignment]
+        self.index = BDDNodeIndex(bdd_model, root, remaining_vars)
+        # The engine memoizes the table of every node of the restricted diagram
+        self.engine = DistributionEngine(bdd_model)
+        self.counts = self.engine.run(assignment)
+        self._tables: dict[tuple[int, bool, int], Distribution] = {}
+
+    def count(self, n_features: int) -> int:
+        """Number of products with exactly `n_features` selected features."""
+        return self.counts[n_features] if 0 <= n_features < len(self.counts) else 0
+
+    def table(self, node: int, negated: bool, skipped: int = 0) -> Distribution:
+        """Counts by number of selected features of the function of an edge to `node` that
+        skips `skipped` variables before it."""
+        key = (node, negated, skipped)
+        if key not in self._tables:
+            node_func = self.bdd_model.bdd.true
+            if node != self.index.terminal:
+                node_func = self.index.nodes[node]
+            self._tables[key] = self.engine.node_table(~node_func if negated else node_func,
+                                                       skipped)
+        return self._tables[key]
+
+    def unrank(self, n_features: int, rank: int) -> list[bool]:
+        """Values (following the remaining variables) of the product at position `rank` (below
+        `count(n_features)`) among the products with `n_features` selected features."""
+        index = self.index
+        pending = n_features - self.preselected
+        node, negated = index.root, index.root_neg
+        values: list[bool] = []
+        while len(values) < index.n_vars:
+            lvl = len(values)
+            skipped = index.level[node] - lvl
+            if skipped:
+                selected, rank = self._unrank_skipped(node, negated, skipped, pending, rank)
+                values.extend(selected)
+                pending -= sum(selected)
+                continue
+            low, high = index.branches(node, negated, lvl)
+            low_count = int(self.table(*low, index.level[low[0]] - lvl - 1).coefficient(pending))
+            value = rank >= low_count
+            if value:
+                rank -= low_count
+                pending -= 1
+            node, negated = high if value else low
+            values.append(value)
+        return values
+
+    def _unrank_skipped(self,
+                        node: int,
+                        negated: bool,
+                        skipped: int,
+                        pending: int,
+                        rank: int) -> tuple[list[bool], int]:
+        """Values of the variables skipped by an edge to `node`, and the rank left for the
+        products of the node, with `pending` selected features over both."""
+        table = self.table(node, negated)
+        combinations = 1  # C(skipped, chosen)
+        for chosen in range(min(skipped, pending) + 1):
+            completions = int(table.coefficient(pending - chosen))
+            if rank < combinations * completions:
+                subset_rank, rank = divmod(rank, completions)
+                return _unrank_combination(skipped, chosen, combinations, subset_rank), rank
+            rank -= combinations * completions
+            combinations = combinations * (skipped - chosen) // (chosen + 1)
+        raise FlamaException(f"Rank out of range for {pending} selected features.")
+
+
+def _unrank_combination(size: int, chosen: int, combinations: int, rank: int) -> list[bool]:
+    """Combination at position `rank` of the lexicographic order (False < True) of the
+    `combinations` = C(size, chosen) ways to select `chosen` of `size` variables."""
+    values = []
+    for remaining in range(size, 0, -1):
+        # Combinations that leave the current variable deselected: C(remaining - 1, chosen)
+        without = combinations * (remaining - chosen) // remaining
+        value = rank >= without
+        if value:
+            rank -= without
+            combinations -= without
+            chosen -= 1
+        else:
+            combinations = without
+        values.append(value)
+    return values
 
 
 def get_random_solutions(bdd_model: BDDModel,
                          n_samples: int,
                          with_replacement: bool = False,
-                         assignment: Optional[dict[str, bool]] = None
+                         assignment: Optional[dict[str, bool]] = None,
+                         seed: Optional[int] = None
                         ) -> list[dict[str, bool]]:
     """Generates a list of random valid configurations using BDD sampling."""
-    assignment = assignment or {}
-
-    # 1. Restriction and initial validation
-    target_root = bdd_model.bdd.let(assignment, bdd_model.root) if assignment else bdd_model.root
-    if target_root == bdd_model.bdd.false:
-        return []
-
-    remaining_vars = [v for v in bdd_model.vars_order if v not in assignment]
-    total_sat = bdd_model.bdd.count(target_root, len(remaining_vars))
-
-    if not with_replacement:
-        n_samples = min(n_samples, total_sat)
-
-    # 2. Precomputation of weights for sampling
-    context = SamplingContext(
-        target_root=target_root,
-        remaining_vars=remaining_vars,
-        s_count=_precompute_solution_counts(target_root, remaining_vars),
-        assignment=assignment,
-        vars_features=bdd_model.vars_features
-    )
-
-    # 3. Sampling loop
-    return _perform_sampling(context, n_samples, with_replacement)
-
-
-def _precompute_solution_counts(target_root: Any,
-                                remaining_vars: list[str]) -> dict[Any, tuple[int, int]]:
-    """Calculates the number of solutions for each branch of the BDD (Dynamic Programming)."""
-    n_rem = len(remaining_vars)
-    var_to_idx = {var: i for i, var in enumerate(remaining_vars)}
-    actual_root = ~target_root if target_root.negated else target_root
-
-    # Get internal nodes sorted by level (bottom-up)
-    internal_nodes = _get_sorted_internal_nodes(actual_root, var_to_idx)
-    s_count: dict[Any, tuple[int, int]] = {}
-
-    for u in internal_nodes:
-        u_idx = var_to_idx[u.var]
-
-        def get_branch_sol(child: Any) -> int:
-            c_idx = var_to_idx[child.var] if child.var else n_rem
-            if child.var is None:
-                val = 0 if child.negated else 1
-            else:
-                act_c = ~child if child.negated else child
-                val = sum(s_count[act_c])
-                if child.negated:
-                    val = (2 ** (n_rem - c_idx)) - val
-            return val * (2 ** (c_idx - u_idx - 1))
-
-        s_count[u] = (get_branch_sol(u.low), get_branch_sol(u.high))
-
-    return s_count
-
-
-def _get_sorted_internal_nodes(root: Any, var_to_idx: dict[Any, int]) -> list[Any]:
-    """Extracts and sorts internal nodes of the BDD using BFS."""
-    if root.var is None:
-        return []
-
-    nodes = [root]
-    visited = {root}
-    idx = 0
-    while idx < len(nodes):
-        u = nodes[idx]
-        idx += 1
-        for child in [u.low, u.high]:
-            act_c = ~child if child.negated else child
-            if act_c.var is not None and act_c not in visited:
-                visited.add(act_c)
-                nodes.append(act_c)
-
-    return sorted(nodes, key=lambda x: var_to_idx[x.var], reverse=True)
-
-
-def _perform_sampling(ctx: SamplingContext,
-                      n_samples: int,
-                      with_replacement: bool) -> list[dict[Any, bool]]:
-    """Executes the weighted random selection process."""
-    results: list[dict[Any, bool]] = []
-    seen_configs = set()
-    actual_root = ~ctx.target_root if ctx.target_root.negated else ctx.target_root
-
-    while len(results) < n_samples:
-        config_vals = _sample_one_config(actual_root, ctx.target_root.negated, ctx)
-        config_tuple = tuple(sorted(config_vals.items()))
-        if with_replacement or config_tuple not in seen_configs:
-            seen_configs.add(config_tuple)
-            full_config = {**ctx.assignment, **config_vals}
-            results.append({ctx.vars_features[k]: v for k, v in full_config.items()})
-
-    return results
-
-
-def _sample_one_config(actual_root: Any,
-                       is_negated: bool,
-                       ctx: SamplingContext) -> dict[Any, bool]:
-    """Generates a single valid configuration by traversing the BDD."""
-    config = {}
-    u = actual_root
-    n_rem = len(ctx.remaining_vars)
-    for i, var in enumerate(ctx.remaining_vars):
-        if u.var == var:
-            s_low, s_high = ctx.s_count[u]
-            # Adjust if the path has odd parity
-            if is_negated:
-                s_low_eff = (2 ** (n_rem - i - 1)) - s_low
-                s_high_eff = (2 ** (n_rem - i - 1)) - s_high
-            else:
-                s_low_eff, s_high_eff = s_low, s_high
-
-            if random.random() < (s_high_eff / (s_low_eff + s_high_eff)):
-                config[var], edge = True, u.high
-            else:
-                config[var], edge = False, u.low
-
-            if edge.negated:
-                is_negated = not is_negated
-            u = ~edge if edge.negated else edge
-        else:
-            config[var] = random.choice([True, False])
-    return config
+    return BDDSampler(bdd_model, assignment, seed).sample(n_samples, with_replacement)
+
+
+def _distinct_ranks(total: int, rng: random.Random) -> Generator[int, None, None]:
+    """Lazy uniform random permutation of range(total) (sparse Fisher-Yates shuffle).
+
+    Only the displaced positions are stored, so drawing k ranks takes O(k) time and memory
+    whatever the total.
+    """
+    displaced: dict[int, int] = {}
+    for i in range(total):
+        j = rng.randrange(i, total)
+        current = displaced.pop(i, i)
+        rank = current
+        if j != i:
+            rank = displaced.get(j, j)
+            displaced[j] = current
+        yield rank
+
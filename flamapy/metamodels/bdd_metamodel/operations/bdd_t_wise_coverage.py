@@ -0,0 +1,101 @@
+from typing import Any, Optional, Union, cast
+
+import numpy as np
+
+from flamapy.core.models import VariabilityModel
+from flamapy.core.operations import Operation
+from flamapy.core.exceptions import FlamaException
+from flamapy.metamodels.configuration_metamodel.models import Configuration
+from flamapy.metamodels.bdd_metamodel.models import BDDModel
+from flamapy.metamodels.bdd_metamodel.operations.bdd_t_wise_sampling import (
+    T_VALUES,
+    TWiseInteractions,
+)
+
+
+class BDDTWiseCoverage(Operation):
+    """T-wise coverage of a sample of products: the fraction of the valid t-wise interactions of
+    the features (t = 2 or 3) that some product of the sample has.
+
+    An interaction is a combination of t features, each one selected or deselected, and it is
+    valid if some product of the model has it. The valid interactions are found with the BDD in
+    one pass over the diagram for pairs (one per feature value for triples) instead of one
+    count per interaction, and only they are stored, as packed bitsets shared with
+    BDDTWiseSampling (see TWiseInteractions). The pairs of the sample are gathered in batches of
+    products with matrix products of their feature values, and the triples of each product
+    from the rows of its valid pairs that are still uncovered. The sample
+    can be the output of BDDSampling or any list of configurations (features missing from a
+    configuration are deselected), and the invalid interactions of invalid products are not
+    counted. The uncovered valid interactions are reported too.
+
+    It also supports a partial configuration: only the products that extend it and the
+    interactions of the unassigned features are considered.
+    """
+
+    def __init__(self) -> None:
+        self._result: float = 0.0
+        self._t: int = 2
+        self._sample: list[Union[Configuration, dict[Any, bool]]] = []
+        self._partial_configuration: Optional[Configuration] = None
+        self._interactions_number: tuple[int, int] = (0, 0)
+        self._uncovered: list[tuple[tuple[Any, bool], ...]] = []
+
+    def set_t(self, t: int) -> None:
+        """Number of features of the interactions (2 for pairwise, 3)."""
+        if t not in T_VALUES:
+            raise FlamaException(f"T-wise coverage supports t in {T_VALUES}, not {t}.")
+        self._t = t
+
+    def set_sample(self, sample: list[Union[Configuration, dict[Any, bool]]]) -> None:
+        """Products of the sample, as configurations or dicts of features to their selection."""
+        self._sample = sample
+
+    def set_partial_configuration(self, partial_configuration: Optional[Configuration]) -> None:
+        self._partial_configuration = partial_configuration
+
+    def execute(self, model: VariabilityModel) -> "BDDTWiseCoverage":
+        bdd_model = cast(BDDModel, model)
+        # Handle partial configuration
+        assignment = {}
+        if self._partial_configuration is not None:
+            assignment = {bdd_model.features_vars[feat]: selected
+                          for feat, selected in self._partial_configuration.elements.items()}
+            if self._partial_configuration.is_full:
+                for feature in bdd_model.features_vars.keys():
+                    if feature not in self._partial_configuration.elements:
+                        assignment[bdd_model.features_vars[feature]] = False
+        interactions = TWiseInteractions(bdd_model, self._t, assignment)
+        features = [bdd_model.vars_features[var] for var in interactions.remaining_vars]
+        assigned = {bdd_model.vars_features[var]: value for var, value in assignment.items()}
+        rows = []
+        for product in self._sample:
+            elements = product.elements if isinstance(product, Configuration) else product
+            if all(bool(elements.get(feature, False)) == value
+                   for feature, value in assigned.items()):
+                rows.append([bool(elements.get(feature, False)) for feature in features])
+        values = np.array(rows, dtype=bool).reshape(len(rows), len(features))
+        interactions.cover_products(values)
+        self._result = interactions.coverage()
+        self._interactions_number = (interactions.covered, interactions.feasible)
+        # (feature, selected) of each literal, looked up for all the interactions at once
+        names = np.empty(interactions.n_literals, dtype=object)
+        names[:] = [(features[literal >> 1], bool(literal & 1))
+                    for literal in range(interactions.n_literals)]
+        uncovered = names[interactions.uncovered_interactions()].tolist()
+        self._uncovered = list(map(tuple, uncovered))
+        return self
+
+    def get_result(self) -> float:
+        return self._result
+
+    def get_coverage(self) -> float:
+        return self.get_result()
+
+    def get_interactions_number(self) -> tuple[int, int]:
+        """Number of valid t-wise interactions covered by the sample, and in total."""
+        return self._interactions_number
+
+    def get_uncovered_interactions(self) -> list[tuple[tuple[Any, bool], ...]]:
+        """Valid interactions that no product of the sample has, as tuples of (feature,
+        selected) pairs following the order of the variables of the BDD."""
+        return self._uncovered
@@ -0,0 +1,694 @@
+import random
+from typing import Any, Optional, cast
+
+import numpy as np
+import numpy.typing as npt
+
+from flamapy.core.models import VariabilityModel
+from flamapy.core.operations import Operation
+from flamapy.core.exceptions import FlamaException
+from flamapy.metamodels.configuration_metamodel.models import Configuration
+from flamapy.metamodels.bdd_metamodel.models import BDDModel
+from flamapy.metamodels.bdd_metamodel.models.utils import BDDNodeIndex
+
+
+# Supported strengths of the interactions.
+PAIRWISE = 2
+T_VALUES = (PAIRWISE, 3)
+
+# Products whose interactions TWiseInteractions.cover_products gathers at once.
+COVERAGE_CHUNK = 1 << 12
+
+# Rows of interactions that TWiseInteractions.cover updates at once.
+COVER_CHUNK = 1 << 14
+
+# Bits of the words of the packed bitsets.
+WORD_BITS = 64
+
+
+class BDDTWiseSampling(Operation):
+    """T-wise interaction sampling: a small sample of products that covers the valid t-wise
+    interactions of the features (t = 2 or 3).
+
+    An interaction is a combination of t features, each one selected or deselected, and it is
+    valid if some product has it. The sample is built greedily one product at a time, as
+    covering array generators like YASA do: a product starts with the uncovered interaction of
+    the feature value with most uncovered interactions, it is packed with the feature values
+    that cover most uncovered interactions along with the ones already chosen while the BDD
+    says they are still consistent, and it is completed into a valid product with one pass
+    down the BDD (see TWiseInteractions and TWiseSampler).
+
+    It also supports a partial configuration (the interactions of the unassigned features are
+    covered by products that extend it) and a maximum sample size, and it reports the coverage
+    reached.
+    """
+
+    def __init__(self) -> None:
+        self._result: list[Configuration] = []
+        self._t: int = 2
+        self._max_sample_size: Optional[int] = None
+        self._seed: Optional[int] = None
+        self._partial_configuration: Optional[Configuration] = None
+        self._interactions: Optional[TWiseInteractions] = None
+
+    def set_t(self, t: int) -> None:
+        """Number of features of the interactions to cover (2 for pairwise, 3)."""
+        if t not in T_VALUES:
+            raise FlamaException(f"T-wise sampling supports t in {T_VALUES}, not {t}.")
+        self._t = t
+
+    def set_max_sample_size(self, max_sample_size: Optional[int]) -> None:
+        """Stops before full coverage when the sample reaches this size. None for no limit."""
+        if max_sample_size is not None and max_sample_size < 0:
+            raise FlamaException(f"Sample size {max_sample_size} cannot be negative.")
+        self._max_sample_size = max_sample_size
+
+    def set_seed(self, seed: Optional[int]) -> None:
+        """Seeds the random number generator that breaks ties, for reproducible samples."""
+        self._seed = seed
+
+    def set_partial_configuration(self, partial_configuration: Optional[Configuration]) -> None:
+        self._partial_configuration = partial_configuration
+
+    def execute(self, model: VariabilityModel) -> "BDDTWiseSampling":
+        bdd_model = cast(BDDModel, model)
+        # Handle partial configuration
+        assignment = {}
+        if self._partial_configuration is not None:
+            assignment = {bdd_model.features_vars[feat]: selected
+                          for feat, selected in self._partial_configuration.elements.items()}
+            if self._partial_configuration.is_full:
+                for feature in bdd_model.features_vars.keys():
+                    if feature not in self._partial_configuration.elements:
+                        assignment[bdd_model.features_vars[feature]] = False
+        self._interactions = TWiseInteractions(bdd_model, self._t, assignment)
+        sampler = TWiseSampler(self._interactions, self._seed)
+        rows = sampler.sample(self._max_sample_size)
+        self._result = [Configuration({bdd_model.vars_features[var]: value
+                                       for var, value in row.items()}) for row in rows]
+        return self
+
+    def get_result(self) -> list[Configuration]:
+        return self._result
+
+    def get_sample(self) -> list[Configuration]:
+        return self.get_result()
+
+    def get_coverage(self) -> float:
+        """Fraction of the valid t-wise interactions covered by the sample."""
+        return self._interactions.coverage() if self._interactions is not None else 0.0
+
+    def get_interactions_number(self) -> tuple[int, int]:
+        """Number of valid t-wise interactions covered by the sample, and in total."""
+        if self._interactions is None:
+            return 0, 0
+        return self._interactions.covered, self._interactions.feasible
+
+
+class TWiseInteractions:
+    """Valid t-wise interactions (t = 2 or 3) of the variables of a BDD that extend a partial
+    assignment, and which of them are not covered yet.
+
+    Interactions are made of literals 2 * level + value of the remaining variables. The
+    uncovered ones are kept as bitsets of literals packed in the rows of a matrix of 64-bit
+    words (`bits`): for t = 2 one row per literal, with the literals it is not covered with yet,
+    and for t = 3 one row per valid pair (see `pair_rows`), with the third literals of its
+    uncovered triples. So each interaction is in t rows and only the valid ones are stored (t = 3
+    takes at most (2n)^3 / 16 bytes), and covering a product only touches the rows of its
+    literals that still have uncovered interactions (`active`). `compatible` holds the valid
+    pairs, and `literal_weights` the number of uncovered interactions of each literal, kept up to
+    date as products are covered. The valid pairs come from one pass over the diagram (see
+    feasible_pairs), and the valid triples from one such pass per literal, on the diagram
+    restricted to it.
+    """
+
+    def __init__(self,
+                 bdd_model: BDDModel,
+                 t: int,
+                 assignment: Optional[dict[str, bool]] = None) -> None:
+        if t not in T_VALUES:
+            raise FlamaException(f"T-wise interactions support t in {T_VALUES}, not {t}.")
+        self.bdd_model = bdd_model
+        self.t = t
+        self.assignment = assignment or {}
+        self.root = bdd_model.bdd.let(self.assignment, bdd_model.root) if self.assignment \
+            else bdd_model.root
+        self.remaining_vars = [var for var in bdd_model.vars_order if var not in self.assignment]
+        self.n_literals = 2 * len(self.remaining_vars)
+        self.index = BDDNodeIndex(bdd_model, self.root, self.remaining_vars)
+        earlier = _bit_matrix(feasible_pairs(self.index), self.n_literals)
+        self.compatible: npt.NDArray[np.bool_] = earlier | earlier.T
+        # Row of each valid pair (-1 for the other pairs), and its literals (for t = 3)
+        self.pair_rows = np.full((self.n_literals,) * 2, -1, dtype=np.int64)
+        self.pairs = np.zeros((0, 2), dtype=np.int64)
+        if t == PAIRWISE:
+            self.bits = _pack(self.compatible)
+        else:
+            self.pairs = np.argwhere(np.triu(self.compatible))
+            rows = np.arange(len(self.pairs))
+            self.pair_rows[self.pairs[:, 0], self.pairs[:, 1]] = rows
+            self.pair_rows[self.pairs[:, 1], self.pairs[:, 0]] = rows
+            self.bits = self._feasible_triples()
+        # Rows with some uncovered interaction
+        self.active: npt.NDArray[np.bool_] = np.asarray(self.bits.any(axis=1))
+        self.literal_weights = self._count_weights()
+        self.feasible = int(self.literal_weights.sum()) // t
+        self.covered = 0
+
+    def _feasible_triples(self) -> npt.NDArray[np.uint64]:
+        """Rows of the valid pairs with the third literals of their valid triples. The valid
+        pairs of the later variables for each literal come from the diagram restricted to the
+        literal with the earlier variables quantified out."""
+        bdd = self.bdd_model.bdd
+        n_literals = self.n_literals
+        bits = np.zeros((len(self.pairs), _words(n_literals)), dtype=np.uint64)
+        for first in range(n_literals):
+            lvl, value = divmod(first, 2)
+            restricted = bdd.let({self.remaining_vars[lvl]: bool(value)}, self.root)
+            if restricted == bdd.false:
+                continue
+            if lvl > 0:
+                restricted = bdd.exist(self.remaining_vars[:lvl], restricted)
+            index = BDDNodeIndex(self.bdd_model, restricted, self.remaining_vars[lvl + 1:])
+            offset = 2 * (lvl + 1)
+            later = _bit_matrix(feasible_pairs(index), n_literals - offset)
+            if not later.any():
+                continue
+            # Third literals of the pairs of the literal with the later ones
+            others = np.zeros((n_literals - offset, n_literals), dtype=bool)
+            others[:, offset:] = later | later.T
+            seconds = np.arange(offset, n_literals)
+            rows = self.pair_rows[first, seconds]
+            bits[rows[rows >= 0]] |= _pack(others[rows >= 0])
+            # The literal is the third one of the pairs of later literals
+            seconds, thirds = np.nonzero(later.T)
+            rows = self.pair_rows[seconds + offset, thirds + offset]
+            bits[rows, first // WORD_BITS] |= np.uint64(1 << (first % WORD_BITS))
+        return bits
+
+    def _count_weights(self) -> npt.NDArray[np.int64]:
+        """Number of uncovered interactions of each literal, from the rows that have it."""
+        counts = _popcount(self.bits)
+        if self.t == PAIRWISE:
+            return counts
+        weights = np.zeros(self.n_literals, dtype=np.int64)
+        np.add.at(weights, self.pairs[:, 0], counts)
+        np.add.at(weights, self.pairs[:, 1], counts)
+        return weights // 2
+
+    def coverage(self) -> float:
+        """Fraction of the valid interactions covered (1 if there are none)."""
+        return self.covered / self.feasible if self.feasible else 1.0
+
+    def weights(self) -> npt.NDArray[np.int64]:
+        """Number of uncovered interactions of each literal."""
+        return self.literal_weights.copy()
+
+    def rows(self,
+             ids: npt.NDArray[np.int64],
+             blocked: Optional[dict[int, npt.NDArray[np.uint64]]] = None
+             ) -> npt.NDArray[np.uint64]:
+        """Bitsets of some rows, without the `blocked` interactions (bitsets by row)."""
+        rows = self.bits[ids]
+        if blocked:
+            for position in np.flatnonzero(np.isin(ids, list(blocked))):
+                rows[position] &= ~blocked[int(ids[position])]
+        return rows
+
+    def row_id(self, literals: list[int]) -> int:
+        """Row of the interactions with t - 1 literals."""
+        if self.t == PAIRWISE:
+            return literals[0]
+        return int(self.pair_rows[literals[0], literals[1]])
+
+    def block(self, blocked: dict[int, npt.NDArray[np.uint64]], interaction: list[int]) -> None:
+        """Adds an interaction to the bitsets by row of the `blocked` ones."""
+        for literal in interaction:
+            row = self.row_id([other for other in interaction if other != literal])
+            mask = blocked.setdefault(row, np.zeros(self.bits.shape[1], dtype=np.uint64))
+            mask[literal // WORD_BITS] |= np.uint64(1 << (literal % WORD_BITS))
+
+    def gains(self,
+              literal: int,
+              chosen: npt.NDArray[np.uint64],
+              candidates: npt.NDArray[np.intp]) -> npt.NDArray[np.int64]:
+        """Increase of the gains (uncovered interactions of each literal along with t - 1 of
+        the `chosen` literals, a packed bitset) of the `candidates` when `literal` joins the
+        `chosen` ones (for t = 2, of every literal)."""
+        if self.t == PAIRWISE:
+            return _unpack(self.bits[literal], self.n_literals).astype(np.int64)
+        gains = np.zeros(self.n_literals, dtype=np.int64)
+        ids = self.pair_rows[literal, candidates]
+        valid = ids >= 0
+        gains[candidates[valid]] = _popcount(self.bits[ids[valid]] & chosen)
+        return gains
+
+    def cover(self, literals: list[int]) -> int:
+        """Marks the interactions of a product (the literals of its remaining variables) as
+        covered and returns how many of them were not covered."""
+        product = np.array(literals, dtype=np.int64)
+        mask = _pack_literals(product, self.n_literals)
+        if self.t == PAIRWISE:
+            ids, firsts, seconds = product, product, product
+        else:
+            pairs = np.triu_indices(len(product), 1)
+            firsts, seconds = product[pairs[0]], product[pairs[1]]
+            ids = self.pair_rows[firsts, seconds]
+            # Pairs that are not valid or have no uncovered interactions left are skipped
+            kept = ids >= 0
+            kept[kept] = self.active[ids[kept]]
+            ids, firsts, seconds = ids[kept], firsts[kept], seconds[kept]
+        counts = np.zeros(len(ids), dtype=np.int64)
+        for start in range(0, len(ids), COVER_CHUNK):
+            chunk = ids[start:start + COVER_CHUNK]
+            rows = self.bits[chunk]
+            counts[start:start + COVER_CHUNK] = _popcount(rows & mask)
+            rows &= ~mask
+            self.bits[chunk] = rows
+            self.active[chunk] = rows.any(axis=1)
+        if self.t == PAIRWISE:
+            self.literal_weights[product] -= counts
+        else:
+            covered_with = np.zeros(self.n_literals, dtype=np.int64)
+            np.add.at(covered_with, firsts, counts)
+            np.add.at(covered_with, seconds, counts)
+            self.literal_weights -= covered_with // 2
+        covered = int(counts.sum()) // self.t
+        self.covered += covered
+        return covered
+
+    def cover_products(self,
+                       values: npt.NDArray[np.bool_],
+                       chunk_size: int = COVERAGE_CHUNK) -> int:
+        """Marks the interactions of a batch of products (one row of values of the remaining
+        variables each) as covered and returns how many of them were not covered.
+
+        For t = 2, the products are taken in chunks of `chunk_size`, and the pairs present in a
+        chunk come from the product of its (products x literals) incidence matrix with its
+        transpose. For t = 3, the rows of the pairs of each product are covered one product at
+        a time. Interactions that are not valid are never counted, even if invalid products
+        have them.
+        """
+        if self.t != PAIRWISE:
+            levels = 2 * np.arange(values.shape[1])
+            return sum(self.cover((levels + row).tolist()) for row in values.astype(np.int64))
+        covered = 0
+        for start in range(0, len(values), chunk_size):
+            chunk = values[start:start + chunk_size]
+            literals = np.empty((len(chunk), self.n_literals), dtype=np.float32)
+            literals[:, 0::2] = ~chunk
+            literals[:, 1::2] = chunk
+            present = _pack(literals.T @ literals > 0)
+            covered += int(_popcount(self.bits & present).sum()) // PAIRWISE
+            self.bits &= ~present
+        self.active = np.asarray(self.bits.any(axis=1))
+        self.literal_weights = self._count_weights()
+        self.covered += covered
+        return covered
+
+    def uncovered_interactions(self, chunk_size: int = COVER_CHUNK) -> npt.NDArray[np.int64]:
+        """Valid interactions not covered yet, one per row of t literals sorted by level.
+
+        Only the rows with uncovered interactions are unpacked, `chunk_size` at a time, and each
+        interaction is taken from the row of its first t - 1 literals.
+        """
+        if self.t == PAIRWISE:
+            firsts = np.arange(self.n_literals)[:, None]
+        else:
+            firsts = self.pairs
+        interactions = [np.zeros((0, self.t), dtype=np.int64)]
+        ids = np.flatnonzero(self.active)
+        for start in range(0, len(ids), chunk_size):
+            chunk = ids[start:start + chunk_size]
+            rows, others = np.nonzero(_unpack_rows(self.bits[chunk], self.n_literals))
+            literals = firsts[chunk[rows]]
+            later = others > literals[:, -1]
+            interactions.append(np.column_stack((literals[later], others[later])))
+        return np.concatenate(interactions)
+
+
+class TWiseSampler:
+    """Greedy construction of a t-wise covering sample from the interactions of a
+    TWiseInteractions.
+
+    Each product starts with an uncovered interaction of the literal with most uncovered
+    interactions. Then the literal with the largest gain (uncovered interactions it would cover
+    with the literals of the product) joins it, provided it forms valid pairs with them and the
+    BDD has a solution with all of them, and when no literal has a gain, a whole uncovered
+    interaction does, until no interaction can join it. The remaining variables take the values
+    of a solution of the BDD found by one pass down its node index, which prefers the literals
+    with larger gains.
+
+    The pass only takes branches whose node can still reach the literals chosen below it: each
+    node keeps the bitset of the literals of its solutions (`reachable`). That condition is
+    exact for one literal, so the pass rarely backtracks, and the nodes found to have no
+    solution with the chosen literals are not visited again: it takes O(variables) steps in
+    the usual case and O(nodes) at worst.
+    """
+
+    def __init__(self, interactions: TWiseInteractions, seed: Optional[int] = None) -> None:
+        self.interactions = interactions
+        self.index = interactions.index
+        self.rng = random.Random(seed)
+        n_vars = self.index.n_vars
+        # Literals of the variables from each level on
+        self.suffix = [((1 << (2 * n_vars)) - 1) >> (2 * lvl) << (2 * lvl)
+                       for lvl in range(n_vars + 1)]
+        self.reachable = self._reachable_literals()
+
+    def _reachable_literals(self) -> tuple[list[int], list[int]]:
+        """Bottom-up step: bitset of the literals of the solutions of each node (of its
+        complement with parity 1)."""
+        index = self.index
+        reachable: tuple[list[int], list[int]] = ([0] * (len(index) + 1), [0] * (len(index) + 1))
+        for u in range(len(index) - 1, -1, -1):
+            lvl = index.level[u]
+            for parity in (0, 1):
+                literals = 0
+                for value, (child, negated) in enumerate(index.branches(u, bool(parity), lvl)):
+                    if not (child == index.terminal and negated):
+                        literals |= (1 << (2 * lvl + value) | _span(lvl + 1, index.level[child])
+                                     | reachable[negated][child])
+                reachable[parity][u] = literals
+        return reachable
+
+    def sample(self, max_size: Optional[int] = None) -> list[dict[Any, bool]]:
+        """Products (variables to values, including the assigned ones) added until every valid
+        interaction is covered or the sample has `max_size` products."""
+        interactions = self.interactions
+        rows: list[dict[Any, bool]] = []
+        while interactions.covered < interactions.feasible and \
+                (max_size is None or len(rows) < max_size):
+            weights = interactions.weights()
+            partial = self.pack(weights)
+            preference = partial.gains * (int(weights.max()) + 1) + weights
+            solution = cast(list[int], self.solve(partial.mask, preference))
+            interactions.cover(solution)
+            row = dict(interactions.assignment)
+            row.update({interactions.remaining_vars[literal >> 1]: bool(literal & 1)
+                        for literal in solution})
+            rows.append(row)
+        return rows
+
+    def pack(self, weights: npt.NDArray[np.int64]) -> "PartialRow":
+        """Literals of a new product, seeded with an uncovered interaction and packed with the
+        literals with gains and then with whole uncovered interactions while they are
+        consistent with it."""
+        row = PartialRow(self.interactions)
+        # Interactions found inconsistent with the product, by row of TWiseInteractions
+        blocked: dict[int, npt.NDArray[np.uint64]] = {}
+        scale = int(weights.max()) + 1
+        row.add(self._interaction(row, weights, blocked))
+        # Literals of a solution with the ones of the row, to skip the passes it answers
+        witness = 0
+        while True:
+            literal = self._best(row.free & (row.gains > 0), row.gains * scale + weights)
+            if literal >= 0:
+                row.free[literal] = False
+                interaction = [literal]
+            else:
+                interaction = self._interaction(row, weights, blocked)
+                if not interaction:
+                    return row
+            cube = row.mask | _mask(interaction)
+            if cube & ~witness:
+                solution = self.solve(cube, row.gains * scale + weights)
+                if solution is None:
+                    if len(interaction) > 1:
+                        self.interactions.block(blocked, interaction)
+                    continue
+                witness = _mask(solution)
+            row.add(interaction)
+
+    def _interaction(self,
+                     row: "PartialRow",
+                     weights: npt.NDArray[np.int64],
+                     blocked: dict[int, npt.NDArray[np.uint64]]) -> list[int]:
+        """An uncovered interaction of the free literals of the row that is not `blocked`.
+        Empty if there is none.
+
+        For t = 2, it is built from the literal with most of them, then its partner with the
+        largest weight. For t = 3, the literals are tried by decreasing weight, and the first
+        one with some of them takes the partner with most of them along with it, then the third
+        literal with the largest weight. Remaining ties are broken at random.
+        """
+        interactions = self.interactions
+        free = np.flatnonzero(row.free)
+        if len(free) == 0:
+            return []
+        mask = _pack_literals(free, interactions.n_literals)
+        scale = int(weights.max()) + 1
+        if interactions.t == PAIRWISE:
+            bits = interactions.rows(free, blocked) & mask
+            counts = _popcount(bits)
+            first = self._best(counts > 0, counts * scale + weights[free])
+            if first < 0:
+                return []
+            second = self._best(_unpack(bits[first], interactions.n_literals), weights)
+            return [int(free[first]), second]
+        order = free[np.lexsort((self._random(len(free)), -weights[free]))]
+        for first in order[weights[order] > 0]:
+            partners = free[interactions.compatible[first, free]]
+            bits = interactions.rows(interactions.pair_rows[first, partners], blocked) & mask
+            counts = _popcount(bits)
+            second = self._best(counts > 0, counts * scale + weights[partners])
+            if second >= 0:
+                third = self._best(_unpack(bits[second], interactions.n_literals), weights)
+                return [int(first), int(partners[second]), third]
+        return []
+
+    def solve(self,
+              cube: int,
+              preference: Optional[npt.NDArray[np.int64]] = None) -> Optional[list[int]]:
+        """Literals, sorted by level, of a solution with the literals of `cube` (a bitset), or
+        None if there is none. The free values prefer the literals with larger `preference`
+        (False without one)."""
+        index = self.index
+        level, suffix, reachable = index.level, self.suffix, self.reachable
+        values = self._preferred(cube, preference)
+        dead: set[tuple[int, bool]] = set()
+        # Nodes of the path from the root: node, parity, value taken, other value left (or -1)
+        frames: list[list[int]] = []
+        node, negated = index.root, index.root_neg
+        while node != index.terminal or negated:
+            lvl = level[node]
+            if node != index.terminal and (node, negated) not in dead and \
+                    not cube & suffix[lvl] & ~reachable[negated][node]:
+                frames.append([node, negated, values[lvl],
+                               -1 if cube >> (2 * lvl) & 3 else 1 - values[lvl]])
+            else:
+                dead.add((node, negated))
+                while frames and frames[-1][3] < 0:
+                    dead.add((frames[-1][0], bool(frames[-1][1])))
+                    frames.pop()
+                if not frames:
+                    return None
+                frames[-1][2:] = [frames[-1][3], -1]
+            node, parity, value = frames[-1][:3]
+            if value:
+                node, negated = index.high[node], parity != index.high_neg[node]
+            else:
+                node, negated = index.low[node], parity != index.low_neg[node]
+        for frame in frames:
+            values[level[frame[0]]] = frame[2]
+        return [2 * lvl + value for lvl, value in enumerate(values)]
+
+    def _preferred(self, cube: int, preference: Optional[npt.NDArray[np.int64]]) -> list[int]:
+        """Value of each variable given by the `cube`, or else the preferred one."""
+        if preference is None:
+            values = np.zeros(self.index.n_vars, dtype=np.int64)
+        else:
+            values = (preference[1::2] > preference[0::2]).astype(np.int64)
+        literals = _bit_matrix([cube], 2 * self.index.n_vars)[0]
+        values[literals[1::2]] = 1
+        values[literals[0::2]] = 0
+        return values.tolist()
+
+    def _random(self, size: int) -> npt.NDArray[np.float64]:
+        return np.array([self.rng.random() for _ in range(size)])
+
+    def _best(self, candidates: npt.NDArray[np.bool_], scores: npt.NDArray[np.int64]) -> int:
+        """Candidate with the largest score (ties broken at random), or -1 without candidates."""
+        indices = np.flatnonzero(candidates)
+        if len(indices) == 0:
+            return -1
+        best = indices[scores[indices] == scores[indices].max()]
+        return int(best[self.rng.randrange(len(best))])
+
+
+class PartialRow:
+    """Literals chosen for a product under construction, with the gain of each literal (the
+    uncovered interactions it would cover along with them) and the literals that can still join
+    them (of unassigned variables and forming valid pairs with all of them)."""
+
+    def __init__(self, interactions: TWiseInteractions) -> None:
+        self.interactions = interactions
+        self.literals: list[int] = []
+        self.mask = 0
+        self.packed = np.zeros(_words(interactions.n_literals), dtype=np.uint64)
+        self.gains = np.zeros(interactions.n_literals, dtype=np.int64)
+        self.free = np.ones(interactions.n_literals, dtype=bool)
+
+    def add(self, literals: list[int]) -> None:
+        for literal in literals:
+            self.free &= self.interactions.compatible[literal]
+            self.free[literal & ~1:(literal | 1) + 1] = False
+            # Only the gains of the literals that can still join are needed
+            self.gains += self.interactions.gains(literal, self.packed, np.flatnonzero(self.free))
+            self.literals.append(literal)
+            self.mask |= 1 << literal
+            self.packed[literal // WORD_BITS] |= np.uint64(1 << (literal % WORD_BITS))
+
+
+def feasible_pairs(index: BDDNodeIndex) -> list[int]:
+    """For each literal 2 * level + value of the variables of the index, bitset of the literals
+    of the earlier variables that appear along with it in some solution.
+
+    The literals with which some path from the root reaches each node are propagated top-down
+    as bitsets. A literal of the variable of a node pairs with the literals of the paths to the
+    node when its branch is not FALSE, and a literal of a variable skipped by an edge pairs with
+    the literals of the paths through the edge and with both literals of the variables skipped
+    before it (see SkippedLevels).
+    """
+    pairs = [0] * (2 * index.n_vars)
+    # Bitsets of the literals of the paths to each node, by parity of complemented edges
+    above: list[list[Optional[int]]] = [[None] * len(index), [None] * len(index)]
+    skipped = SkippedLevels(index.n_vars)
+
+    def follow(start: int, path: int, child: int, negated: bool) -> None:
+        """Edge with the literals `path` to `child`, skipping the variables from `start`."""
+        if child == index.terminal and negated:
+            return
+        end = index.level[child]
+        skipped.add(start, end, path)
+        if child != index.terminal:
+            previous = above[negated][child]
+            path |= _span(start, end)
+            above[negated][child] = path if previous is None else previous | path
+
+    follow(0, 0, index.root, index.root_neg)
+    for u in range(len(index)):
+        lvl = index.level[u]
+        for parity in (0, 1):
+            path = above[parity][u]
+            if path is None:
+                continue
+            for value, (child, negated) in enumerate(index.branches(u, bool(parity), lvl)):
+                if not (child == index.terminal and negated):
+                    pairs[2 * lvl + value] |= path
+                    follow(lvl + 1, path | 1 << (2 * lvl + value), child, negated)
+
+    for lvl in range(index.n_vars):
+        partners = skipped.partners(lvl)
+        pairs[2 * lvl] |= partners
+        pairs[2 * lvl + 1] |= partners
+    return pairs
+
+
+class SkippedLevels:
+    """Segment tree over the levels of the edges that skip them.
+
+    Each edge adds the literals of its paths and its first skipped level to the O(log n) nodes
+    of the tree covering its range, so long edges (e.g., to the TRUE terminal) do not cost
+    O(n), and the union of the nodes above a level gives the partners of its literals.
+    """
+
+    def __init__(self, n_vars: int) -> None:
+        self.n_vars = n_vars
+        self.paths = [0] * (2 * n_vars)
+        self.first = [n_vars] * (2 * n_vars)
+
+    def add(self, start: int, end: int, path: int) -> None:
+        """Edge with the literals `path` skipping the levels [start, end)."""
+        low, high = start + self.n_vars, end + self.n_vars
+        while low < high:
+            if low & 1:
+                self._set(low, start, path)
+                low += 1
+            if high & 1:
+                high -= 1
+                self._set(high, start, path)
+            low, high = low >> 1, high >> 1
+
+    def _set(self, pos: int, start: int, path: int) -> None:
+        self.paths[pos] |= path
+        self.first[pos] = min(self.first[pos], start)
+
+    def partners(self, lvl: int) -> int:
+        """Literals that form a valid pair with the literals of a level by skipping it: those
+        of the paths of the edges that skip it, and both literals of the variables that they
+        skip before it."""
+        pos, path, start = lvl + self.n_vars, 0, self.n_vars
+        while pos:
+            path |= self.paths[pos]
+            start = min(start, self.first[pos])
+            pos >>= 1
+        return path | _span(start, lvl) if start <= lvl else 0
+
+
+def _words(width: int) -> int:
+    """Number of words of the packed bitsets of `width` elements."""
+    return (width + WORD_BITS - 1) // WORD_BITS
+
+
+def _pack(matrix: npt.NDArray[np.bool_]) -> npt.NDArray[np.uint64]:
+    """Rows of a boolean matrix as packed bitsets (element i is bit i % 64 of word i // 64)."""
+    n_bytes = _words(matrix.shape[-1]) * WORD_BITS // 8
+    packed = np.zeros((*matrix.shape[:-1], n_bytes), dtype=np.uint8)
+    packed[..., :(matrix.shape[-1] + 7) // 8] = np.packbits(matrix, axis=-1, bitorder="little")
+    return packed.view("<u8").astype(np.uint64, copy=False)
+
+
+def _unpack(bitset: npt.NDArray[np.uint64], width: int) -> npt.NDArray[np.bool_]:
+    """Boolean vector of `width` elements of a packed bitset."""
+    data = bitset.astype("<u8", copy=False).view(np.uint8)
+    return np.unpackbits(data, count=width, bitorder="little").astype(bool)
+
+
+def _unpack_rows(bitsets: npt.NDArray[np.uint64], width: int) -> npt.NDArray[np.bool_]:
+    """Boolean matrix of `width` columns of some packed bitsets (one per row)."""
+    data = np.ascontiguousarray(bitsets.astype("<u8", copy=False)).view(np.uint8)
+    return np.unpackbits(data, axis=-1, count=width, bitorder="little").astype(bool)
+
+
+def _pack_literals(literals: npt.NDArray[Any], width: int) -> npt.NDArray[np.uint64]:
+    """Packed bitset of some literals."""
+    members = np.zeros(width, dtype=bool)
+    members[literals] = True
+    return _pack(members)
+
+
+def _popcount(bitsets: npt.NDArray[np.uint64]) -> npt.NDArray[np.int64]:
+    """Number of members of each packed bitset (along the last axis)."""
+    bit_count = getattr(np, "bitwise_count", None)
+    if bit_count is not None:
+        counts = bit_count(bitsets)
+    else:
+        # SWAR count of the bits of each word (NumPy < 2.0 has no bitwise_count)
+        words = bitsets - ((bitsets >> np.uint64(1)) & np.uint64(0x5555555555555555))
+        words = (words & np.uint64(0x3333333333333333)) + \
+            ((words >> np.uint64(2)) & np.uint64(0x3333333333333333))
+        words = (words + (words >> np.uint64(4))) & np.uint64(0x0F0F0F0F0F0F0F0F)
+        counts = (words * np.uint64(0x0101010101010101)) >> np.uint64(56)
+    return np.asarray(counts.sum(axis=-1, dtype=np.int64))
+
+
+def _bit_matrix(bitsets: list[int], width: int) -> npt.NDArray[np.bool_]:
+    """Boolean matrix with one row per bitset and `width` columns."""
+    n_bytes = (width + 7) // 8
+    data = b"".join(bitset.to_bytes(n_bytes, "little") for bitset in bitsets)
+    rows = np.frombuffer(data, dtype=np.uint8).reshape(len(bitsets), n_bytes)
+    return np.unpackbits(rows, axis=1, count=width, bitorder="little").astype(bool)
+
+
+def _span(start: int, end: int) -> int:
+    """Bitset of both literals of the variables [start, end)."""
+    return ((1 << (2 * (end - start))) - 1) << (2 * start) if end > start else 0
+
+
+def _mask(literals: list[int]) -> int:
+    """Bitset of some literals."""
+    mask = 0
+    for literal in literals:
+        mask |= 1 << literal
+    return mask
@@ -0,0 +1,110 @@
+import heapq
+import itertools
+from typing import Any, Generator, Optional, cast
+
+from flamapy.core.models import VariabilityModel
+from flamapy.core.operations import Operation
+from flamapy.metamodels.configuration_metamodel.models import Configuration
+from flamapy.metamodels.bdd_metamodel.models import BDDModel
+from flamapy.metamodels.bdd_metamodel.operations.bdd_optimal_configuration import LinearObjective
+
+
+class BDDTopKConfigurations(Operation):
+    """It generates the configurations of the BDD model in increasing order of a linear
+    objective: the sum of the weights of their selected features.
+
+    The result is a lazy generator of (configuration, cost) pairs, with at most k of them (all of
+    them with None) and only those whose cost does not exceed the cost cap, if any. It also
+    supports a partial configuration.
+    """
+
+    def __init__(self) -> None:
+        self._result: Generator[tuple[Configuration, Any], None, None]
+        self._k: Optional[int] = None
+        self._weights: dict[Any, Any] = {}
+        self._max_cost: Optional[Any] = None
+        self._partial_configuration: Optional[Configuration] = None
+
+    def set_k(self, k: Optional[int]) -> None:
+        self._k = k
+
+    def set_weights(self, weights: dict[Any, Any]) -> None:
+        self._weights = weights
+
+    def set_max_cost(self, max_cost: Optional[Any]) -> None:
+        self._max_cost = max_cost
+
+    def set_partial_configuration(self, partial_configuration: Optional[Configuration]) -> None:
+        self._partial_configuration = partial_configuration
+
+    def execute(self, model: VariabilityModel) -> "BDDTopKConfigurations":
+        bdd_model = cast(BDDModel, model)
+        # Handle partial configuration
+        assignment = {}
+        if self._partial_configuration is not None:
+            assignment = {bdd_model.features_vars[feat]: selected
+                          for feat, selected in self._partial_configuration.elements.items()}
+            if self._partial_configuration.is_full:
+                for feature in bdd_model.features_vars.keys():
+                    if feature not in self._partial_configuration.elements:
+                        assignment[bdd_model.features_vars[feature]] = False
+        weights = {bdd_model.features_vars[feat]: weight for feat, weight in self._weights.items()}
+        stream = best_configurations(bdd_model, weights, assignment, self._max_cost)
+        if self._k is not None:
+            stream = (solution for solution in itertools.islice(stream, self._k))
+        self._result = stream
+        return self
+
+    def get_result(self) -> Generator[tuple[Configuration, Any], None, None]:
+        return self._result
+
+    def top_k_configurations(self) -> Generator[tuple[Configuration, Any], None, None]:
+        return self.get_result()
+
+
+def best_configurations(bdd_model: BDDModel,
+                        weights: dict[str, Any],
+                        assignment: Optional[dict[str, bool]] = None,
+                        max_cost: Optional[Any] = None
+                        ) -> Generator[tuple[Configuration, Any], None, None]:
+    """Lazily generates the solutions (that extend the partial assignment) in increasing order of
+    the sum of the weights (by variable) of their selected variables, up to `max_cost`.
+
+    It is a k-shortest-paths search whose heuristic, the minimum cost to complete a path
+    (LinearObjective), is exact. Each popped deviation is completed greedily into the next
+    solution, and the branches it leaves at each variable (skipped variables included, as free
+    choices) are pushed with their exact best cost. So each solution costs O(variables) heap
+    operations, and after k solutions the heap holds O(k * variables) deviations, each one
+    referencing the path of the solution it deviates from.
+    """
+    objective = LinearObjective(bdd_model, weights, assignment)
+    index = objective.index
+    cost = objective.edge_cost(index.root, index.root_neg, 0)
+    if cost is None:
+        return
+    sequence = itertools.count()  # Equal costs are popped in insertion order
+    # Deviations: (cost of the best completion, sequence, path deviated from, level of the
+    # deviation, value at that level, node and complement flag of its edge, prefix cost)
+    heap: list[tuple[Any, int, list[bool], int, bool, int, bool, Any]] = [
+        (cost, next(sequence), [], -1, False, index.root, index.root_neg, 0)]
+    while heap:
+        cost, _, base, lvl, value, node, negated, prefix_cost = heapq.heappop(heap)
+        total = objective.fixed_cost + cost
+        if max_cost is not None and total > max_cost:
+            return
+        path = [*base[:lvl], value] if lvl >= 0 else []
+        edge = (node, negated)
+        for var_lvl in range(lvl + 1, index.n_vars):
+            low, high = index.branches(*edge, var_lvl)
+            best_value = objective.choose(var_lvl, low, high)[0]
+            other = low if best_value else high
+            other_cost = objective.edge_cost(*other, var_lvl + 1)
+            if other_cost is not None:
+                other_prefix = prefix_cost + (0 if best_value else objective.weights[var_lvl])
+                heapq.heappush(heap, (other_prefix + other_cost, next(sequence), path, var_lvl,
+                                      not best_value, *other, other_prefix))
+            if best_value:
+                prefix_cost += objective.weights[var_lvl]
+            edge = high if best_value else low
+            path.append(best_value)
+        yield objective.configuration(path), total
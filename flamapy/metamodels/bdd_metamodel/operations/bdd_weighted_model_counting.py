@@ -0,0 +1,223 @@
+from fractions import Fraction
+from typing import Any, Optional, cast
+
+import numpy as np
+import numpy.typing as npt
+
+from flamapy.core.models import VariabilityModel
+from flamapy.core.operations import Operation
+from flamapy.core.exceptions import FlamaException
+from flamapy.metamodels.configuration_metamodel.models import Configuration
+from flamapy.metamodels.bdd_metamodel.models import BDDModel
+from flamapy.metamodels.bdd_metamodel.models.utils import BDDNodeIndex
+
+
+class BDDWeightedModelCounting(Operation):
+    """Weighted model counting (WMC) of the BDD model.
+
+    Each feature has a weight for its selection and another one for its deselection (by default
+    1/2 and 1/2), and the weight of an assignment is the product of the weights of its literals.
+    The result is the total weight of the solutions. With selection probabilities p (weights p
+    and 1 - p), it is the probability that a random assignment of independent features is a
+    valid product, and the marginals are the conditional probabilities of selecting each
+    feature given that the product is valid.
+
+    It also supports a partial configuration: the weights of the assigned features are left out
+    (the result is conditioned on the partial configuration). Computations use floats, or exact
+    Fractions on request.
+    """
+
+    def __init__(self) -> None:
+        self._result: Any = 0
+        self._marginals: dict[Any, Any] = {}
+        self._weights: dict[Any, tuple[Any, Any]] = {}
+        self._exact: bool = False
+        self._partial_configuration: Optional[Configuration] = None
+
+    def set_probabilities(self, probabilities: dict[Any, Any]) -> None:
+        """Selection probability of each feature (weights p and 1 - p)."""
+        self._weights = {feature: (prob, 1 - prob) for feature, prob in probabilities.items()}
+
+    def set_literal_weights(self, weights: dict[Any, tuple[Any, Any]]) -> None:
+        """Weights (selected, deselected) of each feature. They cannot be negative, and the two
+        weights of a feature cannot be both 0."""
+        self._weights = weights
+
+    def set_exact(self, exact: bool) -> None:
+        """Computes with exact Fractions instead of floats."""
+        self._exact = exact
+
+    def set_partial_configuration(self, partial_configuration: Optional[Configuration]) -> None:
+        self._partial_configuration = partial_configuration
+
+    def execute(self, model: VariabilityModel) -> "BDDWeightedModelCounting":
+        bdd_model = cast(BDDModel, model)
+        # Handle partial configuration
+        assignment = {}
+        if self._partial_configuration is not None:
+            assignment = {bdd_model.features_vars[feat]: selected
+                          for feat, selected in self._partial_configuration.elements.items()}
+            if self._partial_configuration.is_full:
+                for feature in bdd_model.features_vars.keys():
+                    if feature not in self._partial_configuration.elements:
+                        assignment[bdd_model.features_vars[feature]] = False
+        weights = {bdd_model.features_vars[feat]: pair for feat, pair in self._weights.items()}
+        self._result, self._marginals = weighted_model_count(bdd_model, weights, self._exact,
+                                                             assignment)
+        return self
+
+    def get_result(self) -> Any:
+        return self._result
+
+    def weighted_model_count(self) -> Any:
+        return self.get_result()
+
+    def get_marginals(self) -> dict[Any, Any]:
+        """Probability of selecting each feature given that the product is valid."""
+        return self._marginals
+
+
+class WeightedCountingEngine:
+    """Total weight and per-variable marginals with one bottom-up and one top-down pass.
+
+    It is the counting of FeatureInclusionEngine with the weights of the literals in place of 1:
+    a variable skipped by an edge is free, so it multiplies by the sum of its two weights. The
+    weights of each node and of its complement are both propagated bottom-up (instead of
+    subtracting the weight of the node from the one of all the assignments), so floats do not
+    suffer cancellation on small totals. The top-down pass propagates the path weights with
+    parity, and the weight of the solutions that skip a variable is split between its two values
+    in proportion to their weights.
+    """
+
+    def __init__(self, index: BDDNodeIndex, positive: list[Any], negative: list[Any]) -> None:
+        self.index = index
+        self.positive = positive
+        self.negative = negative
+        self.sums = [pos + neg for pos, neg in zip(positive, negative)]
+        self._spans: dict[tuple[int, int], Any] = {}
+        # weights[parity][u]: weight of the solutions of node u (of its complement with parity 1)
+        self.weights: tuple[list[Any], list[Any]] = ([], [])
+
+    def run(self) -> tuple[Any, list[Any]]:
+        """Total weight of the solutions and marginal of each variable."""
+        index = self.index
+        self.compute_weights()
+        total = self.edge_weight(index.root, index.root_neg, 0)
+        if total == 0:
+            return total, [total] * index.n_vars
+        through, high = self._compute_path_weights()
+        marginals = []
+        for lvl in range(index.n_vars):
+            skipping = total - through[lvl]
+            marginals.append((high[lvl] + skipping * self.positive[lvl] / self.sums[lvl]) / total)
+        return total, marginals
+
+    def high_probabilities(self) -> npt.NDArray[np.float64]:
+        """Probability of the high branch of each node (weight of its high branch over its
+        weight) for paths of even (row 0) and odd (row 1) parity of complemented edges."""
+        index = self.index
+        if not self.weights[0]:
+            self.compute_weights()
+        p_high = np.full((2, len(index) + 1), 0.5)
+        for u in range(len(index)):
+            lvl = index.level[u]
+            for parity in (0, 1):
+                total = self.weights[parity][u]
+                high = index.branches(u, bool(parity), lvl)[1]
+                high_weight = self.positive[lvl] * self.edge_weight(*high, lvl + 1)
+                p_high[parity, u] = float(high_weight / total) if total else 0.0
+        return p_high
+
+    def _span(self, start: int, end: int) -> Any:
+        """Weight of the variables [start, end) chosen freely."""
+        if end - start <= 1:
+            return self.sums[start] if end > start else 1
+        key = (start, end)
+        if key not in self._spans:
+            product = self.sums[start]
+            for lvl in range(start + 1, end):
+                product *= self.sums[lvl]
+            self._spans[key] = product
+        return self._spans[key]
+
+    def edge_weight(self, child: int, negated: bool, lvl: int) -> Any:
+        """Weight over the variables [lvl, n) of the solutions of an edge to `child`."""
+        return self.weights[negated][child] * self._span(lvl, self.index.level[child])
+
+    def compute_weights(self) -> None:
+        """Bottom-up step: weight of the solutions of each node and of its complement."""
+        index = self.index
+        self.weights = ([0] * len(index) + [1], [0] * (len(index) + 1))
+        for u in range(len(index) - 1, -1, -1):
+            lvl = index.level[u]
+            for parity in (0, 1):
+                low, high = index.branches(u, bool(parity), lvl)
+                self.weights[parity][u] = (self.negative[lvl] * self.edge_weight(*low, lvl + 1) +
+                                           self.positive[lvl] * self.edge_weight(*high, lvl + 1))
+
+    def _compute_path_weights(self) -> tuple[list[Any], list[Any]]:
+        """Top-down step: weight of the solutions through the nodes of each variable (and their
+        high branch), propagating path weights with parity for complemented edges."""
+        index = self.index
+        w_plus: list[Any] = [0] * len(index)
+        w_minus: list[Any] = [0] * len(index)
+        if index.root != index.terminal:
+            weight = self._span(0, index.level[index.root])
+            if index.root_neg:
+                w_minus[index.root] = weight
+            else:
+                w_plus[index.root] = weight
+
+        through: list[Any] = [0] * index.n_vars
+        high: list[Any] = [0] * index.n_vars
+        for u in range(len(index)):
+            lvl = index.level[u]
+            wp, wm = w_plus[u], w_minus[u]
+            through[lvl] += wp * self.weights[0][u] + wm * self.weights[1][u]
+            high_neg = index.high_neg[u]
+            high[lvl] += self.positive[lvl] * (
+                wp * self.edge_weight(index.high[u], high_neg, lvl + 1) +
+                wm * self.edge_weight(index.high[u], not high_neg, lvl + 1))
+
+            branches = ((index.low[u], index.low_neg[u], self.negative[lvl]),
+                        (index.high[u], index.high_neg[u], self.positive[lvl]))
+            for child, negated, literal in branches:
+                if child == index.terminal:
+                    continue
+                factor = literal * self._span(lvl + 1, index.level[child])
+                if negated:
+                    w_plus[child] += wm * factor
+                    w_minus[child] += wp * factor
+                else:
+                    w_plus[child] += wp * factor
+                    w_minus[child] += wm * factor
+        return through, high
+
+
+def weighted_model_count(bdd_model: BDDModel,
+                         weights: dict[str, tuple[Any, Any]],
+                         exact: bool = False,
+                         assignment: Optional[dict[str, bool]] = None
+                         ) -> tuple[Any, dict[Any, Any]]:
+    """Returns the total weight of the solutions (that extend the partial assignment) with the
+    given literal weights (by variable, 1/2 and 1/2 by default), and the marginal probability
+    of selecting each feature."""
+    assignment = assignment or {}
+    convert = Fraction if exact else float
+    remaining_vars = [var for var in bdd_model.vars_order if var not in assignment]
+    positive, negative = [], []
+    for var in remaining_vars:
+        pos, neg = weights.get(var, (Fraction(1, 2), Fraction(1, 2)))
+        if pos < 0 or neg < 0 or pos + neg == 0:
+            raise FlamaException(f"Invalid weights ({pos}, {neg}) for variable {var}.")
+        positive.append(convert(pos))
+        negative.append(convert(neg))
+
+    root = bdd_model.bdd.let(assignment, bdd_model.root) if assignment else bdd_model.root
+    index = BDDNodeIndex(bdd_model, root, remaining_vars)
+    total, var_marginals = WeightedCountingEngine(index, positive, negative).run()
+    marginals = dict(zip(remaining_vars, var_marginals))
+    marginals.update({var: convert(int(value) if total else 0)
+                      for var, value in assignment.items()})
+    return convert(total), {bdd_model.vars_features[var]: marginals[var]
+                            for var in bdd_model.vars_order}
@@ -1,9 +1,16 @@
+import itertools
+import math
+
+import numpy as np
 import pytest
 from collections import defaultdict
+from fractions import Fraction
 
+from flamapy.core.exceptions import FlamaException
 from flamapy.metamodels.configuration_metamodel.models import Configuration
 from flamapy.metamodels.fm_metamodel.transformations import UVLReader
 from flamapy.metamodels.bdd_metamodel.models import BDDModel
+from flamapy.metamodels.bdd_metamodel.models.utils import BDDNodeIndex
 from flamapy.metamodels.bdd_metamodel.transformations import (
     FmToBDD,
     JSONReader,
@@ -23,7 +30,25 @@ from flamapy.metamodels.bdd_metamodel.operations import (
     BDDUniqueFeatures,
     BDDVariability,
     BDDHomogeneity,
+    BDDBatchFeatureInclusionProbability,
+    BDDBatchConfigurationsNumber,
+    BDDConfigurationsWithNFeatures,
+    BDDConfigurationRank,
+    BDDConfigurationUnrank,
+    BDDConfiguratorSession,
+    BDDSatisfiableConfiguration,
+    BDDBatchSatisfiableConfiguration,
+    BDDOptimalConfiguration,
+    BDDTopKConfigurations,
+    BDDAttributeDistribution,
+    BDDWeightedModelCounting,
+    BDDFeatureCoOccurrence,
+    BDDTWiseSampling,
+    BDDTWiseCoverage,
 )
+from flamapy.metamodels.bdd_metamodel.operations.bdd_product_distribution import DistributionEngine
+from flamapy.metamodels.bdd_metamodel.operations.bdd_sampling import BDDSampler
+from flamapy.metamodels.bdd_metamodel.operations.bdd_configurations import ConfigurationFormat
 
 
 PRECISION = 4
@@ -194,6 +219,104 @@ def test_bdd_product_distribution(path: str, expected: list):
     assert dist == expected
 
 
+@pytest.mark.parametrize(
+    "path, partial_configuration, expected",
+    [
+        ("resources/models/uvl_models/Pizzas.uvl", {"Big": True}, [0, 0, 0, 0, 0, 0, 0, 6, 12, 8, 2, 0, 0]),
+        ("resources/models/uvl_models/Pizzas.uvl", {"Big": True, "Salami": False}, [0, 0, 0, 0, 0, 0, 0, 4, 6, 2, 0, 0, 0]),
+        ("resources/models/uvl_models/MobilePhone.uvl", {"GPS": True}, [0, 0, 0, 0, 0, 2, 0, 3, 1, 0, 0]),
+    ],
+)
+def test_bdd_product_distribution_partial_configuration(path: str, partial_configuration: dict,
+                                                        expected: list):
+    bdd_model = _read_model(path)
+    config = Configuration(partial_configuration)
+    configs_number_op = BDDConfigurationsNumber()
+    configs_number_op.set_partial_configuration(config)
+    dist_op = BDDProductDistribution()
+    # Consecutive executions reuse the engine of the operation
+    for partial_config in [None, config, Configuration({}), config]:
+        dist_op.set_partial_configuration(partial_config)
+        dist = dist_op.execute(bdd_model).get_result()
+    assert dist == expected
+    assert sum(dist) == configs_number_op.execute(bdd_model).get_result()
+
+
+@pytest.mark.parametrize(
+    "path",
+    [
+        "resources/models/uvl_models/JHipster.uvl",
+        "resources/models/uvl_models/Truck.uvl",
+        "resources/models/uvl_models/Pizzas.uvl",
+    ],
+)
+def test_bdd_product_distribution_memory_bounded(path: str, tmp_path):
+    bdd_model = _read_model(path)
+    expected = BDDProductDistribution().execute(bdd_model).get_result()
+    engine = DistributionEngine(bdd_model, memory_bounded=True)
+    assert engine.run() == expected
+    assert not engine.memo
+    assert engine.store.peak_alive < len(BDDNodeIndex(bdd_model))
+    spilling_engine = DistributionEngine(bdd_model, memory_bounded=True,
+                                         spill_dir=str(tmp_path), spill_threshold=2)
+    assert spilling_engine.run() == expected
+    assert not list(tmp_path.iterdir())
+
+
+@pytest.mark.parametrize("n_vars", [10, 62, 63, 150])
+def test_bdd_product_distribution_big_counts(n_vars: int):
+    # ~(v0 & v1) over n_vars variables: C(n, k) - C(n - 2, k - 2) products with k features
+    variables = [f"v{i}" for i in range(n_vars)]
+    bdd_model = BDDModel()
+    bdd_model.build_bdd("~(v0 & v1)", variables)
+    dist = BDDProductDistribution().execute(bdd_model).get_result()
+    expected = [math.comb(n_vars, k) - (math.comb(n_vars - 2, k - 2) if k >= 2 else 0)
+                for k in range(n_vars + 1)]
+    assert dist == expected
+    modular_op = BDDProductDistribution()
+    modular_op.set_modular(True)
+    assert modular_op.execute(bdd_model).get_result() == expected
+
+
+def test_deep_chain_model():
+    # Chain of 20000 mandatory variables, far deeper than Python's recursion limit
+    n_vars = 20000
+    variables = [f"v{i}" for i in range(n_vars)]
+    bdd_model = BDDModel()
+    bdd_model.bdd.declare(*variables)
+    bdd_model.bdd.configure(reordering=False)
+    bdd_model.vars_order = variables
+    bdd_model.vars_features = bdd_model.features_vars = {var: var for var in variables}
+    node = bdd_model.bdd.true
+    for var in reversed(variables):
+        node = bdd_model.bdd.find_or_add(var, bdd_model.bdd.false, node)
+    bdd_model.root = node
+
+    dist = BDDProductDistribution().execute(bdd_model).get_result()
+    assert dist == [0] * n_vars + [1]
+    for n_features, expected in [(n_vars, 1), (n_vars - 1, 0)]:
+        n_features_op = BDDConfigurationsWithNFeatures()
+        n_features_op.set_n_features(n_features)
+        assert len(list(n_features_op.execute(bdd_model).get_result())) == expected
+    bdd_model.dump_structure()
+
+
+@pytest.mark.parametrize(
+    "path",
+    [
+        "resources/models/uvl_models/JHipster.uvl",
+        "resources/models/uvl_models/Truck.uvl",
+        "resources/models/uvl_models/Pizzas_complex.uvl",
+    ],
+)
+def test_bdd_product_distribution_modular(path: str):
+    bdd_model = _read_model(path)
+    modular_op = BDDProductDistribution()
+    modular_op.set_modular(True)
+    dist = modular_op.execute(bdd_model).get_result()
+    assert dist == BDDProductDistribution().execute(bdd_model).get_result()
+
+
 @pytest.mark.parametrize(
     "path, expected",
     [
@@ -376,6 +499,20 @@ def test_probabilities(path: str, expected: dict):
     assert probabilities == expected
 
 
+def test_probabilities_many_variables():
+    # 10000 variables: the counts are far beyond the float range
+    n_vars = 10000
+    variables = [f"v{i}" for i in range(n_vars)]
+    bdd_model = BDDModel()
+    bdd_model.build_bdd("(v0 | v1) & (v9998 => v9999)", variables)
+    bdd_model.vars_features = {var: var for var in variables}
+    bdd_model.features_vars = {var: var for var in variables}
+    probabilities = BDDFeatureInclusionProbability().execute(bdd_model).get_result()
+    expected = dict.fromkeys(variables, 0.5)
+    expected.update({"v0": 2 / 3, "v1": 2 / 3, "v9998": 1 / 3, "v9999": 2 / 3})
+    assert probabilities == expected
+
+
 @pytest.mark.parametrize(
     "path, expected",
     [
@@ -649,3 +786,694 @@ def test_sampling(path: str, sample_size: int, expected: list):
     sampling_op.set_sample_size(sample_size)
     sample = sampling_op.execute(bdd_model).get_result()
     assert len(sample) == expected
+
+
+def test_sampling_seed_and_sampler():
+    bdd_model = _read_model("resources/models/uvl_models/JHipster.uvl")
+    sampling_op = BDDSampling()
+    sampling_op.set_sample_size(10)
+    sampling_op.set_seed(42)
+    first = sampling_op.execute(bdd_model).get_result()
+    sampler = sampling_op.get_sampler()
+    second = sampling_op.execute(bdd_model).get_result()
+    assert sampling_op.get_sampler() is sampler  # The precomputation is reused
+    assert first != second
+    sampling_op.set_seed(42)
+    assert sampling_op.execute(bdd_model).get_result() == first
+
+    # Lazy stream: without replacement it ends after every product has been drawn once
+    bdd_model = _read_model("resources/models/uvl_models/Pizzas.uvl")
+    products = list(BDDSampler(bdd_model, seed=1).samples(with_replacement=False))
+    n_configs = BDDConfigurationsNumber().execute(bdd_model).get_result()
+    assert len(products) == n_configs
+    assert len({tuple(sorted(product.items())) for product in products}) == n_configs
+    assert len(list(itertools.islice(BDDSampler(bdd_model), 3 * n_configs))) == 3 * n_configs
+
+
+def test_sampling_without_replacement():
+    # Drawing every product is linear in their number, not a coupon collector
+    bdd_model = _read_model("resources/models/uvl_models/JHipster.uvl")
+    n_configs = BDDConfigurationsNumber().execute(bdd_model).get_result()
+    sampling_op = BDDSampling()
+    sampling_op.set_sample_size(n_configs + 10)
+    sample = sampling_op.execute(bdd_model).get_result()
+    assert len(sample) == n_configs
+    assert len({tuple(sorted(product.items())) for product in sample}) == n_configs
+    for product in sample[:100]:
+        values = {bdd_model.features_vars[feature]: value for feature, value in product.items()}
+        assert bdd_model.bdd.let(values, bdd_model.root) == bdd_model.bdd.true
+
+
+@pytest.mark.parametrize(
+    "path, partial_configuration",
+    [
+        ("resources/models/uvl_models/Pizzas.uvl", {}),
+        ("resources/models/uvl_models/JHipster.uvl", {"Gradle": True}),
+    ],
+)
+def test_sampling_matrix(path: str, partial_configuration: dict):
+    bdd_model = _read_model(path)
+    assignment = {bdd_model.features_vars[feature]: selected
+                  for feature, selected in partial_configuration.items()}
+    sampler = BDDSampler(bdd_model, assignment, seed=7)
+    matrix = sampler.sample_matrix(2000)
+    assert matrix.shape == (2000, len(bdd_model.vars_order)) and matrix.dtype == np.uint8
+    for row in {tuple(row) for row in matrix.tolist()}:
+        values = {var: bool(value) for var, value in zip(bdd_model.vars_order, row)}
+        assert bdd_model.bdd.let(values, bdd_model.root) == bdd_model.bdd.true
+        assert all(values[var] == selected for var, selected in assignment.items())
+
+    packed = sampler.sample_matrix(5, packed=True)
+    configurations = sampler.configurations(packed, packed=True)
+    assert len(configurations) == 5
+    for configuration in configurations:
+        assert set(configuration.elements) == set(bdd_model.features_vars)
+        assert all(configuration.elements[feature] == selected
+                   for feature, selected in partial_configuration.items())
+
+
+@pytest.mark.parametrize(
+    "path, partial_configurations",
+    [
+        ("resources/models/uvl_models/MobilePhone.uvl", [None, {"GPS": True}, {"Basic": True, "Camera": False}]),
+        ("resources/models/uvl_models/Pizzas.uvl", [{"Big": True}, {"Normal": True, "Big": True}, None]),
+        ("resources/models/uvl_models/Truck.uvl", [{"Tons12": True}, {"KW400": False, "Tank": True}]),
+    ],
+)
+def test_batch_probabilities(path: str, partial_configurations: list):
+    bdd_model = _read_model(path)
+    configs = [None if elements is None else Configuration(elements)
+               for elements in partial_configurations]
+    batch_op = BDDBatchFeatureInclusionProbability()
+    batch_op.set_partial_configurations(configs)
+    batch_op.execute(bdd_model)
+    assert batch_op.get_result().shape == (len(configs), len(bdd_model.vars_order))
+    for config, probabilities in zip(configs, batch_op.feature_inclusion_probabilities()):
+        fip_op = BDDFeatureInclusionProbability()
+        fip_op.set_partial_configuration(config)
+        expected = fip_op.execute(bdd_model).get_result()
+        assert {f: round(p, PRECISION) for f, p in probabilities.items()} == \
+               {f: round(p, PRECISION) for f, p in expected.items()}
+
+
+@pytest.mark.parametrize(
+    "path, partial_configuration",
+    [
+        ("resources/models/uvl_models/Pizzas.uvl", None),
+        ("resources/models/uvl_models/Truck.uvl", None),
+        ("resources/models/uvl_models/Truck.uvl", {"Tons12": True, "KW400": False}),
+    ],
+)
+def test_configuration_ranking(path: str, partial_configuration: dict):
+    bdd_model = _read_model(path)
+    partial = None if partial_configuration is None else Configuration(partial_configuration)
+    n_configs_op = BDDConfigurationsNumber()
+    n_configs_op.set_partial_configuration(partial)
+    n_configs = n_configs_op.execute(bdd_model).get_result()
+    unrank_op = BDDConfigurationUnrank()
+    unrank_op.set_partial_configuration(partial)
+    rank_op = BDDConfigurationRank()
+    rank_op.set_partial_configuration(partial)
+
+    previous = None
+    for rank in range(n_configs):
+        unrank_op.set_rank(rank)
+        configuration = unrank_op.execute(bdd_model).get_result()
+        values = [configuration.elements[bdd_model.vars_features[var]]
+                  for var in bdd_model.vars_order]
+        assert previous is None or previous < values  # Lexicographic order
+        assert all(configuration.elements[feature] == selected
+                   for feature, selected in (partial_configuration or {}).items())
+        rank_op.set_configuration(configuration)
+        assert rank_op.execute(bdd_model).get_result() == rank
+        previous = values
+
+    unrank_op.set_rank(n_configs)
+    with pytest.raises(FlamaException):
+        unrank_op.execute(bdd_model)
+    rank_op.set_configuration(Configuration({}))  # Nothing selected: not a solution
+    assert rank_op.execute(bdd_model).get_result() is None
+
+
+@pytest.mark.parametrize(
+    "path, partial_configuration",
+    [
+        ("resources/models/uvl_models/Pizzas.uvl", None),
+        ("resources/models/uvl_models/Truck.uvl", {"Tons12": True, "KW400": False}),
+    ],
+)
+def test_configurations_pagination(path: str, partial_configuration: dict):
+    bdd_model = _read_model(path)
+    partial = None if partial_configuration is None else Configuration(partial_configuration)
+    configurations_op = BDDConfigurations()
+    configurations_op.set_partial_configuration(partial)
+    all_configurations = configurations_op.execute(bdd_model).get_result()
+    n_configs_op = BDDConfigurationsNumber()
+    n_configs_op.set_partial_configuration(partial)
+    assert len(all_configurations) == n_configs_op.execute(bdd_model).get_result()
+    for configuration in all_configurations:
+        assert all(configuration.elements[feature] == selected
+                   for feature, selected in (partial_configuration or {}).items())
+
+    configurations_op.set_offset(5)
+    configurations_op.set_limit(7)
+    configurations_op.set_lazy(True)
+    page = list(configurations_op.execute(bdd_model).get_stream())
+    assert [c.elements for c in page] == [c.elements for c in all_configurations[5:12]]
+    assert [c.elements for c in configurations_op.get_result()] == [c.elements for c in page]
+
+    configurations_op.set_lazy(False)
+    configurations_op.set_output_format(ConfigurationFormat.INTEGER)
+    integers = configurations_op.execute(bdd_model).get_result()
+    configurations_op.set_output_format(ConfigurationFormat.PACKED)
+    packed = configurations_op.execute(bdd_model).get_result()
+    for configuration, integer, bits in zip(page, integers, packed):
+        values = [configuration.elements.get(bdd_model.vars_features[var], False)
+                  for var in bdd_model.vars_order]
+        assert integer == sum(1 << i for i, value in enumerate(values) if value)
+        assert np.unpackbits(bits, count=len(values)).tolist() == [int(v) for v in values]
+
+
+@pytest.mark.parametrize(
+    "path, partial_configuration",
+    [
+        ("resources/models/uvl_models/JHipster.uvl", None),
+        ("resources/models/uvl_models/Truck.uvl", {"Tons12": True, "KW400": False}),
+    ],
+)
+def test_configurations_with_n_features(path: str, partial_configuration: dict):
+    bdd_model = _read_model(path)
+    partial = None if partial_configuration is None else Configuration(partial_configuration)
+    dist_op = BDDProductDistribution()
+    dist_op.set_partial_configuration(partial)
+    dist = dist_op.execute(bdd_model).get_result()
+    n_features_op = BDDConfigurationsWithNFeatures()
+    n_features_op.set_partial_configuration(partial)
+    for n_features, expected in enumerate(dist):
+        n_features_op.set_n_features(n_features)
+        configurations = list(n_features_op.execute(bdd_model).get_result())
+        assert len(configurations) == expected
+        for configuration in configurations:
+            assert len(configuration.get_selected_elements()) == n_features
+            assert all(configuration.elements[bdd_model.features_vars[feature]] == selected
+                       for feature, selected in (partial_configuration or {}).items())
+
+    k_min, k_max = next(k for k, count in enumerate(dist) if count) + 1, len(dist) // 2
+    n_features_op.set_n_features_range(k_min, k_max)
+    configurations = list(n_features_op.execute(bdd_model).get_result())
+    assert len(configurations) == sum(dist[k_min:k_max + 1])
+    assert len({frozenset(c.get_selected_elements()) for c in configurations}) == \
+        len(configurations)
+
+
+@pytest.mark.parametrize(
+    "path",
+    [
+        "resources/models/uvl_models/JHipster.uvl",
+        "resources/models/uvl_models/Truck.uvl",
+    ],
+)
+def test_batch_satisfiable_configurations(path: str, tmp_path):
+    bdd_model = _read_model(path)
+    features = [bdd_model.vars_features[var] for var in bdd_model.vars_order]
+    valid = BDDSampler(bdd_model, seed=1).sample_matrix(50)
+    flipped = valid.copy()
+    core_feature = BDDCoreFeatures().execute(bdd_model).get_result()[0]
+    flipped[:, features.index(core_feature)] ^= 1  # Deselecting a core feature invalidates it
+    matrix = np.concatenate((valid, flipped))
+    batch_op = BDDBatchSatisfiableConfiguration()
+    batch_op.set_matrix(matrix)
+    mask = batch_op.execute(bdd_model).get_result()
+    assert mask.tolist() == [True] * 50 + [False] * 50
+
+    configurations = []
+    for row in matrix:
+        configuration = Configuration(dict(zip(features, row.astype(bool).tolist())))
+        configuration.set_full(True)
+        satisfiable_op = BDDSatisfiableConfiguration()
+        satisfiable_op.set_configuration(configuration)
+        assert satisfiable_op.execute(bdd_model).get_result() == mask[len(configurations)]
+        configurations.append(Configuration({f: True for f, v in configuration.elements.items()
+                                             if v}))
+    batch_op.set_configurations(configurations)
+    assert batch_op.execute(bdd_model).get_result().tolist() == mask.tolist()
+
+    # CSV file with the columns in reverse order
+    csv_path = tmp_path / "configurations.csv"
+    np.savetxt(csv_path, matrix[:, ::-1], fmt="%d", delimiter=",",
+               header=",".join(reversed(features)), comments="")
+    batch_op.set_file(str(csv_path))
+    assert batch_op.execute(bdd_model).get_result().tolist() == mask.tolist()
+    npy_path = tmp_path / "configurations.npy"
+    np.save(npy_path, matrix)
+    batch_op.set_file(str(npy_path))
+    assert batch_op.execute(bdd_model).get_result().tolist() == mask.tolist()
+
+
+@pytest.mark.parametrize(
+    "path",
+    [
+        "resources/models/uvl_models/Pizzas.uvl",
+        "resources/models/uvl_models/Truck.uvl",
+    ],
+)
+def test_batch_configurations_number(path: str):
+    bdd_model = _read_model(path)
+    features = [bdd_model.vars_features[var] for var in bdd_model.vars_order]
+    # Counts for every pair of selected features, plus the whole model and a full configuration
+    partial_configurations = [Configuration({f1: True, f2: True})
+                              for f1, f2 in itertools.combinations(features, 2)]
+    full_configuration = Configuration({features[0]: True})
+    full_configuration.set_full(True)
+    partial_configurations += [None, Configuration({}), full_configuration]
+    batch_op = BDDBatchConfigurationsNumber()
+    batch_op.set_partial_configurations(partial_configurations)
+    counts = batch_op.execute(bdd_model).get_result()
+    assert len(counts) == len(partial_configurations)
+    for partial_configuration, count in zip(partial_configurations, counts):
+        n_configs_op = BDDConfigurationsNumber()
+        n_configs_op.set_partial_configuration(partial_configuration)
+        assert n_configs_op.execute(bdd_model).get_result() == count
+
+
+def test_configurator_session():
+    bdd_model = _read_model("resources/models/uvl_models/Truck.uvl")
+    session = BDDConfiguratorSession(bdd_model)
+
+    def check_session():
+        partial = Configuration(dict(session.decisions))
+        core_op = BDDCoreFeatures()
+        core_op.set_partial_configuration(partial)
+        dead_op = BDDDeadFeatures()
+        dead_op.set_partial_configuration(partial)
+        n_configs_op = BDDConfigurationsNumber()
+        n_configs_op.set_partial_configuration(partial)
+        assert set(session.implied_features()) == \
+            set(core_op.execute(bdd_model).get_result()) - set(session.decisions)
+        assert set(session.excluded_features()) == \
+            set(dead_op.execute(bdd_model).get_result()) - set(session.decisions)
+        assert session.count() == n_configs_op.execute(bdd_model).get_result()
+
+    check_session()
+    step = session.decide("Tons12")
+    assert step.n_configurations == session.count()
+    assert set(step.implied) <= set(session.implied_features())
+    check_session()
+    step = session.decide("KW400", False)
+    check_session()
+    excluded = session.excluded_features()
+    with pytest.raises(FlamaException):
+        session.decide(excluded[0])  # Conflicting decision: not applied
+    assert session.excluded_features() == excluded
+    session.decide("KW160")
+    check_session()
+
+    step = session.retract("Tons12")
+    check_session()
+    assert list(session.decisions) == ["KW400", "KW160"]
+    step = session.undo()
+    assert step.n_configurations == session.count()
+    check_session()
+    session.undo()
+    assert not session.decisions
+    check_session()
+    with pytest.raises(FlamaException):
+        session.undo()
+
+
+@pytest.mark.parametrize(
+    "path, partial_configuration",
+    [
+        ("resources/models/uvl_models/JHipster.uvl", None),
+        ("resources/models/uvl_models/Truck.uvl", {"Tons12": True, "KW400": False}),
+    ],
+)
+def test_optimal_configuration(path: str, partial_configuration: dict):
+    bdd_model = _read_model(path)
+    partial = None if partial_configuration is None else Configuration(partial_configuration)
+    features = [bdd_model.vars_features[var] for var in bdd_model.vars_order]
+    weights = {feature: (i * 7919) % 23 - 11 for i, feature in enumerate(features)}
+    configurations_op = BDDConfigurations()
+    configurations_op.set_partial_configuration(partial)
+    costs = [sum(weights[f] for f in c.get_selected_elements())
+             for c in configurations_op.execute(bdd_model).get_result()]
+
+    optimal_op = BDDOptimalConfiguration()
+    optimal_op.set_weights(weights)
+    optimal_op.set_partial_configuration(partial)
+    for maximize, expected in [(False, min(costs)), (True, max(costs))]:
+        optimal_op.set_maximize(maximize)
+        configuration = optimal_op.execute(bdd_model).get_result()
+        assert optimal_op.get_value() == expected
+        assert sum(weights[f] for f in configuration.get_selected_elements()) == expected
+        assert all(configuration.elements[feature] == selected
+                   for feature, selected in (partial_configuration or {}).items())
+        satisfiable_op = BDDSatisfiableConfiguration()
+        configuration.set_full(True)
+        satisfiable_op.set_configuration(configuration)
+        assert satisfiable_op.execute(bdd_model).get_result()
+
+    # Without weights every solution is optimal: the lexicographically smallest one is returned
+    optimal_op.set_weights({})
+    unrank_op = BDDConfigurationUnrank()
+    unrank_op.set_partial_configuration(partial)
+    assert optimal_op.execute(bdd_model).get_result().elements == \
+        unrank_op.execute(bdd_model).get_result().elements
+
+
+@pytest.mark.parametrize(
+    "path, partial_configuration",
+    [
+        ("resources/models/uvl_models/JHipster.uvl", None),
+        ("resources/models/uvl_models/Truck.uvl", {"Tons12": True, "KW400": False}),
+    ],
+)
+def test_top_k_configurations(path: str, partial_configuration: dict):
+    bdd_model = _read_model(path)
+    partial = None if partial_configuration is None else Configuration(partial_configuration)
+    features = [bdd_model.vars_features[var] for var in bdd_model.vars_order]
+    weights = {feature: (i * 7919) % 23 - 11 for i, feature in enumerate(features)}
+    configurations_op = BDDConfigurations()
+    configurations_op.set_partial_configuration(partial)
+    costs = sorted(sum(weights[f] for f in c.get_selected_elements())
+                   for c in configurations_op.execute(bdd_model).get_result())
+
+    top_k_op = BDDTopKConfigurations()
+    top_k_op.set_weights(weights)
+    top_k_op.set_partial_configuration(partial)
+    solutions = list(top_k_op.execute(bdd_model).get_result())
+    assert [cost for _, cost in solutions] == costs
+    assert len({frozenset(c.get_selected_elements()) for c, _ in solutions}) == len(costs)
+    for configuration, cost in solutions:
+        assert sum(weights[f] for f in configuration.get_selected_elements()) == cost
+
+    top_k_op.set_k(10)
+    top_k_op.set_max_cost(costs[5])
+    best = list(top_k_op.execute(bdd_model).get_result())
+    assert [cost for _, cost in best] == [cost for cost in costs if cost <= costs[5]][:10]
+
+
+@pytest.mark.parametrize(
+    "path, partial_configuration",
+    [
+        ("resources/models/uvl_models/JHipster.uvl", None),
+        ("resources/models/uvl_models/Truck.uvl", {"Tons12": True, "KW400": False}),
+    ],
+)
+def test_attribute_distribution(path: str, partial_configuration: dict):
+    bdd_model = _read_model(path)
+    partial = None if partial_configuration is None else Configuration(partial_configuration)
+    features = [bdd_model.vars_features[var] for var in bdd_model.vars_order]
+    weights = {feature: (i * 7919) % 23 - 11 for i, feature in enumerate(features)}
+    configurations_op = BDDConfigurations()
+    configurations_op.set_partial_configuration(partial)
+    costs = [sum(weights[f] for f in c.get_selected_elements())
+             for c in configurations_op.execute(bdd_model).get_result()]
+
+    attribute_op = BDDAttributeDistribution()
+    attribute_op.set_weights(weights)
+    attribute_op.set_partial_configuration(partial)
+    distribution = attribute_op.execute(bdd_model).get_result()
+    assert distribution == {value: costs.count(value) for value in sorted(set(costs))}
+    moments = attribute_op.get_moments()
+    assert moments["Count"] == len(costs)
+    assert moments["Mean"] == pytest.approx(sum(costs) / len(costs))
+    assert moments["Variance"] == pytest.approx(
+        sum(c * c for c in costs) / len(costs) - (sum(costs) / len(costs)) ** 2)
+    statistics = attribute_op.descriptive_statistics()
+    assert (statistics["Min"], statistics["Max"]) == (min(costs), max(costs))
+    assert statistics["Mean"] == pytest.approx(moments["Mean"])
+    assert statistics["Standard deviation"] == pytest.approx(moments["Standard deviation"])
+
+    # With unit weights it is the product distribution
+    attribute_op.set_weights(dict.fromkeys(features, 1))
+    distribution = attribute_op.execute(bdd_model).get_result()
+    dist_op = BDDProductDistribution()
+    dist_op.set_partial_configuration(partial)
+    product_distribution = dist_op.execute(bdd_model).get_result()
+    assert distribution == {k: count for k, count in enumerate(product_distribution) if count}
+    assert attribute_op.descriptive_statistics() == dist_op.descriptive_statistics()
+    attribute_op.set_moments_only(True)
+    assert attribute_op.execute(bdd_model).get_result() == {}
+    assert attribute_op.get_moments()["Mean"] == \
+        pytest.approx(dist_op.descriptive_statistics()["Mean"])
+
+
+@pytest.mark.parametrize(
+    "path, partial_configuration",
+    [
+        ("resources/models/uvl_models/JHipster.uvl", None),
+        ("resources/models/uvl_models/Truck.uvl", {"Tons12": True, "KW400": False}),
+    ],
+)
+def test_weighted_model_counting(path: str, partial_configuration: dict):
+    bdd_model = _read_model(path)
+    partial = None if partial_configuration is None else Configuration(partial_configuration)
+    features = [bdd_model.vars_features[var] for var in bdd_model.vars_order]
+    probabilities = {feature: Fraction(i % 7 + 1, 9) for i, feature in enumerate(features)}
+    configurations_op = BDDConfigurations()
+    configurations_op.set_partial_configuration(partial)
+    total = Fraction(0)
+    selected_weight = dict.fromkeys(features, Fraction(0))
+    for configuration in configurations_op.execute(bdd_model).get_result():
+        selected = set(configuration.get_selected_elements())
+        weight = math.prod(probabilities[f] if f in selected else 1 - probabilities[f]
+                           for f in features if f not in (partial_configuration or {}))
+        total += weight
+        for feature in selected:
+            selected_weight[feature] += weight
+
+    wmc_op = BDDWeightedModelCounting()
+    wmc_op.set_probabilities(probabilities)
+    wmc_op.set_partial_configuration(partial)
+    wmc_op.set_exact(True)
+    assert wmc_op.execute(bdd_model).get_result() == total
+    assert wmc_op.get_marginals() == {f: selected_weight[f] / total for f in features}
+    wmc_op.set_exact(False)
+    assert wmc_op.execute(bdd_model).get_result() == pytest.approx(float(total), rel=1e-12)
+
+    # Uniform weights give the feature inclusion probabilities
+    wmc_op.set_literal_weights({})
+    wmc_op.execute(bdd_model)
+    fip_op = BDDFeatureInclusionProbability()
+    fip_op.set_partial_configuration(partial)
+    fip = fip_op.execute(bdd_model).get_result()
+    assert wmc_op.get_marginals() == pytest.approx(fip)
+
+
+def test_weighted_sampling():
+    bdd_model = _read_model("resources/models/uvl_models/Pizzas.uvl")
+    features = [bdd_model.vars_features[var] for var in bdd_model.vars_order]
+    weights = {feature: i % 4 + 0.5 for i, feature in enumerate(features)}
+    expected = {}
+    for configuration in BDDConfigurations().execute(bdd_model).get_result():
+        selected = frozenset(configuration.get_selected_elements())
+        expected[selected] = math.prod(weights[feature] for feature in selected)
+    total = sum(expected.values())
+
+    sampler = BDDSampler(bdd_model, seed=5,
+                         weights={bdd_model.features_vars[f]: w for f, w in weights.items()})
+    n_samples = 20000
+    matrix = sampler.sample_matrix(n_samples)
+    frequencies = defaultdict(int)
+    for row in matrix.tolist():
+        frequencies[frozenset(itertools.compress(features, row))] += 1
+    stream = sampler.sample(n_samples, with_replacement=True)
+    for sample in stream:
+        frequencies[frozenset(f for f, selected in sample.items() if selected)] += 1
+    assert set(frequencies) <= set(expected)
+    for selected, weight in expected.items():
+        assert frequencies[selected] / (2 * n_samples) == pytest.approx(weight / total, abs=0.01)
+
+    sampling_op = BDDSampling()
+    sampling_op.set_weights(weights)
+    sampling_op.set_seed(1)
+    sampling_op.set_sample_size(len(expected) + 10)
+    sample = sampling_op.execute(bdd_model).get_result()
+    assert {frozenset(f for f, selected in c.items() if selected) for c in sample} == \
+        set(expected)
+    # Without replacement the stream ends after every product, even with dominant weights
+    heavy = BDDSampler(bdd_model, seed=3,
+                       weights={var: 10 ** 6 for var in bdd_model.vars_order[:3]})
+    products = list(heavy.samples(with_replacement=False))
+    assert len({frozenset(product.items()) for product in products}) == len(products) == \
+        len(expected)
+    sampling_op.set_weights({features[0]: 0})
+    with pytest.raises(FlamaException):
+        sampling_op.execute(bdd_model)
+
+
+def test_stratified_sampling():
+    bdd_model = _read_model("resources/models/uvl_models/Truck.uvl")
+    by_size = defaultdict(set)
+    for configuration in BDDConfigurations().execute(bdd_model).get_result():
+        selected = frozenset(configuration.get_selected_elements())
+        by_size[len(selected)].add(selected)
+
+    sampler = BDDSampler(bdd_model, seed=3)
+    for n_features, expected in by_size.items():
+        sample = list(sampler.samples_with_n_features(n_features, with_replacement=False))
+        assert len(sample) == len(expected)
+        assert {frozenset(f for f, selected in s.items() if selected) for s in sample} == expected
+    assert not list(sampler.samples_with_n_features(len(bdd_model.vars_order) + 1))
+
+    n_features = max(by_size, key=lambda size: len(by_size[size]))
+    frequencies = defaultdict(int)
+    n_samples = 10000
+    for sample in itertools.islice(sampler.samples_with_n_features(n_features), n_samples):
+        frequencies[frozenset(f for f, selected in sample.items() if selected)] += 1
+    assert set(frequencies) == by_size[n_features]
+    for count in frequencies.values():
+        assert count / n_samples == pytest.approx(1 / len(by_size[n_features]), abs=0.005)
+
+    sampling_op = BDDSampling()
+    sampling_op.set_seed(1)
+    sampling_op.set_n_features_quotas({14: 3, 18: 30})
+    sample = sampling_op.execute(bdd_model).get_result()
+    assert sorted(sum(s.values()) for s in sample) == [14] * 3 + [18] * len(by_size[18])
+    sampling_op.set_partial_configuration(Configuration({"Tons12": True}))
+    sampling_op.set_n_features(16)
+    sampling_op.set_sample_size(5)
+    sample = sampling_op.execute(bdd_model).get_result()
+    assert len(sample) == 5
+    assert all(s["Tons12"] and sum(s.values()) == 16 for s in sample)
+
+
+@pytest.mark.parametrize(
+    "path, partial_configuration",
+    [
+        ("resources/models/uvl_models/Truck.uvl", {}),
+        ("resources/models/uvl_models/Truck.uvl", {"Tons12": True, "KW400": False}),
+        ("resources/models/uvl_models/JHipster.uvl", {}),
+    ],
+)
+def test_feature_co_occurrence(path: str, partial_configuration: dict):
+    bdd_model = _read_model(path)
+    features = [bdd_model.vars_features[var] for var in bdd_model.vars_order]
+    configurations_op = BDDConfigurations()
+    if partial_configuration:
+        configurations_op.set_partial_configuration(Configuration(partial_configuration))
+    products = np.array([[c.elements.get(feature, False) for feature in features]
+                         for c in configurations_op.execute(bdd_model).get_result()], dtype=float)
+    expected = products.T @ products / len(products)
+
+    co_occurrence_op = BDDFeatureCoOccurrence()
+    co_occurrence_op.set_partial_configuration(Configuration(partial_configuration))
+    co_occurrence_op.set_block_size(4)
+    matrix = co_occurrence_op.execute(bdd_model).get_result()
+    assert co_occurrence_op.get_features() == features
+    assert co_occurrence_op.get_configurations_number() == len(products)
+    assert np.allclose(matrix, expected, rtol=0, atol=1e-12)
+
+    co_occurrence_op.set_threshold(0.5)
+    co_occurrence_op.set_block_size(None)
+    assert co_occurrence_op.execute(bdd_model).get_result() is None
+    pairs = co_occurrence_op.get_pairs()
+    upper = [(i, j) for i in range(len(features)) for j in range(i + 1, len(features))]
+    assert {(features[i], features[j]) for i, j in upper if expected[i, j] > 0.5 + 1e-9} <= \
+        set(pairs) <= {(features[i], features[j]) for i, j in upper if expected[i, j] > 0.5 - 1e-9}
+    assert all(pairs[features[i], features[j]] == pytest.approx(expected[i, j])
+               for i, j in upper if (features[i], features[j]) in pairs)
+    with pytest.raises(FlamaException):
+        co_occurrence_op.set_threshold(0)
+
+
+@pytest.mark.parametrize(
+    "path, t, partial_configuration",
+    [
+        ("resources/models/uvl_models/Pizzas.uvl", 3, {}),
+        ("resources/models/uvl_models/Truck.uvl", 2, {}),
+        ("resources/models/uvl_models/Truck.uvl", 2, {"Tons12": True, "KW400": False}),
+    ],
+)
+def test_t_wise_sampling(path: str, t: int, partial_configuration: dict):
+    bdd_model = _read_model(path)
+    features = [bdd_model.vars_features[var] for var in bdd_model.vars_order]
+    configurations_op = BDDConfigurations()
+    if partial_configuration:
+        configurations_op.set_partial_configuration(Configuration(partial_configuration))
+    products = {tuple(c.elements.get(feature, False) for feature in features)
+                for c in configurations_op.execute(bdd_model).get_result()}
+    free = [i for i, feature in enumerate(features) if feature not in partial_configuration]
+
+    def interactions(rows):
+        return {combination for row in rows
+                for combination in itertools.combinations([(i, row[i]) for i in free], t)}
+
+    expected = interactions(products)
+    sampling_op = BDDTWiseSampling()
+    sampling_op.set_t(t)
+    sampling_op.set_seed(0)
+    if partial_configuration:
+        sampling_op.set_partial_configuration(Configuration(partial_configuration))
+    sample = [tuple(c.elements[feature] for feature in features)
+              for c in sampling_op.execute(bdd_model).get_result()]
+    assert set(sample) <= products
+    assert len(sample) < len(products)
+    assert interactions(sample) == expected
+    assert sampling_op.get_coverage() == 1.0
+    assert sampling_op.get_interactions_number() == (len(expected), len(expected))
+
+    sampling_op.set_max_sample_size(2)
+    sample = [tuple(c.elements[feature] for feature in features)
+              for c in sampling_op.execute(bdd_model).get_result()]
+    assert len(sample) == 2 and set(sample) <= products
+    assert sampling_op.get_interactions_number() == (len(interactions(sample)), len(expected))
+    assert sampling_op.get_coverage() == len(interactions(sample)) / len(expected)
+    with pytest.raises(FlamaException):
+        sampling_op.set_t(4)
+
+
+@pytest.mark.parametrize(
+    "path, t, partial_configuration",
+    [
+        ("resources/models/uvl_models/Pizzas.uvl", 3, {}),
+        ("resources/models/uvl_models/Truck.uvl", 2, {}),
+        ("resources/models/uvl_models/Truck.uvl", 3, {"Tons12": True, "KW400": False}),
+    ],
+)
+def test_t_wise_coverage(path: str, t: int, partial_configuration: dict):
+    bdd_model = _read_model(path)
+    features = [bdd_model.vars_features[var] for var in bdd_model.vars_order]
+    free = [feature for feature in features if feature not in partial_configuration]
+    configurations_op = BDDConfigurations()
+    if partial_configuration:
+        configurations_op.set_partial_configuration(Configuration(partial_configuration))
+    products = configurations_op.execute(bdd_model).get_result()
+
+    def interactions(sample):
+        return {combination for elements in sample
+                for combination in itertools.combinations(
+                    [(feature, bool(elements.get(feature, False))) for feature in free], t)}
+
+    expected = interactions(c.elements for c in products)
+    sampling_op = BDDSampling()
+    sampling_op.set_sample_size(4)
+    sampling_op.set_seed(1)
+    if partial_configuration:
+        sampling_op.set_partial_configuration(Configuration(partial_configuration))
+    sample = sampling_op.execute(bdd_model).get_result()
+    # An invalid product: only its valid interactions count, and only if it extends the partial
+    # configuration
+    sample.append({feature: not partial_configuration.get(feature, False) for feature in features})
+    covered = interactions(elements for elements in sample
+                           if all(elements.get(feature, False) == selected
+                                  for feature, selected in partial_configuration.items()))
+    covered &= expected
+
+    coverage_op = BDDTWiseCoverage()
+    coverage_op.set_t(t)
+    coverage_op.set_sample(sample)
+    coverage_op.set_partial_configuration(Configuration(partial_configuration))
+    assert coverage_op.execute(bdd_model).get_result() == len(covered) / len(expected)
+    assert coverage_op.get_interactions_number() == (len(covered), len(expected))
+    uncovered = coverage_op.get_uncovered_interactions()
+    assert len(uncovered) == len(set(uncovered)) and set(uncovered) == expected - covered
+
+    coverage_op.set_sample(products)
+    assert coverage_op.execute(bdd_model).get_coverage() == 1.0
+    assert not coverage_op.get_uncovered_interactions()
+    coverage_op.set_sample([])
+    assert coverage_op.execute(bdd_model).get_interactions_number() == (0, len(expected))
+    with pytest.raises(FlamaException):
+        coverage_op.set_t(1)